@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
-from .models import Profile, Address, EmailVerificationToken, LoginHistory
+from django.db.models import Q
+
+from core.paginator import EstimatedCountPaginator
+from .models import Profile, Address, EmailVerificationToken, LoginHistory, CustomerSegment
 
 User = get_user_model()
 
@@ -37,9 +40,12 @@ class CustomUserAdmin(BaseUserAdmin):
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'date_joined')
     search_fields = ('username', 'email', 'first_name', 'last_name')
     ordering = ('-date_joined',)
+    list_select_related = ('profile',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def get_profile_phone(self, obj):
-        """Exibe o telefone do perfil"""
+        """Exibe o telefone do perfil (carregado junto com o usuário)"""
         try:
             return obj.profile.phone
         except Profile.DoesNotExist:
@@ -119,8 +125,32 @@ class AddressAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('user')
 
 
+class OperationalUserAdmin(admin.ModelAdmin):
+    """
+    Admin de registros que podem ficar no banco operacional (ver core.operational).
+
+    Sem join com a tabela de usuários: o usuário é carregado com
+    prefetch_related e a busca por nome ou e-mail consulta os usuários antes.
+    """
+    list_select_related = ()
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('user')
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            user_ids = list(
+                User.objects.filter(Q(username__icontains=search_term) | Q(email__icontains=search_term))
+                .values_list('id', flat=True)[:1000]
+            )
+            if user_ids:
+                results |= queryset.filter(user_id__in=user_ids)
+        return results, may_have_duplicates
+
+
 @admin.register(EmailVerificationToken)
-class EmailVerificationTokenAdmin(admin.ModelAdmin):
+class EmailVerificationTokenAdmin(OperationalUserAdmin):
     """
     Admin para EmailVerificationToken
     """
@@ -128,7 +158,7 @@ class EmailVerificationTokenAdmin(admin.ModelAdmin):
         'user', 'token', 'created_at', 'is_used', 'is_expired_status'
     )
     list_filter = ('is_used', 'created_at')
-    search_fields = ('user__username', 'user__email', 'token')
+    search_fields = ('token',)
     readonly_fields = ('token', 'created_at', 'is_expired_status')
     
     def is_expired_status(self, obj):
@@ -136,37 +166,62 @@ class EmailVerificationTokenAdmin(admin.ModelAdmin):
         return obj.is_expired()
     is_expired_status.boolean = True
     is_expired_status.short_description = 'Expirado'
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user')
 
 
 @admin.register(LoginHistory)
-class LoginHistoryAdmin(admin.ModelAdmin):
+class LoginHistoryAdmin(OperationalUserAdmin):
     """
     Admin para LoginHistory
     """
     list_display = (
-        'user', 'login_time', 'ip_address', 
+        'user', 'username', 'login_time', 'ip_address', 
         'is_successful', 'get_short_user_agent'
     )
     list_filter = ('is_successful', 'login_time')
-    search_fields = ('user__username', 'user__email', 'ip_address')
+    search_fields = ('username', 'ip_address')
     readonly_fields = ('login_time',)
+    raw_id_fields = ('user', 'user_agent')
+    list_select_related = ('user_agent',)
     date_hierarchy = 'login_time'
     
     def get_short_user_agent(self, obj):
         """Exibe uma versão encurtada do user agent"""
         if obj.user_agent:
-            return obj.user_agent[:50] + '...' if len(obj.user_agent) > 50 else obj.user_agent
+            value = obj.user_agent.value
+            return value[:50] + '...' if len(value) > 50 else value
         return '-'
     get_short_user_agent.short_description = 'User Agent'
     
+    def has_add_permission(self, request):
+        """Desabilita a adição manual de histórico de login"""
+        return False
+
+
+@admin.register(CustomerSegment)
+class CustomerSegmentAdmin(admin.ModelAdmin):
+    """
+    Admin para CustomerSegment (somente leitura; ver comando segment_customers)
+    """
+    list_display = (
+        'user', 'segment', 'get_rfm', 'frequency',
+        'monetary', 'last_order_at', 'scored_at'
+    )
+    list_filter = ('segment', 'recency_score', 'frequency_score', 'monetary_score')
+    search_fields = ('user__username', 'user__email')
+    raw_id_fields = ('user',)
+
+    def get_rfm(self, obj):
+        """Exibe as notas RFM"""
+        return obj.rfm
+    get_rfm.short_description = 'RFM'
+
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user')
-    
+
     def has_add_permission(self, request):
-        """Desabilita a adição manual de histórico de login"""
+        return False
+
+    def has_change_permission(self, request, obj=None):
         return False
 
 
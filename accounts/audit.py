@@ -0,0 +1,199 @@
+"""
+Registro de logins em lote.
+
+Os sinais ``user_logged_in`` e ``user_login_failed`` apenas anotam o login em
+um buffer na memória do processo; o buffer é gravado com um único
+``bulk_create`` quando atinge ``LOGIN_AUDIT_BUFFER_SIZE`` entradas ou
+``LOGIN_AUDIT_FLUSH_INTERVAL`` segundos após a primeira entrada pendente
+(em uma thread separada), e também quando o processo termina. Assim o
+login não espera pela gravação do histórico.
+
+Uma entrada só vai para o buffer depois do commit da transação em que o
+login aconteceu: no cadastro, por exemplo, o usuário ainda não existe para
+a conexão da thread que grava o histórico.
+
+Se o processo for encerrado à força, os logins ainda no buffer são
+perdidos; é um histórico de auditoria, não um registro transacional.
+
+Os user agents são gravados uma única vez na tabela ``UserAgent`` e o
+histórico guarda apenas a referência.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+import atexit
+import hashlib
+import ipaddress
+import logging
+import threading
+
+from .models import LoginHistory, UserAgent
+
+logger = logging.getLogger(__name__)
+
+
+def get_client_ip(request):
+    """IP do cliente (o nginx repassa o endereço original em X-Real-IP)"""
+    value = request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR')
+    try:
+        return str(ipaddress.ip_address(value)) if value else None
+    except ValueError:
+        return None
+
+
+def resolve_user_agents(values):
+    """
+    Retorna o id de cada user agent, criando os que ainda não existem.
+
+    Returns:
+        dict: {user agent: id}
+    """
+    hashes = {value: hashlib.sha256(value.encode()).hexdigest() for value in set(values) if value}
+    if not hashes:
+        return {}
+
+    ids = dict(UserAgent.objects.filter(hash__in=hashes.values()).values_list('hash', 'id'))
+    missing = [UserAgent(hash=digest, value=value) for value, digest in hashes.items() if digest not in ids]
+    if missing:
+        # Outro processo pode criar o mesmo user agent ao mesmo tempo
+        UserAgent.objects.bulk_create(missing, ignore_conflicts=True)
+        ids.update(
+            UserAgent.objects.filter(hash__in=[agent.hash for agent in missing]).values_list('hash', 'id')
+        )
+    return {value: ids[digest] for value, digest in hashes.items()}
+
+
+def write_login_entries(entries):
+    """Grava as entradas do buffer (dicts com os campos do histórico) em lote"""
+    agents = resolve_user_agents(entry['user_agent'] for entry in entries)
+    LoginHistory.objects.bulk_create([
+        LoginHistory(
+            user_id=entry['user_id'],
+            username=entry['username'],
+            login_time=entry['login_time'],
+            ip_address=entry['ip_address'],
+            user_agent_id=agents.get(entry['user_agent']),
+            is_successful=entry['is_successful'],
+        )
+        for entry in entries
+    ])
+
+
+class LoginAuditBuffer:
+    """Buffer de logins gravado por tamanho ou por tempo"""
+
+    def __init__(self, max_size, max_age):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = []
+        self._timer = None
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) < self.max_size:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_age, self._flush_from_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            entries = self._take()
+        self._write(entries)
+
+    def flush(self):
+        with self._lock:
+            entries = self._take()
+        self._write(entries)
+
+    def pending(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _take(self):
+        entries, self._entries = self._entries, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return entries
+
+    def _write(self, entries):
+        if not entries:
+            return
+        try:
+            write_login_entries(entries)
+        except Exception as e:
+            logger.error(f"Erro ao gravar {len(entries)} login(s) no histórico: {str(e)}")
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # A thread do timer abre suas próprias conexões com os bancos
+            connections.close_all()
+
+
+_buffer = LoginAuditBuffer(
+    max_size=settings.LOGIN_AUDIT_BUFFER_SIZE,
+    max_age=settings.LOGIN_AUDIT_FLUSH_INTERVAL,
+)
+atexit.register(_buffer.flush)
+
+
+def get_login_buffer():
+    """Retorna o buffer de logins do processo"""
+    return _buffer
+
+
+def record_login(request, user=None, username='', is_successful=True):
+    """Anota um login (ou tentativa) no buffer depois do commit da transação corrente"""
+    meta = request.META if request is not None else {}
+    entry = {
+        'user_id': user.pk if user is not None else None,
+        'username': (username or (user.get_username() if user is not None else ''))[:150],
+        'login_time': timezone.now(),
+        'ip_address': get_client_ip(request) if request is not None else None,
+        'user_agent': meta.get('HTTP_USER_AGENT', ''),
+        'is_successful': is_successful,
+    }
+    transaction.on_commit(lambda: _buffer.add(entry))
+
+
+def prune_login_history(older_than_days, batch_size=5000, progress=None):
+    """
+    Remove, em blocos, os logins mais antigos que ``older_than_days`` e os
+    user agents que deixaram de ser usados.
+
+    Args:
+        older_than_days: Idade mínima, em dias, dos logins removidos
+        batch_size: Quantidade de linhas removidas por DELETE
+        progress: Função chamada após cada bloco com a quantidade de logins removidos
+
+    Returns:
+        dict: Logins e user agents removidos
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    result = {'logins': 0, 'user_agents': 0}
+
+    while True:
+        ids = list(
+            LoginHistory.objects.filter(login_time__lt=cutoff)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        result['logins'] += LoginHistory.objects.filter(id__in=ids).delete()[0]
+        if progress:
+            progress(result['logins'])
+
+    while True:
+        ids = list(
+            UserAgent.objects.filter(logins__isnull=True)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        result['user_agents'] += UserAgent.objects.filter(id__in=ids, logins__isnull=True).delete()[0]
+
+    return result
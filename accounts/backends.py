@@ -0,0 +1,17 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .cache import aget_cached_user, get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend que carrega o usuário da sessão do cache (ver ``accounts.cache``).
+    """
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await aget_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
@@ -0,0 +1,65 @@
+"""
+Cache do usuário autenticado.
+
+O ``CachedModelBackend`` carrega o usuário da sessão (com o perfil já
+associado) do cache em vez de consultar ``accounts_user`` a cada
+requisição. A entrada é removida a cada alteração no usuário ou no perfil
+(ver ``accounts.signals``); alterações feitas com ``QuerySet.update()`` não
+disparam sinais e devem chamar ``invalidate_user``.
+
+O hash da senha não vai para o cache: a entrada guarda o hash da sessão e
+``has_usable_password`` já calculados (ver ``User``), e a senha é carregada
+do banco só se for acessada (ex: verificação com ``SECRET_KEY_FALLBACKS``).
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+USER_CACHE_TIMEOUT = 60 * 30
+
+# Incrementar quando os campos de User ou Profile mudarem: as entradas
+# guardam as instâncias serializadas
+USER_CACHE_VERSION = 2
+
+
+def user_cache_key(user_id):
+    return f"accounts:user:v{USER_CACHE_VERSION}:{user_id}"
+
+
+def _without_password(user):
+    """Troca a senha pelo hash da sessão; o campo passa a ser carregado sob demanda"""
+    user._session_auth_hash = user.get_session_auth_hash()
+    user._has_usable_password = user.has_usable_password()
+    del user.__dict__['password']
+    return user
+
+
+def get_cached_user(user_id):
+    """Usuário com o perfil, do cache ou do banco (None se não existir)"""
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        User = get_user_model()
+        try:
+            user = User._default_manager.select_related('profile').get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        cache.set(key, _without_password(user), USER_CACHE_TIMEOUT)
+    return user
+
+
+async def aget_cached_user(user_id):
+    """Versão assíncrona de ``get_cached_user`` (views ASGI), com a mesma chave"""
+    key = user_cache_key(user_id)
+    user = await cache.aget(key)
+    if user is None:
+        User = get_user_model()
+        try:
+            user = await User._default_manager.select_related('profile').aget(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        await cache.aset(key, _without_password(user), USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
@@ -101,12 +101,11 @@ class CustomUserCreationForm(UserCreationForm):
         if commit:
             user.save()
             
-            # Create profile
-            profile = Profile.objects.create(
-                user=user,
-                phone=self.cleaned_data.get('phone', ''),
-                newsletter=self.cleaned_data.get('newsletter', True)
-            )
+            # The profile is created with the user (accounts.signals)
+            profile = user.profile
+            profile.phone = self.cleaned_data.get('phone', '')
+            profile.newsletter = self.cleaned_data.get('newsletter', True)
+            profile.save(update_fields=['phone', 'newsletter', 'updated_at'])
         
         return user
 
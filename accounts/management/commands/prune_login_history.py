@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.audit import prune_login_history
+
+
+class Command(BaseCommand):
+    help = 'Remove logins antigos do histórico e user agents sem uso'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.LOGIN_HISTORY_RETENTION_DAYS,
+            help='Idade mínima, em dias, dos logins removidos'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Quantidade de linhas removidas por transação'
+        )
+
+    def handle(self, *args, **options):
+        def progress(logins):
+            self.stdout.write(f"  Logins removidos: {logins}")
+
+        result = prune_login_history(
+            older_than_days=options['days'],
+            batch_size=options['batch_size'],
+            progress=progress
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Limpeza concluída: {result['logins']} logins e "
+                f"{result['user_agents']} user agents removidos."
+            )
+        )
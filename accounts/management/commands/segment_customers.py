@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+import time
+
+from accounts.segments import aggregate_customers, score_customers
+
+
+class Command(BaseCommand):
+    help = 'Atualiza a segmentação RFM dos clientes (executar diariamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Agrega novamente todos os clientes, e não só os com pedidos alterados'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Quantidade de linhas lidas e gravadas por bloco'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        now = timezone.now()
+
+        result = aggregate_customers(full=options['full'], batch_size=options['batch_size'], now=now)
+        self.stdout.write(
+            f"  Clientes agregados: {result['aggregated']} | removidos: {result['removed']}"
+        )
+
+        result = score_customers(batch_size=options['batch_size'], now=now)
+        self.stdout.write(
+            f"  Clientes classificados: {result['scored']} | alterados: {result['changed']}"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Segmentação concluída em {time.monotonic() - started:.1f}s.")
+        )
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_address_emailverificationtoken_loginhistory_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_order_at', models.DateTimeField(verbose_name='Último Pedido')),
+                ('frequency', models.PositiveIntegerField(verbose_name='Pedidos')),
+                ('monetary', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Valor Total')),
+                ('aggregated_at', models.DateTimeField(verbose_name='Agregados em')),
+                ('recency_score', models.PositiveSmallIntegerField(default=1, verbose_name='Nota de Recência')),
+                ('frequency_score', models.PositiveSmallIntegerField(default=1, verbose_name='Nota de Frequência')),
+                ('monetary_score', models.PositiveSmallIntegerField(default=1, verbose_name='Nota de Valor')),
+                ('segment', models.CharField(choices=[('champions', 'Campeões'), ('loyal', 'Fiéis'), ('new', 'Novos'), ('potential', 'Promissores'), ('at_risk', 'Em Risco'), ('hibernating', 'Hibernando')], default='hibernating', max_length=20, verbose_name='Segmento')),
+                ('scored_at', models.DateTimeField(blank=True, null=True, verbose_name='Classificado em')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='segment', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Segmento de Cliente',
+                'verbose_name_plural': 'Segmentos de Clientes',
+                'indexes': [models.Index(fields=['segment', 'monetary_score'], name='accounts_cu_segment_fe4751_idx'), models.Index(fields=['aggregated_at'], name='accounts_cu_aggrega_3cfdd5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+import django.db.models.deletion
+import django.utils.timezone
+import hashlib
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_user_agents(apps, schema_editor):
+    """Move os user agents gravados no histórico para a tabela de consulta"""
+    LoginHistory = apps.get_model('accounts', 'LoginHistory')
+    UserAgent = apps.get_model('accounts', 'UserAgent')
+    using = schema_editor.connection.alias
+    agents = {}
+    for entry in LoginHistory.objects.using(using).exclude(user_agent='').only('id', 'user_agent').iterator():
+        if entry.user_agent not in agents:
+            agents[entry.user_agent] = UserAgent.objects.using(using).get_or_create(
+                hash=hashlib.sha256(entry.user_agent.encode()).hexdigest(),
+                defaults={'value': entry.user_agent},
+            )[0].id
+        LoginHistory.objects.using(using).filter(pk=entry.pk).update(agent_id=agents[entry.user_agent])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_customer_segment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True, verbose_name='Hash')),
+                ('value', models.TextField(verbose_name='User Agent')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'User Agent',
+                'verbose_name_plural': 'User Agents',
+            },
+        ),
+        migrations.AddField(
+            model_name='loginhistory',
+            name='agent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='logins', to='accounts.useragent', verbose_name='User Agent'),
+        ),
+        migrations.RunPython(move_user_agents, migrations.RunPython.noop, hints={'model_name': 'loginhistory'}),
+        migrations.RemoveField(
+            model_name='loginhistory',
+            name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='loginhistory',
+            old_name='agent',
+            new_name='user_agent',
+        ),
+        migrations.AddField(
+            model_name='loginhistory',
+            name='username',
+            field=models.CharField(blank=True, max_length=150, verbose_name='Usuário Informado'),
+        ),
+        migrations.AlterField(
+            model_name='loginhistory',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='login_history', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='loginhistory',
+            name='login_time',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
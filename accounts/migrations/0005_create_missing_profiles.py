@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """Cria os perfis que antes eram criados sob demanda pelas views"""
+    User = apps.get_model('accounts', 'User')
+    Profile = apps.get_model('accounts', 'Profile')
+    missing = User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    Profile.objects.bulk_create(
+        [Profile(user_id=user_id) for user_id in missing.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_login_audit'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
@@ -110,6 +110,20 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.get_full_name()} ({self.email})"
 
+    def get_session_auth_hash(self):
+        """
+        Hash da sessão; usuários vindos do cache (``accounts.cache``) não
+        trazem a senha e usam o hash calculado antes de guardá-los.
+        """
+        if 'password' not in self.__dict__ and '_session_auth_hash' in self.__dict__:
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+
+    def has_usable_password(self):
+        if 'password' not in self.__dict__ and '_has_usable_password' in self.__dict__:
+            return self._has_usable_password
+        return super().has_usable_password()
+
     def get_full_address(self):
         """Retorna o endereço completo formatado."""
         address_parts = [
@@ -327,9 +341,12 @@ class EmailVerificationToken(models.Model):
     """
     Tokens para verificação de e-mail.
     """
+    # Sem chave estrangeira no banco: a tabela pode ficar no banco operacional
+    # (ver core.operational); os tokens são apagados por accounts.signals
     user = models.ForeignKey(
         'User',
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name='email_tokens'
     )
     
@@ -356,17 +373,43 @@ class EmailVerificationToken(models.Model):
         return timezone.now() > expiry_time
 
 
+class UserAgent(models.Model):
+    """
+    User agents distintos vistos nos logins (tabela de consulta do histórico).
+    """
+    hash = models.CharField('Hash', max_length=64, unique=True)
+    value = models.TextField('User Agent')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'User Agent'
+        verbose_name_plural = 'User Agents'
+
+    def __str__(self):
+        return self.value[:80]
+
+
 class LoginHistory(models.Model):
     """
-    Histórico de logins do usuário.
+    Histórico de logins do usuário (gravado em lote; ver ``accounts.audit``).
     """
+    # Sem chave estrangeira no banco, como em EmailVerificationToken
     user = models.ForeignKey(
         'User',
-        on_delete=models.CASCADE,
-        related_name='login_history'
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='login_history',
+        null=True,
+        blank=True
     )
     
-    login_time = models.DateTimeField(auto_now_add=True)
+    username = models.CharField(
+        'Usuário Informado',
+        max_length=150,
+        blank=True
+    )
+    
+    login_time = models.DateTimeField(default=timezone.now, db_index=True)
     
     ip_address = models.GenericIPAddressField(
         'Endereço IP',
@@ -374,8 +417,12 @@ class LoginHistory(models.Model):
         blank=True
     )
     
-    user_agent = models.TextField(
-        'User Agent',
+    user_agent = models.ForeignKey(
+        UserAgent,
+        on_delete=models.SET_NULL,
+        related_name='logins',
+        verbose_name='User Agent',
+        null=True,
         blank=True
     )
     
@@ -390,4 +437,55 @@ class LoginHistory(models.Model):
         ordering = ['-login_time']
     
     def __str__(self):
-        return f"{self.user.username} - {self.login_time}"
\ No newline at end of file
+        return f"{self.user.username if self.user else self.username} - {self.login_time}"
+
+
+class CustomerSegment(models.Model):
+    """
+    Segmento RFM (recência, frequência e valor) do cliente, usado para
+    direcionar a newsletter. Calculado pelo comando ``segment_customers``.
+    """
+    SEGMENT_CHOICES = [
+        ('champions', 'Campeões'),
+        ('loyal', 'Fiéis'),
+        ('new', 'Novos'),
+        ('potential', 'Promissores'),
+        ('at_risk', 'Em Risco'),
+        ('hibernating', 'Hibernando'),
+    ]
+
+    user = models.OneToOneField(
+        'User',
+        on_delete=models.CASCADE,
+        related_name='segment',
+        verbose_name='Usuário'
+    )
+
+    # Agregados dos pedidos
+    last_order_at = models.DateTimeField('Último Pedido')
+    frequency = models.PositiveIntegerField('Pedidos')
+    monetary = models.DecimalField('Valor Total', max_digits=14, decimal_places=2)
+    aggregated_at = models.DateTimeField('Agregados em')
+
+    # Notas de 1 a 5 por quintil
+    recency_score = models.PositiveSmallIntegerField('Nota de Recência', default=1)
+    frequency_score = models.PositiveSmallIntegerField('Nota de Frequência', default=1)
+    monetary_score = models.PositiveSmallIntegerField('Nota de Valor', default=1)
+    segment = models.CharField('Segmento', max_length=20, choices=SEGMENT_CHOICES, default='hibernating')
+    scored_at = models.DateTimeField('Classificado em', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Segmento de Cliente'
+        verbose_name_plural = 'Segmentos de Clientes'
+        indexes = [
+            models.Index(fields=['segment', 'monetary_score']),
+            models.Index(fields=['aggregated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.get_segment_display()}"
+
+    @property
+    def rfm(self):
+        """Notas no formato 'RFM' (ex: '545')"""
+        return f"{self.recency_score}{self.frequency_score}{self.monetary_score}"
@@ -0,0 +1,217 @@
+"""
+Segmentação RFM (recência, frequência e valor) dos clientes.
+
+O cálculo tem duas etapas:
+
+1. Agregação: uma consulta agrupada por usuário sobre os pedidos que contam
+   como venda (e sobre os arquivados), lida em blocos com cursor no servidor
+   e gravada em ``CustomerSegment`` (último pedido, quantidade e valor
+   total). Na execução incremental só são agregados os usuários com pedidos
+   alterados desde a execução anterior.
+2. Classificação: os agregados de todos os clientes são carregados em
+   arrays NumPy, as notas de 1 a 5 são dadas por quintil e o segmento é
+   derivado das notas de recência e frequência. A recência muda com o
+   passar dos dias, por isso todos os clientes são reclassificados, mas só
+   as linhas cujas notas mudaram são gravadas.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from heapq import merge
+from itertools import groupby, islice
+from operator import itemgetter
+import numpy as np
+
+from orders.models import ArchivedOrder, Order
+from orders.sales import countable_orders
+from .models import CustomerSegment
+
+# Margem para pedidos alterados em transações ainda abertas na execução anterior
+SAFETY_LAG = timedelta(minutes=5)
+
+QUINTILES = [0.2, 0.4, 0.6, 0.8]
+
+
+def _order_aggregates(users, batch_size):
+    """
+    Agregados por usuário dos pedidos e dos pedidos arquivados, em ordem de usuário.
+
+    As duas consultas agrupadas são lidas em paralelo e combinadas sem
+    carregar os resultados na memória.
+    """
+    streams = []
+    for model in (Order, ArchivedOrder):
+        queryset = countable_orders(model)
+        if users is not None:
+            queryset = queryset.filter(user_id__in=users)
+        streams.append(
+            queryset.values('user_id')
+            .annotate(frequency=Count('id'), monetary=Sum('total'), last_order_at=Max('created_at'))
+            .order_by('user_id')
+            .values_list('user_id', 'frequency', 'monetary', 'last_order_at')
+            .iterator(chunk_size=batch_size)
+        )
+
+    for user_id, rows in groupby(merge(*streams, key=itemgetter(0)), key=itemgetter(0)):
+        rows = list(rows)
+        yield (
+            user_id,
+            sum(row[1] for row in rows),
+            sum((row[2] for row in rows), Decimal('0.00')),
+            max(row[3] for row in rows),
+        )
+
+
+def aggregate_customers(full=False, batch_size=5000, now=None):
+    """
+    Atualiza os agregados de pedidos dos clientes.
+
+    Args:
+        full: Agrega todos os clientes (padrão: só os com pedidos alterados)
+        batch_size: Linhas lidas e gravadas por bloco
+        now: Momento da execução
+
+    Returns:
+        dict: Clientes agregados e segmentos removidos
+    """
+    now = now or timezone.now()
+    since = None
+    if not full:
+        since = CustomerSegment.objects.aggregate(since=Max('aggregated_at'))['since']
+
+    users = None
+    if since is not None:
+        users = Order.objects.filter(updated_at__gte=since - SAFETY_LAG).values('user_id')
+
+    aggregates = _order_aggregates(users, batch_size)
+    aggregated = 0
+    while True:
+        chunk = list(islice(aggregates, batch_size))
+        if not chunk:
+            break
+        CustomerSegment.objects.bulk_create(
+            [
+                CustomerSegment(
+                    user_id=user_id,
+                    frequency=frequency,
+                    monetary=monetary,
+                    last_order_at=last_order_at,
+                    aggregated_at=now,
+                )
+                for user_id, frequency, monetary, last_order_at in chunk
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['frequency', 'monetary', 'last_order_at', 'aggregated_at'],
+        )
+        aggregated += len(chunk)
+
+    # Clientes reavaliados que não têm mais pedidos válidos (ex: todos cancelados)
+    stale = CustomerSegment.objects.filter(aggregated_at__lt=now)
+    if users is not None:
+        stale = stale.filter(user_id__in=users)
+    removed, _ = stale.delete()
+
+    return {'aggregated': aggregated, 'removed': removed}
+
+
+def quintile_scores(values):
+    """Notas de 1 a 5 por quintil (valores maiores recebem notas maiores; empates ficam na menor)"""
+    if not len(values):
+        return np.zeros(0, dtype=int)
+    edges = np.quantile(values, QUINTILES)
+    return np.searchsorted(edges, values, side='left') + 1
+
+
+def segment_labels(recency, frequency):
+    """Segmento a partir das notas de recência e frequência"""
+    return np.select(
+        [
+            (recency >= 4) & (frequency >= 4),
+            (recency >= 3) & (frequency >= 3),
+            recency >= 4,
+            (recency <= 2) & (frequency >= 3),
+            recency <= 2,
+        ],
+        ['champions', 'loyal', 'new', 'at_risk', 'hibernating'],
+        default='potential',
+    )
+
+
+def score_customers(batch_size=5000, now=None):
+    """
+    Recalcula as notas e o segmento de todos os clientes.
+
+    Returns:
+        dict: Clientes classificados e linhas alteradas
+    """
+    now = now or timezone.now()
+    rows = (
+        CustomerSegment.objects.order_by()
+        .values_list(
+            'id', 'last_order_at', 'frequency', 'monetary',
+            'recency_score', 'frequency_score', 'monetary_score', 'segment'
+        )
+        .iterator(chunk_size=batch_size)
+    )
+
+    blocks = []
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        ids, last_orders, frequency, monetary, r, f, m, segments = zip(*chunk)
+        blocks.append((
+            np.asarray(ids, dtype=np.int64),
+            np.asarray([(now - value).total_seconds() for value in last_orders]),
+            np.asarray(frequency, dtype=np.int64),
+            np.asarray(monetary, dtype=np.float64),
+            np.column_stack([r, f, m]),
+            np.asarray(segments, dtype=object),
+        ))
+    if not blocks:
+        return {'scored': 0, 'changed': 0}
+
+    ids, age, frequency, monetary, old_scores, old_segments = (
+        np.concatenate(column) for column in zip(*blocks)
+    )
+    # Pedidos mais recentes (menor idade) recebem notas maiores
+    scores = np.column_stack([
+        quintile_scores(-age),
+        quintile_scores(frequency),
+        quintile_scores(monetary),
+    ])
+    segments = segment_labels(scores[:, 0], scores[:, 1]).astype(object)
+
+    changed = np.flatnonzero((scores != old_scores).any(axis=1) | (segments != old_segments))
+    for start in range(0, len(changed), batch_size):
+        positions = changed[start:start + batch_size]
+        CustomerSegment.objects.bulk_update(
+            [
+                CustomerSegment(
+                    id=segment_id,
+                    recency_score=r,
+                    frequency_score=f,
+                    monetary_score=m,
+                    segment=segment,
+                    scored_at=now,
+                )
+                for segment_id, (r, f, m), segment in zip(
+                    ids[positions].tolist(), scores[positions].tolist(), segments[positions]
+                )
+            ],
+            ['recency_score', 'frequency_score', 'monetary_score', 'segment', 'scored_at'],
+        )
+
+    return {'scored': len(ids), 'changed': len(changed)}
+
+
+def newsletter_audience(segments):
+    """Usuários ativos dos segmentos informados que aceitam receber a newsletter"""
+    return get_user_model().objects.filter(
+        is_active=True,
+        segment__segment__in=segments,
+        profile__newsletter=True,
+    )
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .audit import record_login
+from .cache import invalidate_user
+from .models import EmailVerificationToken, LoginHistory, Profile
+
+User = get_user_model()
+
+
+@receiver(user_logged_in)
+def login_succeeded(sender, request, user, **kwargs):
+    """Registra o login no histórico (em lote)"""
+    record_login(request, user=user)
+
+
+@receiver(user_login_failed)
+def login_failed(sender, credentials, request=None, **kwargs):
+    """Registra a tentativa de login no histórico (em lote)"""
+    username = credentials.get(User.USERNAME_FIELD) or credentials.get('username', '')
+    record_login(request, username=username, is_successful=False)
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    """Cria o perfil junto com o usuário (as views de perfil não o criam mais)"""
+    if created and not raw:
+        Profile.objects.create(user=instance)
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Remove o usuário do cache agora e de novo depois do commit: uma
+    requisição concorrente pode guardar a versão anterior nesse intervalo.
+    """
+    invalidate_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    """O perfil é guardado junto com o usuário"""
+    invalidate_user(instance.user_id)
+    transaction.on_commit(lambda: invalidate_user(instance.user_id))
+
+
+def _delete_operational_records(user_id):
+    EmailVerificationToken.objects.filter(user_id=user_id).delete()
+    LoginHistory.objects.filter(user_id=user_id).delete()
+
+
+@receiver(post_delete, sender=User)
+def delete_operational_records(sender, instance, **kwargs):
+    """
+    Apaga os tokens e o histórico de logins do usuário (sem chave estrangeira
+    no banco: podem estar no banco operacional). Uma falha no banco
+    operacional não desfaz a exclusão do usuário.
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: _delete_operational_records(user_id), robust=True)
@@ -1,3 +1,274 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
\ No newline at end of file
+from django.core.cache import cache
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+
+from core.checks import check_operational_schema
+from core.operational import OperationalRouter
+from orders.models import Order, WebhookEvent
+from .audit import get_login_buffer, prune_login_history
+from .backends import CachedModelBackend
+from .cache import invalidate_user, user_cache_key
+from .models import CustomerSegment, EmailVerificationToken, LoginHistory, Profile, User, UserAgent
+from .segments import aggregate_customers, newsletter_audience, score_customers
+
+
+def create_paid_order(user, total, days_ago):
+    """Cria um pedido pago feito há ``days_ago`` dias."""
+    order = Order.objects.create(
+        user=user,
+        email=user.email,
+        first_name='Maria',
+        last_name='Silva',
+        shipping_address_line_1='Rua A, 1',
+        shipping_city='São Paulo',
+        shipping_state='SP',
+        shipping_postal_code='01310-100',
+        subtotal=total,
+        total=total,
+        status='confirmed',
+        payment_status='completed',
+    )
+    created_at = timezone.now() - timedelta(days=days_ago)
+    Order.objects.filter(pk=order.pk).update(created_at=created_at, updated_at=created_at)
+    return order
+
+
+class CustomerSegmentTest(TestCase):
+    """
+    Testes para a segmentação RFM dos clientes.
+    """
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f'cliente{index}',
+                email=f'cliente{index}@example.com',
+                password='senha-segura-123'
+            )
+            for index in range(5)
+        ]
+        # Quanto maior o índice, mais recente, frequente e valioso o cliente
+        for index, user in enumerate(self.users):
+            for _ in range(index + 1):
+                create_paid_order(user, Decimal('100.00') * (index + 1), days_ago=300 - index * 70)
+
+    def test_scores_and_segments(self):
+        """Testa a agregação, as notas por quintil e o público da newsletter."""
+        self.assertEqual(aggregate_customers(full=True), {'aggregated': 5, 'removed': 0})
+        self.assertEqual(score_customers()['scored'], 5)
+
+        best = CustomerSegment.objects.get(user=self.users[4])
+        self.assertEqual((best.frequency, best.monetary), (5, Decimal('2500.00')))
+        self.assertEqual(best.rfm, '555')
+        self.assertEqual(best.segment, 'champions')
+        self.assertEqual(CustomerSegment.objects.get(user=self.users[0]).segment, 'hibernating')
+
+        # Reclassificar sem mudanças não grava nada
+        self.assertEqual(score_customers()['changed'], 0)
+
+        self.assertEqual(set(newsletter_audience(['champions'])), {self.users[3], self.users[4]})
+        Profile.objects.filter(user=self.users[3]).update(newsletter=False)
+        self.assertEqual(list(newsletter_audience(['champions'])), [self.users[4]])
+
+    def test_incremental_run_only_touches_changed_customers(self):
+        """Testa que a execução incremental só reagrega clientes com pedidos alterados."""
+        aggregate_customers(full=True)
+        score_customers()
+
+        order = self.users[0].orders.get()
+        order.status = 'cancelled'
+        order.save()
+
+        result = aggregate_customers()
+        self.assertEqual(result, {'aggregated': 0, 'removed': 1})
+        self.assertFalse(CustomerSegment.objects.filter(user=self.users[0]).exists())
+        self.assertEqual(CustomerSegment.objects.count(), 4)
+
+
+class LoginAuditTest(TestCase):
+    """
+    Testes para o registro de logins em lote.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.buffer = get_login_buffer()
+        self.addCleanup(self.buffer.flush)
+
+    def login(self, password):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('accounts:login'),
+                {'username': 'maria@example.com', 'password': password},
+                HTTP_USER_AGENT='Mozilla/5.0 (Teste)',
+                REMOTE_ADDR='203.0.113.7',
+            )
+
+    def test_logins_are_buffered_and_written_in_bulk(self):
+        """Testa que os logins ficam no buffer e são gravados juntos, com o user agent deduplicado."""
+        self.login('senha-errada')
+        self.login('senha-segura-123')
+
+        self.assertEqual(self.buffer.pending(), 2)
+        self.assertFalse(LoginHistory.objects.exists())
+
+        with self.assertNumQueries(4):
+            self.buffer.flush()
+
+        failed, succeeded = LoginHistory.objects.order_by('id')
+        self.assertEqual((failed.user, failed.username, failed.is_successful), (None, 'maria@example.com', False))
+        self.assertEqual((succeeded.user, succeeded.is_successful), (self.user, True))
+        self.assertEqual(succeeded.ip_address, '203.0.113.7')
+        self.assertEqual(UserAgent.objects.get().value, 'Mozilla/5.0 (Teste)')
+
+    def test_prune_removes_old_logins_and_unused_user_agents(self):
+        """Testa a remoção em blocos dos logins antigos e dos user agents sem uso."""
+        self.login('senha-errada')
+        self.login('senha-segura-123')
+        self.buffer.flush()
+        LoginHistory.objects.update(login_time=timezone.now() - timedelta(days=31))
+
+        result = prune_login_history(older_than_days=30, batch_size=1)
+
+        self.assertEqual(result, {'logins': 2, 'user_agents': 1})
+        self.assertFalse(UserAgent.objects.exists())
+
+
+class CachedUserTest(TestCase):
+    """
+    Testes para o cache do usuário autenticado.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.backend = CachedModelBackend()
+
+    def test_profile_is_created_with_user(self):
+        """Testa que o perfil é criado junto com o usuário."""
+        self.assertTrue(Profile.objects.filter(user=self.user).exists())
+
+    def test_user_and_profile_come_from_cache_until_changed(self):
+        """Testa que o usuário e o perfil vêm do cache e são invalidados ao salvar."""
+        self.backend.get_user(self.user.pk)
+
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.email, 'maria@example.com')
+            self.assertTrue(user.profile.newsletter)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile.newsletter = False
+            user.profile.save()
+        self.assertFalse(self.backend.get_user(self.user.pk).profile.newsletter)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_cached_user_has_no_password_hash(self):
+        """Testa que o hash da senha não vai para o cache e a sessão continua válida."""
+        self.client.force_login(self.user)
+        self.client.get(reverse('accounts:profile'))
+
+        cached = cache.get(user_cache_key(self.user.pk))
+        self.assertNotIn('password', cached.__dict__)
+        self.assertEqual(cached.get_session_auth_hash(), self.user.get_session_auth_hash())
+        self.assertEqual(self.client.get(reverse('accounts:profile')).status_code, 200)
+
+    def test_sessions_from_model_backend_stay_logged_in(self):
+        """Testa que sessões abertas com o ModelBackend continuam válidas."""
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+
+        self.assertEqual(self.client.get(reverse('accounts:profile')).status_code, 200)
+
+    async def test_async_lookup_shares_the_cache_entry(self):
+        """Testa que aget_user usa a mesma entrada de cache que get_user."""
+        user = await self.backend.aget_user(self.user.pk)
+        self.assertEqual(user.email, 'maria@example.com')
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+        invalidate_user(self.user.pk)
+        self.assertIsNone(await cache.aget(user_cache_key(self.user.pk)))
+        self.assertTrue((await self.backend.aget_user(self.user.pk)).profile.newsletter)
+        self.assertIsNone(await self.backend.aget_user(0))
+
+    def test_profile_page_uses_cached_profile(self):
+        """Testa que a página de perfil usa o perfil criado junto com o usuário."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('accounts:profile'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['profile'].user_id, self.user.pk)
+
+
+class OperationalDatabaseTest(TestCase):
+    """
+    Testes para as tabelas do banco operacional.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.router = OperationalRouter()
+
+    @override_settings(OPERATIONAL_DATABASE='operational')
+    def test_operational_models_are_routed_and_migrated_apart(self):
+        """Testa o roteamento das leituras, gravações e migrações para o banco operacional."""
+        for model in (Session, LoginHistory, UserAgent, EmailVerificationToken, WebhookEvent):
+            self.assertEqual(self.router.db_for_write(model), 'operational')
+            self.assertTrue(self.router.allow_migrate('operational', model._meta.app_label, model._meta.model_name))
+            self.assertFalse(self.router.allow_migrate('default', model._meta.app_label, model._meta.model_name))
+
+        self.assertIsNone(self.router.db_for_read(Order))
+        self.assertFalse(self.router.allow_migrate('operational', 'orders', 'order'))
+        self.assertIsNone(self.router.allow_migrate('default', 'orders', 'order'))
+        # Migrações de dados sem modelo indicado não rodam no banco operacional
+        self.assertFalse(self.router.allow_migrate('operational', 'accounts'))
+
+        # O usuário de um registro operacional é lido do banco principal
+        token = EmailVerificationToken(user_id=self.user.pk)
+        token._state.db = 'operational'
+        self.assertEqual(self.router.db_for_read(User, instance=token), 'default')
+        self.assertTrue(self.router.allow_relation(token, self.user))
+
+    @override_settings(OPERATIONAL_DATABASE='operational')
+    def test_migrate_refuses_empty_operational_database(self):
+        """Testa a verificação que exige copy_operational_tables antes de migrar o banco operacional."""
+        with mock.patch('core.checks.connections', {'operational': connection}):
+            self.assertEqual(check_operational_schema(databases=['default']), [])
+            self.assertEqual(check_operational_schema(databases=['operational']), [])
+            with mock.patch.object(MigrationRecorder, 'has_table', return_value=False):
+                errors = check_operational_schema(databases=['operational'])
+        self.assertEqual([error.id for error in errors], ['core.E011'])
+
+    def test_deleting_user_removes_operational_records(self):
+        """Testa que os tokens e o histórico do usuário são apagados depois do commit."""
+        EmailVerificationToken.objects.create(user=self.user)
+        LoginHistory.objects.create(user=self.user, username='maria@example.com')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        self.assertFalse(EmailVerificationToken.objects.exists())
+        self.assertFalse(LoginHistory.objects.exists())
@@ -17,7 +17,7 @@ from django.views.decorators.cache import never_cache
 from django.utils import timezone
 import json
 
-from .models import Profile, Address, EmailVerificationToken
+from .models import Address, EmailVerificationToken
 from .forms import (
     CustomUserCreationForm, ProfileForm, AddressForm,
     CustomPasswordChangeForm, PreferencesForm
@@ -52,9 +52,6 @@ class RegisterView(CreateView):
     def form_valid(self, form):
         response = super().form_valid(form)
         
-        # Create user profile
-        Profile.objects.get_or_create(user=self.object)
-        
         # Auto login after registration
         username = form.cleaned_data.get('username') or form.cleaned_data.get('email')
         password = form.cleaned_data.get('password1')
@@ -131,13 +128,11 @@ class ProfileView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         
-        # Ensure profile exists
-        profile, created = Profile.objects.get_or_create(user=user)
-        
         context.update({
-            'profile': profile,
+            'profile': user.profile,
             'addresses': user.addresses.all(),
             'recent_orders': user.orders.all()[:5] if hasattr(user, 'orders') else [],
+            'order_count': user.orders.count() + user.archived_orders.count(),
         })
         return context
 
@@ -147,7 +142,7 @@ class UpdateProfileView(LoginRequiredMixin, View):
     
     def post(self, request):
         user = request.user
-        profile, created = Profile.objects.get_or_create(user=user)
+        profile = user.profile
         
         # Update user fields
         user.first_name = request.POST.get('first_name', '')
@@ -170,7 +165,7 @@ class UpdatePreferencesView(LoginRequiredMixin, View):
     """Update user preferences"""
     
     def post(self, request):
-        profile, created = Profile.objects.get_or_create(user=request.user)
+        profile = request.user.profile
         
         # Update preferences
         profile.email_notifications = 'email_notifications' in request.POST
@@ -293,9 +288,7 @@ class ConfirmEmailView(View):
                 return redirect('accounts:email_verification')
             
             # Mark email as verified
-            profile, created = Profile.objects.get_or_create(
-                user=verification_token.user
-            )
+            profile = verification_token.user.profile
             profile.email_verified = True
             profile.save()
             
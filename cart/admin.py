@@ -1,3 +1,26 @@
 from django.contrib import admin
 
-# Register your models here.
\ No newline at end of file
+from core.admin import LargeTableAdmin
+from .models import Cart, CartItem
+
+
+class CartItemInline(admin.TabularInline):
+    """
+    Inline para itens no admin do carrinho
+    """
+    model = CartItem
+    extra = 0
+    autocomplete_fields = ('product',)
+
+
+@admin.register(Cart)
+class CartAdmin(LargeTableAdmin):
+    """
+    Admin para carrinhos persistentes
+    """
+    list_display = ('__str__', 'user', 'session_key', 'updated_at')
+    list_select_related = ('user',)
+    search_fields = ('user__email__exact',)
+    search_help_text = 'E-mail do cliente exato'
+    autocomplete_fields = ('user',)
+    inlines = (CartItemInline,)
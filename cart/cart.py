@@ -1,5 +1,6 @@
 from decimal import Decimal
 from django.conf import settings
+from store.cache import aget_version, get_version
 from store.models import Product
 
 
@@ -19,6 +20,85 @@ class Cart:
             cart = self.session[settings.CART_SESSION_ID] = {}
         self.cart = cart
 
+        # Reajustes em lote incrementam a versão 'prices' do catálogo
+        prices_version = get_version('prices')
+        if self.session.get(self.prices_version_key) != prices_version:
+            if self.cart:
+                self.refresh_prices()
+            self.session[self.prices_version_key] = prices_version
+
+    @classmethod
+    async def acreate(cls, request):
+        """
+        Versão assíncrona do construtor, para views ASGI.
+
+        Sessão, cache e banco são acessados pelas APIs assíncronas.
+        """
+        cart = cls.__new__(cls)
+        cart.session = request.session
+        data = await cart.session.aget(settings.CART_SESSION_ID)
+        if not data:
+            data = {}
+            await cart.session.aset(settings.CART_SESSION_ID, data)
+        cart.cart = data
+
+        prices_version = await aget_version('prices')
+        if await cart.session.aget(cart.prices_version_key) != prices_version:
+            if cart.cart:
+                await cart.arefresh_prices()
+            await cart.session.aset(cart.prices_version_key, prices_version)
+        return cart
+
+    @property
+    def prices_version_key(self):
+        return f"{settings.CART_SESSION_ID}_prices_version"
+
+    def refresh_prices(self):
+        """
+        Atualiza os preços guardados na sessão com os preços atuais dos produtos.
+        """
+        prices = Product.objects.filter(id__in=self.cart.keys()).values_list('id', 'price')
+        for product_id, price in prices:
+            self.cart[str(product_id)]['price'] = str(price)
+        self.save()
+
+    async def arefresh_prices(self):
+        """
+        Versão assíncrona de ``refresh_prices``.
+        """
+        prices = Product.objects.filter(id__in=self.cart.keys()).values_list('id', 'price')
+        async for product_id, price in prices:
+            self.cart[str(product_id)]['price'] = str(price)
+        self.save()
+
+    async def asummary(self):
+        """
+        Resumo do carrinho para a API (uma consulta, apenas id e nome dos produtos).
+        """
+        names = {
+            str(product_id): name
+            async for product_id, name in Product.objects.filter(
+                id__in=self.cart.keys()
+            ).values_list('id', 'name')
+        }
+        items = []
+        for product_id, item in self.cart.items():
+            if product_id not in names:
+                continue
+            price = Decimal(item['price'])
+            items.append({
+                'product_id': int(product_id),
+                'product_name': names[product_id],
+                'quantity': item['quantity'],
+                'price': float(price),
+                'total_price': float(price * item['quantity']),
+            })
+        return {
+            'total_items': len(self),
+            'total_price': float(self.get_total_price()),
+            'items': items,
+        }
+
     def add(self, product, quantity=1, override_quantity=False):
         """
         Adiciona um produto ao carrinho ou atualiza sua quantidade.
@@ -59,7 +139,8 @@ class Cart:
         product_ids = self.cart.keys()
         # Obtém os objetos produto e os adiciona ao carrinho
         products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
+        # Copia os itens para não gravar objetos não serializáveis na sessão
+        cart = {product_id: item.copy() for product_id, item in self.cart.items()}
         
         for product in products:
             cart[str(product.id)]['product'] = product
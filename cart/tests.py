@@ -1,3 +1,43 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from decimal import Decimal
 
-# Create your tests here.
\ No newline at end of file
+from store.cache import bump_versions
+from store.models import Category, Product
+
+
+class CartSummaryTest(TestCase):
+    """
+    Testes para a API assíncrona de resumo do carrinho.
+    """
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.product = Product.objects.create(
+            name='Smartphone',
+            slug='smartphone',
+            sku='SMART001',
+            category=category,
+            description='Descrição',
+            price=Decimal('100.00'),
+            stock_quantity=10,
+        )
+
+    async def test_summary_reads_session_and_refreshes_prices(self):
+        """Testa o resumo a partir da sessão e a atualização de preços após reajuste."""
+        url = reverse('cart:cart_summary')
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json(), {'total_items': 0, 'total_price': 0.0, 'items': []})
+
+        await self.async_client.post(reverse('cart:cart_add', args=[self.product.id]), {'quantity': 2})
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json()['total_items'], 2)
+        self.assertEqual(response.json()['items'][0]['product_name'], 'Smartphone')
+        self.assertEqual(response.json()['total_price'], 200.0)
+
+        await Product.objects.filter(pk=self.product.pk).aupdate(price=Decimal('90.00'))
+        bump_versions('prices', ['all'])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json()['total_price'], 180.0)
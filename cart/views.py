@@ -34,7 +34,7 @@ def cart_add(request, product_id):
         quantity = 1
     
     # Verificar se há estoque suficiente
-    if product.track_stock and product.stock_quantity < quantity:
+    if product.track_stock and product.current_stock < quantity:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success': False,
@@ -100,7 +100,7 @@ def cart_update(request, product_id):
         quantity = 1
     
     # Verificar estoque
-    if product.track_stock and product.stock_quantity < quantity:
+    if product.track_stock and product.current_stock < quantity:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success': False,
@@ -138,20 +138,11 @@ def cart_clear(request):
     return redirect('cart:cart_detail')
 
 
-def cart_summary(request):
-    """Retorna resumo do carrinho em JSON para AJAX"""
-    cart = Cart(request)
-    return JsonResponse({
-        'total_items': len(cart),
-        'total_price': float(cart.get_total_price()),
-        'items': [
-            {
-                'product_id': item['product'].id,
-                'product_name': item['product'].name,
-                'quantity': item['quantity'],
-                'price': float(item['price']),
-                'total_price': float(item['total_price'])
-            }
-            for item in cart
-        ]
-    })
\ No newline at end of file
+async def cart_summary(request):
+    """
+    Retorna resumo do carrinho em JSON para AJAX.
+
+    View assíncrona: sob ASGI a leitura da sessão e dos produtos não ocupa uma thread.
+    """
+    cart = await Cart.acreate(request)
+    return JsonResponse(await cart.asummary())
\ No newline at end of file
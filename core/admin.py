@@ -1,3 +1,13 @@
 from django.contrib import admin
 
-# Register your models here.
+from .paginator import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Base para admins de tabelas grandes: total estimado na paginação e sem
+    a segunda contagem (total sem filtros) nas buscas.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
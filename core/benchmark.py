@@ -0,0 +1,57 @@
+"""
+Teste de carga simples para comparar o mesmo endpoint nos servidores WSGI e ASGI.
+
+``concurrency`` clientes simultâneos (threads, cada uma com sua sessão HTTP
+keep-alive e seus cookies) fazem ``total`` requisições; uma rodada de
+aquecimento com uma requisição por cliente cria as sessões e abre as
+conexões antes da medição.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import math
+import threading
+import time
+
+import requests
+
+
+def percentile(values, fraction):
+    """Percentil pelo método do posto mais próximo (``values`` ordenados)"""
+    if not values:
+        return None
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def run_load(url, total, concurrency, timeout=10.0):
+    """
+    Mede vazão e latência de um endpoint.
+
+    Returns:
+        dict: Requisições, erros, requisições por segundo e latências p50/p99 (ms)
+    """
+    local = threading.local()
+
+    def fetch(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = session.get(url, timeout=timeout).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(fetch, range(concurrency)))
+        started = time.perf_counter()
+        results = list(executor.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, ok in results if ok)
+    return {
+        'requests': total,
+        'errors': total - len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+    }
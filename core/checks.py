@@ -0,0 +1,124 @@
+"""
+Verificações do perfil de produção (``ecommerce.performance_settings``).
+
+Rodam com ``python manage.py check --deploy`` e só valem quando
+``PRODUCTION_PROFILE`` está ligado. Além da configuração, testam a conexão
+com cada banco e com o Redis: o ``docker-entrypoint.sh`` roda a verificação
+antes de iniciar os servidores, de modo que um erro de configuração derruba
+o container na subida em vez de aparecer na primeira requisição.
+
+``check_operational_schema`` vale em qualquer perfil e roda com
+``migrate --database operational`` (ou ``check --database operational``):
+num banco operacional ainda vazio, as migrações antigas falhariam ao criar
+chaves estrangeiras para ``accounts_user``.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Error, Tags, register
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.recorder import MigrationRecorder
+
+POSTGRESQL_ENGINE = 'django.db.backends.postgresql'
+REDIS_CACHE_BACKEND = 'django_redis.cache.RedisCache'
+
+
+def _production():
+    return getattr(settings, 'PRODUCTION_PROFILE', False)
+
+
+@register(deploy=True)
+def check_production_settings(app_configs=None, **kwargs):
+    """Configuração dos bancos, do pool de conexões, do cache e das sessões"""
+    if not _production():
+        return []
+
+    errors = []
+    if settings.DEBUG:
+        errors.append(Error('DEBUG está ligado no perfil de produção.', hint='Remova DEBUG=True do ambiente.', id='core.E001'))
+    if settings.SECRET_KEY.startswith('django-insecure'):
+        errors.append(Error('SECRET_KEY não foi configurada.', hint='Defina SECRET_KEY no ambiente.', id='core.E002'))
+
+    for alias, database in settings.DATABASES.items():
+        if database['ENGINE'] != POSTGRESQL_ENGINE:
+            errors.append(Error(
+                f"O banco '{alias}' não é PostgreSQL ({database['ENGINE']}).",
+                hint='Configure DATABASE_URL (e as URLs das réplicas e do banco operacional) com postgres://.',
+                id='core.E003',
+            ))
+
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        errors.append(Error(
+            'O pool de conexões precisa do psycopg 3 com psycopg-pool.',
+            hint="Instale 'psycopg[binary,pool]' (requirements.txt).",
+            id='core.E004',
+        ))
+
+    if settings.DATABASE_POOL_MAX_SIZE < settings.WEB_THREADS:
+        errors.append(Error(
+            f'O pool ({settings.DATABASE_POOL_MAX_SIZE} conexões) é menor que o número de '
+            f'threads por worker ({settings.WEB_THREADS}).',
+            hint='Aumente DATABASE_POOL_MAX_SIZE ou reduza WEB_THREADS.',
+            id='core.E005',
+        ))
+    processes = settings.WEB_CONCURRENCY + settings.ASGI_WORKERS
+    if processes * settings.DATABASE_POOL_MAX_SIZE > settings.DATABASE_MAX_CONNECTIONS:
+        errors.append(Error(
+            f'{processes} processos com até {settings.DATABASE_POOL_MAX_SIZE} conexões cada '
+            f'excedem DATABASE_MAX_CONNECTIONS ({settings.DATABASE_MAX_CONNECTIONS}).',
+            hint='Reduza WEB_CONCURRENCY, ASGI_WORKERS ou DATABASE_POOL_MAX_SIZE.',
+            id='core.E006',
+        ))
+
+    for alias in ('default', settings.SESSION_CACHE_ALIAS):
+        if settings.CACHES.get(alias, {}).get('BACKEND') != REDIS_CACHE_BACKEND:
+            errors.append(Error(f"O cache '{alias}' não usa Redis.", id='core.E007'))
+    if settings.SESSION_ENGINE != 'django.contrib.sessions.backends.cache':
+        errors.append(Error('As sessões não estão no cache Redis.', id='core.E008'))
+    return errors
+
+
+@register(deploy=True)
+def check_production_connections(app_configs=None, **kwargs):
+    """Conexão com cada banco e com o Redis"""
+    if not _production():
+        return []
+
+    errors = []
+    for alias in settings.DATABASES:
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception as e:
+            errors.append(Error(f"Sem conexão com o banco '{alias}': {str(e)}", id='core.E009'))
+        finally:
+            connection.close()
+
+    for alias, cache in settings.CACHES.items():
+        if cache.get('BACKEND') != REDIS_CACHE_BACKEND:
+            continue
+        try:
+            caches[alias].client.get_client(write=True).ping()
+        except Exception as e:
+            errors.append(Error(f"Sem conexão com o Redis do cache '{alias}': {str(e)}", id='core.E010'))
+    return errors
+
+
+@register(Tags.database)
+def check_operational_schema(app_configs=None, databases=None, **kwargs):
+    """Banco operacional criado com ``copy_operational_tables``"""
+    alias = settings.OPERATIONAL_DATABASE
+    if alias == DEFAULT_DB_ALIAS or alias not in (databases or ()):
+        return []
+
+    recorder = MigrationRecorder(connections[alias])
+    if recorder.has_table() and recorder.migration_qs.exists():
+        return []
+    return [Error(
+        f"O banco operacional '{alias}' ainda não foi criado.",
+        hint='Rode python manage.py copy_operational_tables antes de migrate --database operational.',
+        id='core.E011',
+    )]
@@ -0,0 +1,225 @@
+"""
+Cliente HTTP compartilhado para a API do Mercado Pago.
+
+Um único cliente por processo mantém as conexões abertas (keep-alive) em um
+pool, aplica timeouts explícitos e um número limitado de novas tentativas, e
+usa um disjuntor (circuit breaker) para falhar rapidamente enquanto o gateway
+estiver instável, em vez de prender todos os workers esperando respostas.
+"""
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+import logging
+import threading
+import time
+import uuid
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayError(Exception):
+    """Erro de comunicação com o gateway de pagamento."""
+
+
+class CircuitOpenError(GatewayError):
+    """Chamada recusada porque o disjuntor está aberto."""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor simples: abre após ``failure_threshold`` falhas consecutivas e,
+    passado ``reset_timeout`` segundos, libera uma chamada de teste.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """Indica se uma chamada pode ser feita agora."""
+        with self._lock:
+            state = self.state
+            if state == 'half_open':
+                # Libera apenas uma chamada de teste por janela
+                self.opened_at = time.monotonic()
+                return True
+            return state == 'closed'
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning('Disjuntor do gateway de pagamento aberto')
+                self.opened_at = time.monotonic()
+
+
+class GatewayClient:
+    """
+    Cliente da API do Mercado Pago com pool de conexões.
+
+    As respostas seguem o formato do SDK oficial:
+    ``{"status": <código HTTP>, "response": <corpo JSON>}``.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, access_token, base_url='https://api.mercadopago.com',
+                 timeout=(3.05, 10), max_retries=2, pool_size=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+
+        retry = Retry(
+            total=max_retries,
+            status_forcelist=self.RETRY_STATUSES,
+            # POST também é repetido: as criações enviam X-Idempotency-Key
+            allowed_methods=frozenset(['GET', 'POST', 'PUT']),
+            backoff_factor=0.2,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': 'application/json',
+        })
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'rejected': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0,
+        }
+
+    def request(self, method, path, json=None, timeout=None, headers=None):
+        """
+        Executa uma chamada à API.
+
+        Raises:
+            CircuitOpenError: Se o disjuntor estiver aberto
+            GatewayError: Em falhas de rede ou timeout
+        """
+        if not self.breaker.allow():
+            self._count(rejected=1)
+            raise CircuitOpenError('Gateway de pagamento indisponível no momento')
+
+        start = time.monotonic()
+        try:
+            api_result = self.session.request(
+                method,
+                f'{self.base_url}{path}',
+                json=json,
+                headers=headers,
+                timeout=timeout or self.timeout,
+            )
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            self._count(errors=1, latency=time.monotonic() - start)
+            raise GatewayError(str(e)) from e
+
+        latency = time.monotonic() - start
+        if api_result.status_code >= 500:
+            self.breaker.record_failure()
+            self._count(errors=1, latency=latency)
+        else:
+            self.breaker.record_success()
+            self._count(latency=latency)
+
+        response = {'status': api_result.status_code, 'response': None}
+        if api_result.content:
+            try:
+                response['response'] = api_result.json()
+            except ValueError:
+                pass
+        return response
+
+    def create_preference(self, preference_data, timeout=None, idempotency_key=None):
+        """
+        Cria uma preferência de pagamento (checkout).
+
+        Chamadas com a mesma ``idempotency_key`` devolvem a mesma preferência.
+        """
+        return self.request(
+            'POST',
+            '/checkout/preferences',
+            json=preference_data,
+            timeout=timeout,
+            headers={'X-Idempotency-Key': idempotency_key or uuid.uuid4().hex},
+        )
+
+    def get_payment(self, payment_id, timeout=None):
+        """Consulta um pagamento pelo ID."""
+        return self.request('GET', f'/v1/payments/{payment_id}', timeout=timeout)
+
+    def stats(self):
+        """Retorna os contadores de chamadas, erros e latência do processo."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        completed = stats['requests']
+        stats['avg_latency'] = stats['total_latency'] / completed if completed else 0.0
+        stats['circuit_state'] = self.breaker.state
+        return stats
+
+    def _count(self, errors=0, rejected=0, latency=None):
+        with self._stats_lock:
+            self._stats['errors'] += errors
+            self._stats['rejected'] += rejected
+            if latency is not None:
+                self._stats['requests'] += 1
+                self._stats['total_latency'] += latency
+                self._stats['max_latency'] = max(self._stats['max_latency'], latency)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gateway_client():
+    """Retorna o cliente do gateway compartilhado pelo processo."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GatewayClient(
+                    access_token=settings.MERCADOPAGO_ACCESS_TOKEN,
+                    base_url=settings.MERCADOPAGO_API_URL,
+                    timeout=(settings.MERCADOPAGO_CONNECT_TIMEOUT, settings.MERCADOPAGO_READ_TIMEOUT),
+                    max_retries=settings.MERCADOPAGO_MAX_RETRIES,
+                    pool_size=settings.MERCADOPAGO_POOL_SIZE,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.MERCADOPAGO_BREAKER_THRESHOLD,
+                        reset_timeout=settings.MERCADOPAGO_BREAKER_RESET_TIMEOUT,
+                    ),
+                )
+    return _client
+
+
+def reset_gateway_client():
+    """Descarta o cliente compartilhado (usado em testes e após mudar configurações)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.session.close()
+        _client = None
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from core.benchmark import run_load
+
+
+class Command(BaseCommand):
+    help = 'Compara requisições por segundo e p99 dos endpoints JSON nos servidores WSGI e ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sync-url',
+            default='http://127.0.0.1:8000',
+            help='Endereço do servidor WSGI'
+        )
+        parser.add_argument(
+            '--async-url',
+            default='http://127.0.0.1:8001',
+            help='Endereço do servidor ASGI'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Caminho testado (pode ser repetido; padrão: sugestões de busca e resumo do carrinho)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Requisições por endpoint e servidor'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Clientes simultâneos'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=10.0,
+            help='Tempo limite de cada requisição, em segundos'
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [
+            reverse('store:search_suggestions') + '?q=sma',
+            reverse('cart:cart_summary'),
+        ]
+        servers = [('wsgi', options['sync_url']), ('asgi', options['async_url'])]
+
+        for path in paths:
+            self.stdout.write(path)
+            results = {}
+            for name, base_url in servers:
+                result = results[name] = run_load(
+                    base_url.rstrip('/') + path,
+                    total=options['requests'],
+                    concurrency=options['concurrency'],
+                    timeout=options['timeout'],
+                )
+                if result['p99'] is None:
+                    self.stdout.write(self.style.ERROR(f"  {name}: todas as requisições falharam"))
+                    continue
+                self.stdout.write(
+                    f"  {name}: {result['rps']:.1f} req/s  p50 {result['p50']:.1f} ms  "
+                    f"p99 {result['p99']:.1f} ms  erros {result['errors']}"
+                )
+            if results['wsgi']['rps'] and results['asgi']['rps']:
+                self.stdout.write(f"  asgi/wsgi: {results['asgi']['rps'] / results['wsgi']['rps']:.2f}x")
+
+        self.stdout.write(self.style.SUCCESS('Benchmark concluído.'))
@@ -0,0 +1,109 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.recorder import MigrationRecorder
+
+from core.operational import is_operational
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria as tabelas do banco operacional a partir dos modelos, copia as '
+        'linhas do banco principal e registra as migrações (ver core.operational)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Quantidade de linhas copiadas por consulta'
+        )
+
+    def handle(self, *args, **options):
+        alias = settings.OPERATIONAL_DATABASE
+        if alias == DEFAULT_DB_ALIAS:
+            raise CommandError('OPERATIONAL_DATABASE_URL não está configurada.')
+
+        target = connections[alias]
+        recorder = MigrationRecorder(target)
+        if recorder.has_table() and recorder.migration_qs.exists():
+            # Já criado: as migrações novas seguem com migrate --database operational
+            self.stdout.write(self.style.SUCCESS('O banco operacional já foi criado.'))
+            return
+
+        # Modelos com chave estrangeira para outro modelo operacional vão por
+        # último (LoginHistory depois de UserAgent)
+        models = sorted(
+            (model for model in apps.get_models() if is_operational(model)),
+            key=lambda model: any(
+                field.is_relation and is_operational(field.related_model)
+                for field in model._meta.concrete_fields
+            )
+        )
+        # Tabelas que já existirem no banco operacional são mantidas como estão
+        target_tables = set(target.introspection.table_names())
+        models = [model for model in models if model._meta.db_table not in target_tables]
+        source = connections[DEFAULT_DB_ALIAS]
+        source_tables = set(source.introspection.table_names())
+
+        # As migrações antigas criam chaves estrangeiras para accounts_user, que
+        # não existe aqui: as tabelas saem do estado atual dos modelos. O editor
+        # roda em uma transação, com a cópia antes dos índices (SQL adiado)
+        with target.schema_editor() as editor:
+            for model in models:
+                editor.create_model(model)
+
+            for model in models:
+                table = model._meta.db_table
+                if table not in source_tables:
+                    continue
+                copied = self.copy_table(model, source, target, options['batch_size'])
+                self.stdout.write(f"  {table}: {copied} linhas copiadas")
+
+            sequences = target.ops.sequence_reset_sql(no_style(), models)
+            if sequences:
+                with target.cursor() as cursor:
+                    for sql in sequences:
+                        cursor.execute(sql)
+
+        call_command('migrate', database=alias, fake=True, verbosity=0)
+        self.stdout.write(self.style.SUCCESS('Banco operacional criado.'))
+
+    def copy_table(self, model, source, target, batch_size):
+        """Copia a tabela em lotes pela chave primária, com os valores crus do banco"""
+        columns = [field.column for field in model._meta.concrete_fields]
+        pk = model._meta.pk.column
+        quote = source.ops.quote_name
+        select = (
+            f"SELECT {', '.join(quote(column) for column in columns)} "
+            f"FROM {quote(model._meta.db_table)}"
+        )
+        order = f" ORDER BY {quote(pk)} LIMIT {int(batch_size)}"
+        after = f" WHERE {quote(pk)} > %s"
+        quote = target.ops.quote_name
+        insert = (
+            f"INSERT INTO {quote(model._meta.db_table)} "
+            f"({', '.join(quote(column) for column in columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})"
+        )
+
+        copied = 0
+        last = None
+        pk_index = columns.index(pk)
+        while True:
+            with source.cursor() as cursor:
+                if last is None:
+                    cursor.execute(select + order)
+                else:
+                    cursor.execute(select + after + order, [last])
+                rows = cursor.fetchall()
+            if not rows:
+                return copied
+            with target.cursor() as cursor:
+                cursor.executemany(insert, rows)
+            copied += len(rows)
+            last = rows[-1][pk_index]
@@ -0,0 +1,81 @@
+"""
+Banco de dados operacional.
+
+Sessões, histórico de logins, tokens de verificação de e-mail e a fila de
+webhooks recebem gravações pequenas e constantes. Com
+``OPERATIONAL_DATABASE_URL`` configurada, essas tabelas ficam no alias
+``operational``, fora do banco principal: o WAL e o vacuum delas não
+disputam o banco com o checkout, e uma falha no banco operacional não
+impede a criação de pedidos.
+
+Os avisos de pedidos (``OrderNotification``) e o histórico de transições
+(``OrderTransition``) continuam no banco principal: são gravados na mesma
+transação do pedido, e essa garantia se perderia em outro banco.
+
+As referências dos modelos operacionais aos usuários não têm chave
+estrangeira no banco; os registros de um usuário apagado são removidos pelo
+sinal ``post_delete`` (``accounts.signals``). Consultas não podem fazer join
+entre os dois bancos: use ``prefetch_related`` no lugar de ``select_related``.
+
+Migrações: ``migrate`` aplica as migrações das tabelas operacionais apenas
+no banco operacional, que é migrado à parte (``migrate --database
+operational``). O banco operacional é criado por ``copy_operational_tables``,
+que cria as tabelas a partir dos modelos, copia as linhas do banco principal
+e registra as migrações: as migrações iniciais criam chaves estrangeiras para
+``accounts_user`` e não rodam nesse banco (``core.checks`` impede o
+``migrate`` em um banco operacional vazio).
+Sem a URL configurada, tudo fica no banco principal.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Modelos gravados no banco operacional (app_label.model_name)
+OPERATIONAL_MODELS = {
+    'sessions.session',
+    'accounts.loginhistory',
+    'accounts.useragent',
+    'accounts.emailverificationtoken',
+    'orders.webhookevent',
+}
+
+
+def is_operational(model):
+    """Se o modelo fica no banco operacional"""
+    return model._meta.label_lower in OPERATIONAL_MODELS
+
+
+class OperationalRouter:
+    """Modelos operacionais no banco ``OPERATIONAL_DATABASE``; o resto segue para os outros routers"""
+
+    def _db_for(self, model, hints):
+        if is_operational(model):
+            return settings.OPERATIONAL_DATABASE
+        instance = hints.get('instance')
+        if (
+            settings.OPERATIONAL_DATABASE != DEFAULT_DB_ALIAS
+            and instance is not None
+            and instance._state.db == settings.OPERATIONAL_DATABASE
+        ):
+            # Usuário de um registro operacional: fica no banco principal
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_operational(obj1) or is_operational(obj2):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        operational = settings.OPERATIONAL_DATABASE
+        if operational == DEFAULT_DB_ALIAS:
+            return None
+        if model_name is not None and f'{app_label}.{model_name}' in OPERATIONAL_MODELS:
+            return db == operational
+        # Demais modelos e migrações de dados sem modelo indicado
+        return False if db == operational else None
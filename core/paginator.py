@@ -0,0 +1,43 @@
+"""
+Paginação de tabelas grandes sem ``COUNT(*)``.
+
+No PostgreSQL, ``COUNT(*)`` percorre a tabela inteira. Para listagens sem
+filtro o ``EstimatedCountPaginator`` usa a estimativa de linhas mantida
+pelo planejador (``pg_class.reltuples``, atualizada pelo autovacuum); com
+filtros, ou em tabelas pequenas, a contagem continua exata.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimated_row_count(model, using='default'):
+    """Estimativa de linhas da tabela do modelo (None se indisponível)"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+    # -1: tabela ainda não analisada
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator que estima o total de listagens sem filtro em tabelas grandes"""
+
+    # Abaixo disso a contagem exata é barata e evita números aproximados
+    EXACT_COUNT_THRESHOLD = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, using=queryset.db)
+            if estimate is not None and estimate > self.EXACT_COUNT_THRESHOLD:
+                return estimate
+        return super().count
@@ -0,0 +1,170 @@
+"""
+Leituras em réplicas do banco de dados.
+
+``ReplicaRouter`` envia para uma réplica (``DATABASE_REPLICAS``) as leituras
+dos modelos do catálogo e dos relatórios (``REPLICA_APPS``) feitas nas views
+marcadas com ``replica_reads`` ou dentro de ``use_replicas()``. Todo o resto
+(gravações, checkout, carrinho, sessões e usuários) usa o banco principal.
+A réplica é sorteada uma vez por requisição, de modo que a contagem da
+paginação e a página lida vêm do mesmo banco.
+
+Leitura das próprias gravações: quando uma requisição grava no banco,
+``ReplicaMiddleware`` envia o cookie ``DATABASE_PIN_COOKIE``, válido por
+``DATABASE_PRIMARY_PIN_SECONDS`` segundos. Enquanto ele existir, as leituras
+daquele navegador ficam no banco principal, e carrinho, pedidos e estoque não
+aparecem com o atraso da replicação. Depois de uma gravação, as leituras da
+própria requisição também voltam para o principal.
+
+As réplicas não recebem migrações: o esquema e os dados chegam pela
+replicação do banco. Sem réplicas configuradas, nada muda.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+import random
+
+# Apps cujas leituras podem ir para as réplicas (catálogo e tabelas dos relatórios)
+REPLICA_APPS = {'store', 'orders'}
+
+
+class ReadState:
+    """Estado das leituras da requisição (ou do bloco ``use_replicas``) corrente"""
+
+    def __init__(self, pinned=False):
+        self.replica = None
+        self.pinned = pinned
+        self.wrote = False
+
+    def use_replica(self):
+        replicas = settings.DATABASE_REPLICAS
+        if replicas and not self.pinned:
+            self.replica = random.choice(replicas)
+
+
+_state = ContextVar('replica_reads', default=None)
+
+
+def replica_reads(view):
+    """
+    Marca a view para ler o catálogo das réplicas (ver ``ReplicaMiddleware``).
+
+    Em views baseadas em classe: ``@method_decorator(replica_reads, name='dispatch')``.
+    """
+    view.replica_reads = True
+    return view
+
+
+@contextmanager
+def use_replicas():
+    """Envia para uma réplica as leituras do bloco (comandos e relatórios fora de requisições)"""
+    state = ReadState()
+    state.use_replica()
+    token = _state.set(state)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Lê do banco principal dentro do bloco.
+
+    Usado ao preencher caches compartilhados: um dado lido de uma réplica
+    atrasada ficaria no cache depois que a réplica alcançasse o principal.
+    """
+    state = _state.get()
+    replica = state.replica if state is not None else None
+    if state is not None:
+        state.replica = None
+    try:
+        yield
+    finally:
+        if state is not None:
+            state.replica = replica
+
+
+class ReplicaRouter:
+    """Leituras do catálogo e dos relatórios nas réplicas; o resto no banco principal"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return None
+        if model._meta.app_label not in REPLICA_APPS:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas têm os mesmos dados do principal
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Escolhe o banco das leituras de cada requisição.
+
+    Deve ficar depois de ``SessionMiddleware``: a sessão gravada ao fim de
+    toda requisição não conta como gravação do usuário. Funciona nos dois
+    modos: sob ASGI as views assíncronas (SSE, sugestões de busca) não
+    passam por uma thread por causa deste middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = ReadState(pinned=settings.DATABASE_PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin_primary(state, response)
+
+    async def __acall__(self, request):
+        state = ReadState(pinned=settings.DATABASE_PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin_primary(state, response)
+
+    def pin_primary(self, state, response):
+        """Envia o cookie que mantém as leituras no banco principal depois de uma gravação"""
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.DATABASE_PIN_COOKIE,
+                '1',
+                max_age=settings.DATABASE_PRIMARY_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in ('GET', 'HEAD') and getattr(view_func, 'replica_reads', False):
+            _state.get().use_replica()
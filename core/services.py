@@ -1,10 +1,32 @@
-import mercadopago
+from concurrent.futures import ThreadPoolExecutor, wait
 from django.conf import settings
-from decimal import Decimal
+from django.core.cache import cache
+from decimal import Decimal, ROUND_CEILING
 import logging
+from requests.adapters import HTTPAdapter
+import requests
+
+from .gateway import get_gateway_client
 
 logger = logging.getLogger(__name__)
 
+# Pool de threads e sessão HTTP compartilhados pelas cotações de frete
+_quote_executor = ThreadPoolExecutor(
+    max_workers=settings.CORREIOS_QUOTE_WORKERS,
+    thread_name_prefix='correios-quote',
+)
+_correios_session = requests.Session()
+_correios_adapter = HTTPAdapter(pool_maxsize=settings.CORREIOS_QUOTE_WORKERS)
+_correios_session.mount('https://', _correios_adapter)
+_correios_session.mount('http://', _correios_adapter)
+
+# Valores simulados usados quando CORREIOS_API_URL não está configurada
+SIMULATED_QUOTES = {
+    '04014': {'servico': 'SEDEX', 'valor': 25.50, 'prazo': '1-2 dias úteis'},
+    '04510': {'servico': 'PAC', 'valor': 15.80, 'prazo': '3-5 dias úteis'},
+    '04782': {'servico': 'SEDEX 12', 'valor': 35.90, 'prazo': 'Até 12h do próximo dia útil'},
+}
+
 
 class MercadoPagoService:
     """
@@ -12,7 +34,7 @@ class MercadoPagoService:
     """
     
     def __init__(self):
-        self.sdk = mercadopago.SDK(settings.MERCADOPAGO_ACCESS_TOKEN)
+        self.client = get_gateway_client()
     
     def create_preference(self, order):
         """
@@ -72,7 +94,7 @@ class MercadoPagoService:
             }
             
             # Criar preferência
-            preference_response = self.sdk.preference().create(preference_data)
+            preference_response = self.client.create_preference(preference_data)
             
             if preference_response["status"] == 201:
                 logger.info(f"Preferência criada com sucesso para o pedido {order.id}")
@@ -107,7 +129,7 @@ class MercadoPagoService:
             dict: Informações do pagamento
         """
         try:
-            payment_response = self.sdk.payment().get(payment_id)
+            payment_response = self.client.get_payment(payment_id)
             
             if payment_response["status"] == 200:
                 return {
@@ -150,7 +172,8 @@ class MercadoPagoService:
                         
                         if external_reference:
                             # Atualizar status do pedido
-                            from .models import Order, Payment
+                            from orders.models import Order, Payment
+                            from orders.transitions import InvalidTransition, transition_order
                             
                             try:
                                 order = Order.objects.get(id=external_reference)
@@ -167,20 +190,26 @@ class MercadoPagoService:
                                 )
                                 
                                 # Atualizar status baseado no status do pagamento
+                                payment_status = None
                                 if payment["status"] == "approved":
-                                    payment_obj.status = "completed"
-                                    order.payment_status = "paid"
-                                    order.status = "processing"
+                                    payment_status = "completed"
                                 elif payment["status"] == "pending":
-                                    payment_obj.status = "pending"
-                                    order.payment_status = "pending"
+                                    payment_status = "pending"
                                 elif payment["status"] in ["cancelled", "rejected"]:
-                                    payment_obj.status = "failed"
-                                    order.payment_status = "failed"
+                                    payment_status = "failed"
                                 
+                                if payment_status:
+                                    payment_obj.status = payment_status
                                 payment_obj.gateway_response = payment
                                 payment_obj.save()
-                                order.save()
+                                
+                                # Pedido pendente pago passa a confirmado; notificações
+                                # repetidas não gravam nada
+                                if payment_status in ("completed", "failed"):
+                                    try:
+                                        transition_order(order, payment_status=payment_status, source="webhook")
+                                    except InvalidTransition as e:
+                                        logger.warning(f"Webhook ignorado para pedido {order.id}: {e}")
                                 
                                 logger.info(f"Webhook processado para pedido {order.id}")
                                 
@@ -212,13 +241,29 @@ class MercadoPagoService:
 class FreteService:
     """
     Serviço para cálculo de frete via API dos Correios.
+
+    Os serviços dos Correios são cotados em paralelo e o resultado fica em
+    cache por (CEP de origem, prefixo do CEP de destino, faixa de peso, faixa
+    de dimensões). Se a transportadora não responder dentro do prazo, os
+    serviços que faltarem são cotados pela tabela ShippingRate.
     """
-    
+
+    SERVICOS = {
+        '04014': 'SEDEX',
+        '04510': 'PAC',
+        '04782': 'SEDEX 12',
+    }
+
+    # Faixas usadas na chave do cache (a cotação usa o limite superior da faixa)
+    PESO_FAIXA = Decimal('0.5')  # kg
+    DIMENSAO_FAIXA = 5  # cm
+
     def __init__(self):
-        self.base_url = "https://ws.correios.com.br/calculador/v1/calcular-preco-prazo"
+        self.base_url = settings.CORREIOS_API_URL
         self.user = settings.CORREIOS_USER
         self.password = settings.CORREIOS_PASSWORD
-    
+        self.timeout = settings.CORREIOS_QUOTE_TIMEOUT
+
     def calculate_shipping(self, cep_destino, peso, comprimento, altura, largura, valor_declarado=0):
         """
         Calcula o frete para um CEP de destino.
@@ -234,67 +279,63 @@ class FreteService:
         Returns:
             dict: Opções de frete disponíveis
         """
-        import requests
-        
         try:
             # CEP de origem (configurável)
             cep_origem = getattr(settings, 'CORREIOS_CEP_ORIGEM', '01310-100')
-            
-            # Serviços dos Correios
-            servicos = [
-                '04014',  # SEDEX
-                '04510',  # PAC
-                '04782',  # SEDEX 12
-            ]
-            
+
+            peso = self._bucket(peso, self.PESO_FAIXA)
+            comprimento, altura, largura = (
+                self._bucket(medida, self.DIMENSAO_FAIXA)
+                for medida in (comprimento, altura, largura)
+            )
+            cache_key = self._cache_key(cep_origem, cep_destino, peso, comprimento, altura, largura)
+
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            params = {
+                'cepOrigem': cep_origem,
+                'cepDestino': cep_destino,
+                'peso': float(peso),
+                'comprimento': comprimento,
+                'altura': altura,
+                'largura': largura,
+                'valorDeclarado': valor_declarado
+            }
+
+            # Cotar todos os serviços em paralelo, com prazo total limitado
+            futures = {
+                _quote_executor.submit(self._quote_service, servico, params): servico
+                for servico in self.SERVICOS
+            }
+            done, not_done = wait(futures, timeout=self.timeout)
+
             opcoes_frete = []
-            
-            for servico in servicos:
-                params = {
-                    'cepOrigem': cep_origem,
-                    'cepDestino': cep_destino,
-                    'peso': peso,
-                    'comprimento': comprimento,
-                    'altura': altura,
-                    'largura': largura,
-                    'servico': servico,
-                    'valorDeclarado': valor_declarado
-                }
-                
-                # Fazer requisição para API dos Correios
-                # Nota: Esta é uma implementação simplificada
-                # Em produção, usar a API oficial dos Correios
-                
-                # Simulação de resposta para desenvolvimento
-                if servico == '04014':  # SEDEX
-                    opcoes_frete.append({
-                        'servico': 'SEDEX',
-                        'codigo': '04014',
-                        'valor': 25.50,
-                        'prazo': '1-2 dias úteis',
-                        'erro': None
-                    })
-                elif servico == '04510':  # PAC
-                    opcoes_frete.append({
-                        'servico': 'PAC',
-                        'codigo': '04510',
-                        'valor': 15.80,
-                        'prazo': '3-5 dias úteis',
-                        'erro': None
-                    })
-                elif servico == '04782':  # SEDEX 12
-                    opcoes_frete.append({
-                        'servico': 'SEDEX 12',
-                        'codigo': '04782',
-                        'valor': 35.90,
-                        'prazo': 'Até 12h do próximo dia útil',
-                        'erro': None
-                    })
-            
-            return {
+            missing = [futures[future] for future in not_done]
+            for future in done:
+                try:
+                    opcoes_frete.append(future.result())
+                except Exception as e:
+                    logger.warning(f"Erro ao cotar serviço {futures[future]}: {str(e)}")
+                    missing.append(futures[future])
+
+            for future in not_done:
+                future.cancel()
+
+            result = {
                 "success": True,
-                "opcoes": opcoes_frete
+                "opcoes": sorted(opcoes_frete, key=lambda opcao: opcao['valor'])
             }
+
+            if missing:
+                # Resultado parcial: completa com a tabela e não guarda em cache
+                logger.warning(f"Correios sem resposta para {missing}; usando tabela de frete")
+                result["opcoes"].extend(self._fallback_options(peso, cep_destino))
+            else:
+                cache.set(cache_key, result, settings.CORREIOS_QUOTE_CACHE_TTL)
+
+            return result
             
         except Exception as e:
             logger.error(f"Erro ao calcular frete: {str(e)}")
@@ -303,6 +344,55 @@ class FreteService:
                 "error": str(e),
                 "opcoes": []
             }
+
+    def _quote_service(self, servico, params):
+        """Cota um serviço dos Correios"""
+        if not self.base_url:
+            # Simulação de resposta para desenvolvimento
+            return dict(SIMULATED_QUOTES[servico], codigo=servico, erro=None)
+
+        response = _correios_session.get(
+            self.base_url,
+            params=dict(params, servico=servico),
+            auth=(self.user, self.password) if self.user else None,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+        return {
+            'servico': self.SERVICOS[servico],
+            'codigo': servico,
+            'valor': float(data['valor']),
+            'prazo': data['prazo'],
+            'erro': data.get('erro'),
+        }
+
+    def _fallback_options(self, peso, cep_destino):
+        """Opções de frete a partir da tabela ShippingRate (índice em memória)"""
+        from orders.shipping import quote_shipping
+
+        return [
+            {
+                'servico': option['description'],
+                'codigo': f"tabela-{option['id']}",
+                'valor': float(option['cost']),
+                'prazo': f"Até {option['delivery_time']} dias úteis",
+                'erro': None,
+            }
+            for option in quote_shipping(peso, cep_destino)
+        ]
+
+    @staticmethod
+    def _bucket(value, size):
+        """Arredonda o valor para cima até o limite da faixa"""
+        size = Decimal(str(size))
+        return (Decimal(str(value)) / size).to_integral_value(rounding=ROUND_CEILING) * size
+
+    @staticmethod
+    def _cache_key(cep_origem, cep_destino, peso, comprimento, altura, largura):
+        origem = ''.join(filter(str.isdigit, str(cep_origem)))
+        destino = ''.join(filter(str.isdigit, str(cep_destino)))[:5]
+        return f"frete:{origem}:{destino}:{peso}:{comprimento}x{altura}x{largura}"
     
     def calculate_cart_shipping(self, cart, cep_destino):
         """
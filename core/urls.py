@@ -7,4 +7,5 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('sobre/', views.about, name='about'),
     path('contato/', views.contact, name='contact'),
+    path('status/gateway/', views.gateway_status, name='gateway_status'),
 ]
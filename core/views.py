@@ -1,6 +1,12 @@
 from django.shortcuts import render
+from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
 
+from .gateway import get_gateway_client
+from .replicas import replica_reads
 
+
+@replica_reads
 def home(request):
     """
     View da página inicial.
@@ -49,3 +55,11 @@ def contact(request):
     View da página de contato.
     """
     return render(request, 'core/contact.html')
+
+
+@staff_member_required
+def gateway_status(request):
+    """
+    Contadores de chamadas, erros e latência do gateway de pagamento neste processo.
+    """
+    return JsonResponse(get_gateway_client().stats())
@@ -11,9 +11,28 @@ while ! nc -z $DB_HOST $DB_PORT; do
 done
 echo "Banco de dados disponível!"
 
+# Perfil de produção: aborta a subida se a configuração, os bancos ou o Redis
+# tiverem problemas (ver core.checks)
+if [ "$DJANGO_SETTINGS_MODULE" = "ecommerce.performance_settings" ]; then
+  echo "Verificando configuração de produção..."
+  python manage.py check --deploy --fail-level ERROR
+fi
+
+# Servidor ASGI (streams SSE e endpoints JSON assíncronos), ao lado do servidor
+# principal e atrás do mesmo nginx; migrações e estáticos ficam com o principal
+if [ "$SERVER_MODE" = "asgi" ]; then
+  echo "Iniciando servidor ASGI..."
+  exec uvicorn ecommerce.asgi:application --host 0.0.0.0 --port 8001 --workers "${ASGI_WORKERS:-2}"
+fi
+
 # Executa migrações
 echo "Executando migrações..."
 python manage.py migrate --noinput
+if [ -n "$OPERATIONAL_DATABASE_URL" ]; then
+  # Cria o banco operacional na primeira subida (não faz nada depois)
+  python manage.py copy_operational_tables
+  python manage.py migrate --database operational --noinput
+fi
 
 # Coleta arquivos estáticos
 echo "Coletando arquivos estáticos..."
@@ -39,4 +58,9 @@ else:
 
 # Inicia o servidor
 echo "Iniciando servidor Django..."
+if [ "$DJANGO_SETTINGS_MODULE" = "ecommerce.performance_settings" ]; then
+  # O pool de conexões é dimensionado pelos mesmos WEB_CONCURRENCY e WEB_THREADS
+  exec gunicorn ecommerce.wsgi:application --bind 0.0.0.0:8000 \
+    --workers "${WEB_CONCURRENCY:-2}" --threads "${WEB_THREADS:-4}"
+fi
 exec python manage.py runserver 0.0.0.0:8000
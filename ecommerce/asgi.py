@@ -3,6 +3,14 @@ ASGI config for ecommerce project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Em produção o nginx encaminha para este servidor as conexões longas
+(stream SSE de status dos pedidos) e os endpoints JSON assíncronos
+(sugestões de busca e resumo do carrinho); o restante continua no WSGI:
+
+    uvicorn ecommerce.asgi:application --host 0.0.0.0 --port 8001
+
+O comando ``benchmark_endpoints`` compara os dois servidores.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -1,171 +1,121 @@
-# Configurações de Performance para Produção
-# Este arquivo contém configurações otimizadas para performance em produção
+"""
+Configurações de produção.
+
+Use com ``DJANGO_SETTINGS_MODULE=ecommerce.performance_settings``. Parte das
+configurações de ``ecommerce.settings`` (com ``DEBUG`` desligado por padrão,
+o que já seleciona Redis para cache, sessões, contadores e eventos) e
+acrescenta:
+
+- pool de conexões do psycopg 3 (opção ``pool`` do Django 5.1+) em cada
+  banco PostgreSQL, dimensionado pelo número de threads de cada worker;
+  as conexões são verificadas antes de sair do pool;
+- ``statement_timeout`` por conexão, mais curto no banco operacional, para
+  que um banco lento não prenda os workers do checkout;
+- loader de templates em cache e sessões em um alias Redis próprio.
+
+``python manage.py check --deploy`` valida a configuração e a conexão com os
+bancos e o Redis (``core.checks``); o ``docker-entrypoint.sh`` roda a
+verificação antes de iniciar os servidores e aborta se houver erros.
+
+Comandos em lote (exportação, arquivamento) podem precisar de consultas mais
+longas: rode-os com ``DATABASE_STATEMENT_TIMEOUT=0``.
+"""
+import os
+
+os.environ.setdefault('DEBUG', 'False')
+
+from .settings import *  # noqa: E402,F401,F403
+from .settings import CACHES, DATABASES, TEMPLATES, config  # noqa: E402
+
+PRODUCTION_PROFILE = True
+
+# Workers e threads do gunicorn (WEB_CONCURRENCY também é lida pelo gunicorn)
+# e workers do servidor ASGI; o pool é por processo
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=2, cast=int)
+WEB_THREADS = config('WEB_THREADS', default=4, cast=int)
+ASGI_WORKERS = config('ASGI_WORKERS', default=2, cast=int)
+
+# Conexões por processo: uma por thread, mais uma para os callbacks on_commit
+# e threads auxiliares (buffer de logins, preferências de pagamento)
+DATABASE_POOL_MIN_SIZE = config('DATABASE_POOL_MIN_SIZE', default=2, cast=int)
+DATABASE_POOL_MAX_SIZE = config('DATABASE_POOL_MAX_SIZE', default=WEB_THREADS + 1, cast=int)
+# Segundos de espera por uma conexão livre antes de a requisição falhar
+DATABASE_POOL_TIMEOUT = config('DATABASE_POOL_TIMEOUT', default=10.0, cast=float)
+# Conexões que cada servidor PostgreSQL aceita desta aplicação (todos os processos)
+DATABASE_MAX_CONNECTIONS = config('DATABASE_MAX_CONNECTIONS', default=80, cast=int)
+
+# Tempo máximo de cada consulta (ms; 0 desliga)
+DATABASE_STATEMENT_TIMEOUT = config('DATABASE_STATEMENT_TIMEOUT', default=5000, cast=int)
+OPERATIONAL_STATEMENT_TIMEOUT = config('OPERATIONAL_STATEMENT_TIMEOUT', default=2000, cast=int)
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    # core.checks acusa a falta do psycopg 3
+    ConnectionPool = None
+
+
+def pooled(database, statement_timeout):
+    """Configura o pool e o timeout de consultas de um banco PostgreSQL"""
+    if database['ENGINE'] != 'django.db.backends.postgresql':
+        return database
+    pool = {
+        'min_size': DATABASE_POOL_MIN_SIZE,
+        'max_size': DATABASE_POOL_MAX_SIZE,
+        'timeout': DATABASE_POOL_TIMEOUT,
+    }
+    if ConnectionPool is not None:
+        pool['check'] = ConnectionPool.check_connection
+    options = dict(database.get('OPTIONS', {}))
+    options['pool'] = pool
+    options['options'] = f'-c statement_timeout={statement_timeout}'
+    # O pool mantém as conexões: conexões persistentes do Django não são suportadas
+    return dict(database, OPTIONS=options, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+
+
+for alias in DATABASES:
+    DATABASES[alias] = pooled(
+        DATABASES[alias],
+        OPERATIONAL_STATEMENT_TIMEOUT if alias == 'operational' else DATABASE_STATEMENT_TIMEOUT,
+    )
+
+# Cache e sessões em bancos Redis separados: o cache pode descartar chaves
+# (falhas viram cache miss); as sessões não
+REDIS_URL = config('REDIS_URL', default='redis://127.0.0.1:6379/1')
+REDIS_SESSIONS_URL = config('REDIS_SESSIONS_URL', default='redis://127.0.0.1:6379/2')
+REDIS_OPTIONS = {
+    'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+    'SOCKET_CONNECT_TIMEOUT': 1,
+    'SOCKET_TIMEOUT': 1,
+    'CONNECTION_POOL_KWARGS': {'max_connections': WEB_THREADS * 2, 'health_check_interval': 30},
+}
 
-# Cache Configuration
 CACHES = {
+    **CACHES,
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': 'redis://redis:6379/1',
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-            'COMPRESSOR': 'django_redis.compressors.zlib.ZlibCompressor',
-            'IGNORE_EXCEPTIONS': True,
-        },
-        'TIMEOUT': 300,  # 5 minutos
+        'LOCATION': REDIS_URL,
         'KEY_PREFIX': 'ecommerce',
-        'VERSION': 1,
+        'OPTIONS': dict(REDIS_OPTIONS, IGNORE_EXCEPTIONS=True),
     },
     'sessions': {
         'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': 'redis://redis:6379/2',
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-        },
-        'TIMEOUT': 86400,  # 24 horas
+        'LOCATION': REDIS_SESSIONS_URL,
         'KEY_PREFIX': 'sessions',
-    }
+        'OPTIONS': REDIS_OPTIONS,
+    },
 }
 
-# Session Configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'sessions'
-SESSION_COOKIE_AGE = 86400  # 24 horas
-SESSION_SAVE_EVERY_REQUEST = False
-
-# Database Optimization
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'ecommerce_db',
-        'USER': 'ecommerce_user',
-        'PASSWORD': 'your_password',
-        'HOST': 'db',
-        'PORT': '5432',
-        'OPTIONS': {
-            'MAX_CONNS': 20,
-            'OPTIONS': {
-                'MAX_CONNS': 20,
-            }
-        },
-        'CONN_MAX_AGE': 600,  # 10 minutos
-    }
-}
 
-# Static Files Optimization
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-
-# Media Files (para produção, usar CDN)
-DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
-AWS_STORAGE_BUCKET_NAME = 'your-bucket-name'
-AWS_S3_REGION_NAME = 'us-east-1'
-AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
-AWS_DEFAULT_ACL = 'public-read'
-
-# Email Configuration (para produção)
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
-EMAIL_HOST_USER = 'your-email@gmail.com'
-EMAIL_HOST_PASSWORD = 'your-app-password'
-
-# Security Settings
-SECURE_BROWSER_XSS_FILTER = True
-SECURE_CONTENT_TYPE_NOSNIFF = True
-SECURE_HSTS_INCLUDE_SUBDOMAINS = True
-SECURE_HSTS_PRELOAD = True
-SECURE_HSTS_SECONDS = 31536000  # 1 ano
-X_FRAME_OPTIONS = 'DENY'
-
-# HTTPS Settings (para produção)
-SECURE_SSL_REDIRECT = True
-SESSION_COOKIE_SECURE = True
-CSRF_COOKIE_SECURE = True
-
-# Logging Configuration
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-            'style': '{',
-        },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
-        },
-    },
-    'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.handlers.RotatingFileHandler',
-            'filename': '/var/log/django/ecommerce.log',
-            'maxBytes': 1024*1024*15,  # 15MB
-            'backupCount': 10,
-            'formatter': 'verbose',
-        },
-        'console': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'simple',
-        },
-        'mail_admins': {
-            'level': 'ERROR',
-            'class': 'django.utils.log.AdminEmailHandler',
-            'formatter': 'verbose',
-        },
-    },
-    'root': {
-        'handlers': ['console', 'file'],
-        'level': 'INFO',
-    },
-    'loggers': {
-        'django': {
-            'handlers': ['file', 'console'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'django.request': {
-            'handlers': ['file', 'mail_admins'],
-            'level': 'ERROR',
-            'propagate': False,
-        },
-        'ecommerce': {
-            'handlers': ['file', 'console'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-    },
-}
-
-# Performance Middleware
-MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.gzip.GZipMiddleware',  # Compressão
-]
-
-# Template Caching
+# Templates compilados uma vez por processo
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates'],
+        **TEMPLATES[0],
+        'APP_DIRS': False,
         'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-                'cart.context_processors.cart',
-            ],
+            **TEMPLATES[0]['OPTIONS'],
             'loaders': [
                 ('django.template.loaders.cached.Loader', [
                     'django.template.loaders.filesystem.Loader',
@@ -176,44 +126,11 @@ TEMPLATES = [
     },
 ]
 
-# Query Optimization
-DATABASES['default']['OPTIONS']['init_command'] = "SET sql_mode='STRICT_TRANS_TABLES'"
-
-# Celery Configuration (para tarefas assíncronas)
-CELERY_BROKER_URL = 'redis://redis:6379/3'
-CELERY_RESULT_BACKEND = 'redis://redis:6379/3'
-CELERY_ACCEPT_CONTENT = ['json']
-CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = 'America/Sao_Paulo'
-
-# Configurações específicas do e-commerce
-CART_SESSION_ID = 'cart'
-CART_TIMEOUT = 86400  # 24 horas
-
-# Configurações de paginação
-PAGINATE_BY = 12
-MAX_SEARCH_RESULTS = 100
-
-# Configurações de upload
-FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
-
-# Configurações de internacionalização
-USE_I18N = True
-USE_L10N = True
-USE_TZ = True
-LANGUAGE_CODE = 'pt-br'
-TIME_ZONE = 'America/Sao_Paulo'
-
-# Configurações de API Rate Limiting
-REST_FRAMEWORK = {
-    'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
-    ],
-    'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/hour',
-        'user': '1000/hour'
-    }
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
 }
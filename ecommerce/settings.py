@@ -69,6 +69,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.replicas.ReplicaMiddleware',
 ]
 
 # Add debug toolbar middleware for development
@@ -107,6 +108,32 @@ DATABASES = {
     )
 }
 
+# Réplicas de leitura (URLs separadas por vírgula): recebem as leituras do
+# catálogo e dos relatórios (ver core.replicas)
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, config('DATABASE_REPLICA_URLS', default='').split(',')), start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = dj_database_url.parse(url.strip(), conn_max_age=600, conn_health_checks=True)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+# Banco operacional: sessões, histórico de logins, tokens de e-mail e fila de
+# webhooks (ver core.operational); sem URL, essas tabelas ficam no principal
+OPERATIONAL_DATABASE_URL = config('OPERATIONAL_DATABASE_URL', default='')
+if OPERATIONAL_DATABASE_URL:
+    DATABASES['operational'] = dj_database_url.parse(
+        OPERATIONAL_DATABASE_URL, conn_max_age=600, conn_health_checks=True
+    )
+    OPERATIONAL_DATABASE = 'operational'
+else:
+    OPERATIONAL_DATABASE = 'default'
+
+DATABASE_ROUTERS = ['core.operational.OperationalRouter', 'core.replicas.ReplicaRouter']
+
+# Segundos em que as leituras de quem acabou de gravar ficam no banco principal
+DATABASE_PRIMARY_PIN_SECONDS = config('DATABASE_PRIMARY_PIN_SECONDS', default=5, cast=int)
+DATABASE_PIN_COOKIE = 'db_primary'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -214,6 +241,13 @@ if DEBUG:
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
 
+# Carrega o usuário da sessão do cache (accounts.cache). O ModelBackend continua
+# na lista para as sessões abertas antes da troca, que guardam o nome dele
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # Login/Logout URLs
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/accounts/profile/'
@@ -222,10 +256,56 @@ LOGOUT_REDIRECT_URL = '/'
 # Cart session key
 CART_SESSION_ID = 'cart'
 
+# Token usado pelo ERP na API de sincronização de estoque
+INVENTORY_SYNC_TOKEN = config('INVENTORY_SYNC_TOKEN', default='')
+
+# Contadores de estoque dos produtos em modo de alta concorrência:
+# 'redis' (usa a conexão do cache) ou 'locmem' (apenas no processo, para desenvolvimento)
+STOCK_COUNTER_BACKEND = config('STOCK_COUNTER_BACKEND', default='locmem' if DEBUG else 'redis')
+
+# Prazo médio de reposição pelos fornecedores, em dias (ponto de reposição do comando forecast_stock)
+REORDER_LEAD_TIME_DAYS = config('REORDER_LEAD_TIME_DAYS', default=7, cast=int)
+
 # Payment settings
 MERCADOPAGO_ACCESS_TOKEN = config('MERCADOPAGO_ACCESS_TOKEN', default='')
 MERCADOPAGO_PUBLIC_KEY = config('MERCADOPAGO_PUBLIC_KEY', default='')
 
+# Cliente HTTP do gateway (pool de conexões, timeouts e disjuntor)
+MERCADOPAGO_API_URL = config('MERCADOPAGO_API_URL', default='https://api.mercadopago.com')
+MERCADOPAGO_CONNECT_TIMEOUT = config('MERCADOPAGO_CONNECT_TIMEOUT', default=3.05, cast=float)
+MERCADOPAGO_READ_TIMEOUT = config('MERCADOPAGO_READ_TIMEOUT', default=10.0, cast=float)
+MERCADOPAGO_MAX_RETRIES = config('MERCADOPAGO_MAX_RETRIES', default=2, cast=int)
+MERCADOPAGO_POOL_SIZE = config('MERCADOPAGO_POOL_SIZE', default=10, cast=int)
+MERCADOPAGO_BREAKER_THRESHOLD = config('MERCADOPAGO_BREAKER_THRESHOLD', default=5, cast=int)
+MERCADOPAGO_BREAKER_RESET_TIMEOUT = config('MERCADOPAGO_BREAKER_RESET_TIMEOUT', default=30.0, cast=float)
+
+# Preferências de pagamento criadas em segundo plano após o pedido
+MERCADOPAGO_PREFERENCE_TTL_HOURS = config('MERCADOPAGO_PREFERENCE_TTL_HOURS', default=24, cast=int)
+MERCADOPAGO_PREFERENCE_ASYNC = config('MERCADOPAGO_PREFERENCE_ASYNC', default=True, cast=bool)
+MERCADOPAGO_PREFERENCE_WORKERS = config('MERCADOPAGO_PREFERENCE_WORKERS', default=2, cast=int)
+
+# Pedidos encerrados há mais tempo que isso são movidos para as tabelas de arquivo
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+
+# Histórico de logins: gravado em lote ao atingir o tamanho ou o intervalo (segundos)
+LOGIN_AUDIT_BUFFER_SIZE = config('LOGIN_AUDIT_BUFFER_SIZE', default=100, cast=int)
+LOGIN_AUDIT_FLUSH_INTERVAL = config('LOGIN_AUDIT_FLUSH_INTERVAL', default=5.0, cast=float)
+# Logins mais antigos que isso são removidos pelo comando prune_login_history
+LOGIN_HISTORY_RETENTION_DAYS = config('LOGIN_HISTORY_RETENTION_DAYS', default=90, cast=int)
+
+# Diretório dos arquivos Parquet exportados para análise (comando export_parquet)
+ANALYTICS_EXPORT_DIR = config('ANALYTICS_EXPORT_DIR', default=BASE_DIR / 'exports')
+
+# Stream SSE de status dos pedidos: 'redis' (eventos entre processos) ou 'locmem' (apenas no processo)
+ORDER_EVENTS_BACKEND = config('ORDER_EVENTS_BACKEND', default='locmem' if DEBUG else 'redis')
+ORDER_EVENTS_REDIS_URL = config(
+    'ORDER_EVENTS_REDIS_URL', default=config('REDIS_URL', default='redis://127.0.0.1:6379/1')
+)
+# Heartbeat (segundos), eventos pendentes por conexão e duração máxima de uma conexão (segundos)
+ORDER_EVENTS_HEARTBEAT = config('ORDER_EVENTS_HEARTBEAT', default=15.0, cast=float)
+ORDER_EVENTS_MAX_PENDING = config('ORDER_EVENTS_MAX_PENDING', default=20, cast=int)
+ORDER_EVENTS_MAX_AGE = config('ORDER_EVENTS_MAX_AGE', default=3600, cast=int)
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -281,6 +361,10 @@ MERCADOPAGO_PUBLIC_KEY = os.getenv('MERCADOPAGO_PUBLIC_KEY', '')
 CORREIOS_USER = os.getenv('CORREIOS_USER', '')
 CORREIOS_PASSWORD = os.getenv('CORREIOS_PASSWORD', '')
 CORREIOS_CEP_ORIGEM = os.getenv('CORREIOS_CEP_ORIGEM', '01310-100')
+CORREIOS_API_URL = os.getenv('CORREIOS_API_URL', '')
+CORREIOS_QUOTE_TIMEOUT = float(os.getenv('CORREIOS_QUOTE_TIMEOUT', '2.0'))  # segundos
+CORREIOS_QUOTE_CACHE_TTL = int(os.getenv('CORREIOS_QUOTE_CACHE_TTL', '3600'))  # segundos
+CORREIOS_QUOTE_WORKERS = int(os.getenv('CORREIOS_QUOTE_WORKERS', '8'))
 
 # URL do site (para webhooks)
 SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000')
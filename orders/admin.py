@@ -1,3 +1,173 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
 
-# Register your models here.
\ No newline at end of file
+from core.admin import LargeTableAdmin
+from .fulfillment import SHIPPABLE_STATUSES
+from .models import (
+    Order, OrderItem, OrderNotification, OrderTransition, Payment, ShippingRate, ShippingZone,
+    ShippingZoneRange
+)
+from .transitions import discount_orders, transition_orders
+
+
+class OrderItemInline(admin.TabularInline):
+    """
+    Inline para itens no admin do pedido
+    """
+    model = OrderItem
+    extra = 0
+    autocomplete_fields = ('product',)
+    readonly_fields = ('product_sku', 'product_name', 'quantity', 'unit_price', 'total_price')
+
+
+class PaymentInline(admin.TabularInline):
+    """
+    Inline para pagamentos no admin do pedido
+    """
+    model = Payment
+    extra = 0
+    fields = ('payment_id', 'payment_method', 'status', 'amount', 'gateway', 'paid_at')
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    """
+    Admin para pedidos
+
+    A busca usa apenas campos com índice (número do pedido e e-mail do usuário exatos).
+    Os status só mudam pelo motor de transições (ações e fluxos de pagamento e
+    entrega), por isso não são editáveis no formulário.
+    """
+    list_display = (
+        'order_number', 'user', 'status', 'payment_status',
+        'total', 'created_at'
+    )
+    list_filter = ('status', 'payment_status')
+    list_select_related = ('user',)
+    search_fields = ('order_number__exact', 'user__email__exact')
+    search_help_text = 'Número do pedido ou e-mail do cliente exatos'
+    autocomplete_fields = ('user',)
+    readonly_fields = (
+        'order_number', 'status', 'payment_status', 'created_at', 'updated_at', 'sales_recorded_at'
+    )
+    inlines = (OrderItemInline, PaymentInline)
+    actions = ['mark_shipped']
+
+    def mark_shipped(self, request, queryset):
+        """Marca como enviados os pedidos confirmados ou em processamento"""
+        order_ids = queryset.filter(status__in=SHIPPABLE_STATUSES).values_list('id', flat=True)
+        transitions, _ = transition_orders({order_id: ('shipped', None) for order_id in order_ids}, source='admin')
+        self.message_user(request, f"{len(transitions)} pedido(s) marcado(s) como enviado(s).", messages.SUCCESS)
+    mark_shipped.short_description = 'Marcar pedidos selecionados como enviados'
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            discount_orders([obj])
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            orders = list(queryset.select_for_update().only('id', 'status', 'payment_status'))
+            super().delete_queryset(request, queryset)
+            discount_orders(orders)
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    """
+    Admin para itens de pedidos
+    """
+    list_display = ('order', 'product_sku', 'product_name', 'quantity', 'unit_price', 'total_price')
+    list_select_related = ('order',)
+    search_fields = ('order__order_number__exact', 'product_sku__exact')
+    search_help_text = 'Número do pedido ou SKU exatos'
+    autocomplete_fields = ('order', 'product')
+
+
+@admin.register(Payment)
+class PaymentAdmin(LargeTableAdmin):
+    """
+    Admin para pagamentos
+    """
+    list_display = ('payment_id', 'order', 'payment_method', 'status', 'amount', 'gateway', 'created_at')
+    list_filter = ('status', 'payment_method', 'gateway')
+    list_select_related = ('order',)
+    search_fields = ('payment_id__exact', 'order__order_number__exact')
+    search_help_text = 'ID do pagamento ou número do pedido exatos'
+    autocomplete_fields = ('order',)
+    readonly_fields = ('payment_id', 'gateway_response', 'created_at', 'updated_at')
+
+
+class ShippingZoneRangeInline(admin.TabularInline):
+    """
+    Inline para faixas de CEP no admin da região
+    """
+    model = ShippingZoneRange
+    extra = 0
+
+
+@admin.register(ShippingZone)
+class ShippingZoneAdmin(admin.ModelAdmin):
+    """
+    Admin para regiões de entrega
+    """
+    list_display = ('name', 'state', 'is_active')
+    list_filter = ('is_active', 'state')
+    search_fields = ('name',)
+    inlines = (ShippingZoneRangeInline,)
+
+
+@admin.register(ShippingRate)
+class ShippingRateAdmin(admin.ModelAdmin):
+    """
+    Admin para tarifas de frete
+    """
+    list_display = (
+        'carrier', 'name', 'zone', 'min_weight', 'max_weight',
+        'base_price', 'price_per_kg', 'delivery_time', 'is_active'
+    )
+    list_filter = ('is_active', 'carrier')
+    list_select_related = ('zone',)
+    search_fields = ('name', 'carrier')
+    autocomplete_fields = ('zone',)
+
+
+@admin.register(OrderNotification)
+class OrderNotificationAdmin(LargeTableAdmin):
+    """
+    Admin para a fila de avisos de pedidos (somente leitura)
+    """
+    list_display = ('order', 'kind', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    list_select_related = ('order',)
+    search_fields = ('order__order_number__exact',)
+    raw_id_fields = ('order',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OrderTransition)
+class OrderTransitionAdmin(LargeTableAdmin):
+    """
+    Admin para o histórico de transições de pedidos (somente leitura)
+    """
+    list_display = (
+        'order_id', 'status_from', 'status_to', 'payment_status_from', 'payment_status_to',
+        'source', 'created_at'
+    )
+    list_filter = ('source', 'status_to', 'payment_status_to')
+    search_fields = ('order__order_number__exact',)
+    search_help_text = 'Número do pedido exato'
+    raw_id_fields = ('order',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,90 @@
+"""
+Arquivamento de pedidos encerrados.
+
+Pedidos entregues, cancelados ou reembolsados criados há mais de
+``ORDER_ARCHIVE_AFTER_DAYS`` dias são movidos, com seus itens e pagamentos,
+para as tabelas ``ArchivedOrder``, ``ArchivedOrderItem`` e
+``ArchivedPayment``. Os pedidos mantêm o id original, e o histórico do
+cliente (``Order.objects.history``) reúne as duas tabelas.
+
+Cada bloco é copiado e removido na mesma transação, de modo que uma
+interrupção não deixa pedidos duplicados nem perdidos.
+Os pedidos arquivados são descontados dos contadores por status
+(``OrderStatusCount``), que cobrem apenas a tabela ``Order``.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, ArchivedPayment, Order, OrderItem, Payment
+from .transitions import discount_orders
+
+
+def _copy(instance, archive_model, **extra):
+    """Cria (sem salvar) a cópia de arquivo de uma instância"""
+    data = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+    }
+    data.update(extra)
+    return archive_model(**data)
+
+
+def archivable_orders(older_than_days=None):
+    """Pedidos encerrados mais antigos que o limite configurado"""
+    if older_than_days is None:
+        older_than_days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Order.objects.filter(status__in=Order.CLOSED_STATUSES, created_at__lt=cutoff)
+
+
+def archive_orders(older_than_days=None, batch_size=500, progress=None):
+    """
+    Move os pedidos encerrados antigos para as tabelas de arquivo.
+
+    Args:
+        older_than_days: Idade mínima dos pedidos (padrão: ORDER_ARCHIVE_AFTER_DAYS)
+        batch_size: Quantidade de pedidos movidos por transação
+        progress: Função chamada após cada bloco com (arquivados, total)
+
+    Returns:
+        int: Quantidade de pedidos arquivados
+    """
+    candidates = archivable_orders(older_than_days)
+    total = candidates.count()
+    archived = 0
+
+    while True:
+        ids = list(candidates.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+
+        now = timezone.now()
+        with transaction.atomic():
+            # Rechecagem dentro da transação: o status pode ter mudado
+            orders = list(
+                Order.objects.select_for_update().filter(id__in=ids, status__in=Order.CLOSED_STATUSES)
+            )
+            order_ids = [order.id for order in orders]
+
+            ArchivedOrder.objects.bulk_create([
+                _copy(order, ArchivedOrder, archived_at=now) for order in orders
+            ])
+            ArchivedOrderItem.objects.bulk_create([
+                _copy(item, ArchivedOrderItem)
+                for item in OrderItem.objects.filter(order_id__in=order_ids)
+            ])
+            ArchivedPayment.objects.bulk_create([
+                _copy(payment, ArchivedPayment)
+                for payment in Payment.objects.filter(order_id__in=order_ids)
+            ])
+
+            Order.objects.filter(id__in=order_ids).delete()
+            discount_orders(orders)
+
+        archived += len(order_ids)
+        if progress:
+            progress(archived, total)
+
+    return archived
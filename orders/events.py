@@ -0,0 +1,287 @@
+"""
+Eventos de status dos pedidos para o stream SSE (``order_events``).
+
+O motor de transições publica, depois do commit, um evento por pedido
+alterado no canal do dono do pedido. Cada conexão SSE assina o canal do seu
+usuário e recebe os eventos em uma fila de tamanho fixo
+(``ORDER_EVENTS_MAX_PENDING``): se o cliente não consome a tempo, a fila é
+descartada e o stream reenvia o estado atual dos pedidos, de modo que a
+memória por conexão não cresce.
+
+Backends (``ORDER_EVENTS_BACKEND``):
+
+- ``locmem``: distribuição apenas dentro do processo (desenvolvimento e
+  testes); eventos publicados por comandos ou outros workers não chegam;
+- ``redis``: publicação no canal ``orders:events:<usuário>``. Cada worker
+  ASGI mantém uma única conexão de assinatura, compartilhada por todas as
+  suas conexões SSE, e assina apenas os canais dos usuários conectados.
+"""
+from collections import defaultdict, deque
+from django.conf import settings
+import asyncio
+import json
+import logging
+import threading
+
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+# Pedidos em aberto enviados ao conectar
+SNAPSHOT_SIZE = 20
+
+# Intervalo de reconexão do navegador (ms): após a queda do stream e, fora do
+# ASGI, entre as consultas do estado atual
+STREAM_RETRY_MS = 3000
+POLL_RETRY_MS = 30000
+
+
+class Subscription:
+    """Fila limitada de eventos de uma conexão SSE"""
+
+    def __init__(self, user_id, max_pending):
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self.loop = asyncio.get_running_loop()
+        self.overflowed = False
+        self._events = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, event):
+        """Enfileira um evento (chamado no loop da conexão)"""
+        if len(self._events) >= self.max_pending:
+            # O cliente vai receber o estado completo no lugar dos eventos perdidos
+            self._events.clear()
+            self.overflowed = True
+        else:
+            self._events.append(event)
+        self._ready.set()
+
+    async def get(self, timeout):
+        """
+        Aguarda eventos por até ``timeout`` segundos.
+
+        Returns:
+            list: Eventos pendentes (vazia se o tempo acabou ou se houve estouro da fila)
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        events = list(self._events)
+        self._events.clear()
+        return events
+
+
+class LocMemOrderEvents:
+    """Distribui os eventos para as conexões do próprio processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def _register(self, subscription):
+        with self._lock:
+            first = not self._subscriptions[subscription.user_id]
+            self._subscriptions[subscription.user_id].add(subscription)
+            return first
+
+    def _unregister(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if subscriptions:
+                return False
+            self._subscriptions.pop(subscription.user_id, None)
+            return True
+
+    def dispatch(self, user_id, event):
+        """Entrega o evento às conexões do usuário (de qualquer thread)"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+            except RuntimeError:
+                # Loop encerrado: a conexão já foi fechada
+                pass
+
+    def publish(self, user_id, event):
+        self.dispatch(user_id, event)
+
+    async def subscribe(self, user_id):
+        subscription = Subscription(user_id, settings.ORDER_EVENTS_MAX_PENDING)
+        self._register(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        self._unregister(subscription)
+
+    def connections(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+class RedisOrderEvents(LocMemOrderEvents):
+    """Eventos publicados no Redis e distribuídos localmente por uma única assinatura"""
+
+    CHANNEL = 'orders:events:{}'
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._client = None
+        self._pubsub = None
+        self._listener = None
+
+    def publish(self, user_id, event):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(self.CHANNEL.format(user_id), json.dumps(event))
+
+    async def subscribe(self, user_id):
+        subscription = Subscription(user_id, settings.ORDER_EVENTS_MAX_PENDING)
+        if self._register(subscription):
+            await self._connect()
+            await self._pubsub.subscribe(self.CHANNEL.format(user_id))
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        if self._unregister(subscription) and self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self.CHANNEL.format(subscription.user_id))
+            except Exception as e:
+                logger.warning(f"Erro ao cancelar assinatura de eventos: {str(e)}")
+
+    async def _connect(self):
+        if self._listener is None or self._listener.done():
+            import redis.asyncio
+            self._pubsub = redis.asyncio.Redis.from_url(self.url).pubsub(ignore_subscribe_messages=True)
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(self.RECONNECT_DELAY)
+                    continue
+                message = await self._pubsub.get_message(timeout=self.RECONNECT_DELAY)
+                if message is None:
+                    continue
+                user_id = int(message['channel'].decode().rsplit(':', 1)[1])
+                self.dispatch(user_id, json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na assinatura de eventos de pedidos: {str(e)}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+                await self._resubscribe()
+
+    async def _resubscribe(self):
+        with self._lock:
+            channels = [self.CHANNEL.format(user_id) for user_id in self._subscriptions]
+        try:
+            await self._pubsub.reset()
+            if channels:
+                await self._pubsub.subscribe(*channels)
+        except Exception as e:
+            logger.error(f"Erro ao reconectar a assinatura de eventos: {str(e)}")
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_order_events():
+    """Retorna o backend de eventos do processo (ver ORDER_EVENTS_BACKEND)"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                if settings.ORDER_EVENTS_BACKEND == 'redis':
+                    _broker = RedisOrderEvents(settings.ORDER_EVENTS_REDIS_URL)
+                else:
+                    _broker = LocMemOrderEvents()
+    return _broker
+
+
+def order_event(order):
+    """Dados do evento de um pedido (dict com id, order_number, status e payment_status)"""
+    return {
+        'order_id': order['id'],
+        'order_number': order['order_number'],
+        'status': order['status'],
+        'status_display': dict(Order.STATUS_CHOICES).get(order['status'], order['status']),
+        'payment_status': order['payment_status'],
+        'payment_status_display': dict(Order.PAYMENT_STATUS_CHOICES).get(
+            order['payment_status'], order['payment_status']
+        ),
+    }
+
+
+def publish_order_events(events):
+    """
+    Publica eventos de pedidos.
+
+    Falhas na publicação são apenas registradas: o cliente recebe o estado
+    atual na próxima conexão.
+
+    Args:
+        events: Lista de (id do usuário, evento)
+    """
+    broker = get_order_events()
+    for user_id, event in events:
+        try:
+            broker.publish(user_id, event)
+        except Exception as e:
+            logger.error(f"Erro ao publicar evento do pedido {event['order_id']}: {str(e)}")
+
+
+async def open_order_events(user_id):
+    """Estado atual dos pedidos em aberto mais recentes do usuário"""
+    orders = (
+        Order.objects.filter(user_id=user_id)
+        .exclude(status__in=Order.CLOSED_STATUSES)
+        .order_by('-created_at')
+        .values('id', 'order_number', 'status', 'payment_status')[:SNAPSHOT_SIZE]
+    )
+    return [order_event(order) async for order in orders]
+
+
+def format_event(data, event='order'):
+    """Mensagem no formato text/event-stream"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def order_event_stream(user_id):
+    """
+    Stream de eventos de um usuário.
+
+    A assinatura é feita antes da leitura do estado atual, para não perder
+    transições entre as duas. A conexão é encerrada após
+    ``ORDER_EVENTS_MAX_AGE`` segundos e o navegador reconecta sozinho.
+    """
+    broker = get_order_events()
+    subscription = await broker.subscribe(user_id)
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        for event in await open_order_events(user_id):
+            yield format_event(event)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.ORDER_EVENTS_MAX_AGE
+        while loop.time() < deadline:
+            events = await subscription.get(settings.ORDER_EVENTS_HEARTBEAT)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                events = await open_order_events(user_id)
+            elif not events:
+                yield ': heartbeat\n\n'
+                continue
+            for event in events:
+                yield format_event(event)
+    finally:
+        await broker.unsubscribe(subscription)
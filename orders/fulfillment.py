@@ -0,0 +1,266 @@
+"""
+Expedição em lote.
+
+O comando ``import_shipments`` lê o CSV da transportadora (número do pedido
+e código de rastreamento) e aplica as alterações em blocos: os pedidos de
+cada bloco são lidos e bloqueados com uma consulta pelo índice de
+``order_number``, as transições são validadas na memória, os pedidos
+enviados passam pelo motor de transições (``orders.transitions``) e os
+códigos de rastreamento são gravados com um único UPDATE (``Case``/``When``
+por id), sem passar por ``Order.save()``.
+
+Cada pedido enviado recebe um aviso em ``OrderNotification``; os avisos são
+enviados depois, em lote e reutilizando a conexão SMTP, pelo comando
+``send_notifications``. Reimportar o mesmo arquivo não altera nada nem gera
+avisos repetidos. Avisos com falha (inclusive quando o servidor SMTP não
+aceita a conexão) voltam para a fila com espera exponencial.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Case, CharField, Q, Value, When
+from django.db.models.functions import Now
+from django.template.loader import render_to_string
+from django.utils import timezone
+import csv
+import logging
+
+from .models import Order, OrderNotification
+from .transitions import transition_orders
+
+logger = logging.getLogger(__name__)
+
+# Pedidos que podem ser marcados como enviados
+SHIPPABLE_STATUSES = ['confirmed', 'processing']
+
+# Tentativas de envio de um aviso antes de marcá-lo como falho
+MAX_NOTIFICATION_ATTEMPTS = 8
+
+# Espera antes da nova tentativa: base * 2^(tentativas - 1), até o máximo (segundos)
+NOTIFICATION_RETRY_BASE_DELAY = 60
+NOTIFICATION_RETRY_MAX_DELAY = 60 * 60 * 2
+
+
+def notification_retry_delay(attempts):
+    """Espera antes da próxima tentativa de um aviso que já falhou ``attempts`` vezes"""
+    return timedelta(
+        seconds=min(NOTIFICATION_RETRY_BASE_DELAY * 2 ** (attempts - 1), NOTIFICATION_RETRY_MAX_DELAY)
+    )
+
+
+# Segundos até um lote em envio voltar para a fila (worker interrompido no meio do lote)
+NOTIFICATION_CLAIM_TIMEOUT = 10 * 60
+
+
+def claim_pending_notifications(batch_size, now=None):
+    """
+    Reserva um lote de avisos para este worker (status ``sending``).
+
+    Avisos bloqueados por outro worker são pulados; avisos reservados há mais
+    de ``NOTIFICATION_CLAIM_TIMEOUT`` segundos podem ser reservados de novo.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=NOTIFICATION_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        ids = list(
+            OrderNotification.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status='pending', next_attempt_at__lte=now)
+                | Q(status='sending', claimed_at__lt=stale)
+            )
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            OrderNotification.objects.filter(id__in=ids).update(status='sending', claimed_at=now)
+    return list(
+        OrderNotification.objects.filter(id__in=ids, claimed_at=now)
+        .select_related('order')
+        .order_by('next_attempt_at')
+    )
+
+
+def read_shipments(stream):
+    """
+    Lê as linhas (order_number, tracking_number) do CSV da transportadora.
+
+    Aceita arquivos com ou sem cabeçalho e separados por vírgula ou ponto e vírgula.
+
+    Yields:
+        tuple: (número da linha, número do pedido, código de rastreamento)
+    """
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;')
+    except csv.Error:
+        dialect = csv.excel
+    for line, row in enumerate(csv.reader(stream, dialect), start=1):
+        if not row or not any(value.strip() for value in row):
+            continue
+        if line == 1 and row[0].strip().lower() == 'order_number':
+            continue
+        order_number = row[0].strip()
+        tracking_number = row[1].strip() if len(row) > 1 else ''
+        yield line, order_number, tracking_number
+
+
+def _apply_chunk(chunk, result):
+    """Valida e grava um bloco de envios com um único UPDATE"""
+    with transaction.atomic():
+        orders = {
+            order_number: (order_id, status, tracking_number)
+            for order_id, order_number, status, tracking_number in (
+                Order.objects.select_for_update()
+                .filter(order_number__in=[order_number for _, order_number, _ in chunk])
+                .values_list('id', 'order_number', 'status', 'tracking_number')
+            )
+        }
+
+        shipped = {}
+        retracked = {}
+        for line, order_number, tracking_number in chunk:
+            if not tracking_number:
+                result['errors'].append((line, order_number, 'Código de rastreamento vazio'))
+                continue
+            if order_number not in orders:
+                result['errors'].append((line, order_number, 'Pedido não encontrado'))
+                continue
+
+            order_id, status, current_tracking = orders[order_number]
+            if status in SHIPPABLE_STATUSES:
+                shipped[order_id] = tracking_number
+            elif status == 'shipped' and current_tracking != tracking_number:
+                # Correção do código de um pedido já enviado: sem novo aviso
+                retracked[order_id] = tracking_number
+            elif status == 'shipped':
+                result['unchanged'] += 1
+            else:
+                result['errors'].append(
+                    (line, order_number, f"Pedido com status '{status}' não pode ser enviado")
+                )
+
+        transition_orders({order_id: ('shipped', None) for order_id in shipped}, source='carrier')
+        changes = {**shipped, **retracked}
+        if changes:
+            Order.objects.filter(id__in=changes.keys()).update(
+                tracking_number=Case(
+                    *[When(id=order_id, then=Value(tracking)) for order_id, tracking in changes.items()],
+                    output_field=CharField(),
+                ),
+                updated_at=Now(),
+            )
+        OrderNotification.objects.bulk_create(
+            [OrderNotification(order_id=order_id, kind='shipped') for order_id in shipped],
+            ignore_conflicts=True,
+        )
+
+    result['shipped'] += len(shipped)
+    result['retracked'] += len(retracked)
+
+
+def import_shipments(rows, chunk_size=1000, progress=None):
+    """
+    Aplica os envios informados pela transportadora.
+
+    Um número de pedido repetido no arquivo vale pela última ocorrência.
+
+    Args:
+        rows: Iterável de (linha, número do pedido, código de rastreamento)
+        chunk_size: Quantidade de pedidos por transação
+        progress: Função chamada após cada bloco com a quantidade de linhas processadas
+
+    Returns:
+        dict: Pedidos enviados, códigos corrigidos, linhas sem alteração e
+        erros (lista de (linha, número do pedido, mensagem))
+    """
+    result = {'shipped': 0, 'retracked': 0, 'unchanged': 0, 'errors': []}
+    chunk = {}
+    processed = 0
+
+    def flush():
+        nonlocal processed
+        _apply_chunk(list(chunk.values()), result)
+        processed += len(chunk)
+        chunk.clear()
+        if progress:
+            progress(processed)
+
+    for line, order_number, tracking_number in rows:
+        chunk[order_number] = (line, order_number, tracking_number)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    return result
+
+
+def _build_message(notification):
+    order = notification.order
+    context = {'order': order, 'site_url': settings.SITE_URL}
+    message = EmailMultiAlternatives(
+        subject=f'Pedido {order.order_number} enviado',
+        body=render_to_string('emails/order_shipped.txt', context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[order.email],
+    )
+    message.attach_alternative(render_to_string('emails/order_shipped.html', context), 'text/html')
+    return message
+
+
+def send_pending_notifications(batch_size=100):
+    """
+    Envia um lote de avisos pendentes com uma única conexão SMTP.
+
+    Só são enviados os avisos reservados por este worker
+    (``claim_pending_notifications``). Se a conexão não abrir, todos os
+    avisos do lote contam uma tentativa.
+
+    Returns:
+        dict: Avisos enviados e com falha
+    """
+    now = timezone.now()
+    notifications = claim_pending_notifications(batch_size, now)
+    result = {'sent': 0, 'failed': 0}
+    if not notifications:
+        return result
+
+    sent_ids = []
+    errors = {}
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Erro ao abrir a conexão SMTP: {str(e)}")
+        errors = {notification.id: e for notification in notifications}
+    else:
+        try:
+            for notification in notifications:
+                try:
+                    connection.send_messages([_build_message(notification)])
+                    sent_ids.append(notification.id)
+                except Exception as e:
+                    logger.error(f"Erro ao enviar aviso {notification.id}: {str(e)}")
+                    errors[notification.id] = e
+        finally:
+            connection.close()
+
+    OrderNotification.objects.filter(id__in=sent_ids).update(
+        status='sent', sent_at=timezone.now(), claimed_at=None
+    )
+    failed = [notification for notification in notifications if notification.id in errors]
+    for notification in failed:
+        notification.attempts += 1
+        notification.last_error = str(errors[notification.id])
+        notification.next_attempt_at = now + notification_retry_delay(notification.attempts)
+        notification.claimed_at = None
+        notification.status = 'failed' if notification.attempts >= MAX_NOTIFICATION_ATTEMPTS else 'pending'
+    if failed:
+        OrderNotification.objects.bulk_update(
+            failed, ['attempts', 'last_error', 'status', 'next_attempt_at', 'claimed_at']
+        )
+    result['sent'] = len(sent_ids)
+    result['failed'] = len(failed)
+    return result
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.archive import archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move pedidos encerrados antigos para as tabelas de arquivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help='Idade mínima, em dias, dos pedidos arquivados'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Quantidade de pedidos movidos por transação'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas informa quantos pedidos seriam arquivados'
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            total = archivable_orders(options['days']).count()
+            self.stdout.write(f"{total} pedidos seriam arquivados.")
+            return
+
+        def progress(archived, total):
+            percent = archived * 100 // total if total else 100
+            self.stdout.write(f"  Arquivados {archived}/{total} ({percent}%)")
+
+        archived = archive_orders(
+            older_than_days=options['days'],
+            batch_size=options['batch_size'],
+            progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(f"Arquivamento concluído: {archived} pedidos."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from orders.sales import backfill_sales
+
+
+class Command(BaseCommand):
+    help = 'Soma os pedidos pagos ainda não registrados às tabelas de vendas diárias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de pedidos processados por transação'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Apaga as tabelas de vendas e recalcula todo o histórico'
+        )
+
+    def handle(self, *args, **options):
+        def progress(recorded, total):
+            percent = recorded * 100 // total if total else 100
+            self.stdout.write(f"  Pedidos registrados: {recorded}/{total} ({percent}%)")
+
+        recorded = backfill_sales(
+            batch_size=options['batch_size'],
+            rebuild=options['rebuild'],
+            progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(f"Vendas diárias atualizadas: {recorded} pedidos."))
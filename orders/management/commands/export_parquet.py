@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Exporta pedidos, itens, pagamentos e produtos em Parquet particionado por mês'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.ANALYTICS_EXPORT_DIR,
+            help='Diretório de destino'
+        )
+        parser.add_argument(
+            '--table',
+            action='append',
+            dest='tables',
+            help='Tabela exportada (pode ser repetido; padrão: todas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Quantidade de linhas lidas e gravadas por bloco'
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Banco de dados lido (ex: uma réplica)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignora os watermarks e exporta todas as linhas'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from orders.export import EXPORTS, export_all
+        except ImportError:
+            raise CommandError('A exportação em Parquet requer o pacote pyarrow.')
+
+        tables = options['tables']
+        unknown = set(tables or []) - set(EXPORTS)
+        if unknown:
+            raise CommandError(
+                f"Tabela(s) desconhecida(s): {', '.join(sorted(unknown))}. "
+                f"Disponíveis: {', '.join(EXPORTS)}"
+            )
+
+        result = export_all(
+            options['output'],
+            tables=tables,
+            batch_size=options['batch_size'],
+            using=options['database'],
+            full=options['full'],
+        )
+        for name, rows in result.items():
+            self.stdout.write(f"  {name}: {rows} linha(s)")
+        self.stdout.write(self.style.SUCCESS(f"Exportação concluída em {options['output']}."))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.fulfillment import import_shipments, read_shipments
+
+
+class Command(BaseCommand):
+    help = 'Marca pedidos como enviados a partir do CSV da transportadora (order_number, tracking_number)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Caminho do arquivo CSV')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Quantidade de pedidos atualizados por transação'
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Codificação do arquivo'
+        )
+
+    def handle(self, *args, **options):
+        def progress(processed):
+            self.stdout.write(f"  Linhas processadas: {processed}")
+
+        try:
+            with open(options['path'], newline='', encoding=options['encoding']) as stream:
+                result = import_shipments(
+                    read_shipments(stream),
+                    chunk_size=options['chunk_size'],
+                    progress=progress
+                )
+        except OSError as e:
+            raise CommandError(f"Não foi possível ler o arquivo: {e}")
+
+        for line, order_number, message in result['errors']:
+            self.stdout.write(self.style.ERROR(f"  ✗ Linha {line} ({order_number}): {message}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Importação concluída: {result['shipped']} enviados, "
+                f"{result['retracked']} códigos corrigidos, {result['unchanged']} sem alteração, "
+                f"{len(result['errors'])} erros."
+            )
+        )
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+import time
+
+from orders.webhooks import process_pending_events, requeue_failed_events
+
+
+class Command(BaseCommand):
+    help = 'Processa as notificações de pagamento enfileiradas pelo webhook'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Quantidade máxima de eventos por lote'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continua aguardando novos eventos em vez de encerrar'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Intervalo em segundos entre verificações quando a fila está vazia'
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Devolve à fila os eventos que esgotaram as tentativas antes de processar'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            requeued = requeue_failed_events()
+            self.stdout.write(f"Eventos devolvidos à fila: {requeued}")
+
+        while True:
+            result = process_pending_events(batch_size=options['batch_size'])
+
+            if result['processed'] or result['failed']:
+                self.stdout.write(
+                    f"Eventos processados: {result['processed']} | com falha: {result['failed']}"
+                )
+
+            if not options['loop']:
+                break
+
+            # Lote cheio indica que ainda há eventos na fila
+            if result['processed'] + result['failed'] < options['batch_size']:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Processamento de webhooks concluído.'))
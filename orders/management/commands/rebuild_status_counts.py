@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.transitions import rebuild_status_counts
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores de pedidos por status a partir da tabela de pedidos'
+
+    def handle(self, *args, **options):
+        counted = rebuild_status_counts()
+        self.stdout.write(self.style.SUCCESS(f"Contadores recalculados: {counted} pedidos."))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+import time
+
+from orders.fulfillment import send_pending_notifications
+
+
+class Command(BaseCommand):
+    help = 'Envia os avisos de pedidos enfileirados (ex: pedido enviado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Quantidade máxima de avisos por conexão SMTP'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continua aguardando novos avisos em vez de encerrar'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10.0,
+            help='Intervalo em segundos entre verificações quando a fila está vazia'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = send_pending_notifications(batch_size=options['batch_size'])
+
+            if result['sent'] or result['failed']:
+                self.stdout.write(f"Avisos enviados: {result['sent']} | com falha: {result['failed']}")
+
+            if not options['loop']:
+                break
+
+            # Lote cheio indica que ainda há avisos na fila
+            if result['sent'] + result['failed'] < options['batch_size']:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Envio de avisos concluído.'))
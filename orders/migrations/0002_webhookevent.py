@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gateway', models.CharField(default='mercadopago', max_length=50, verbose_name='Gateway')),
+                ('event_id', models.CharField(help_text='Identificador da notificação no gateway, usado para descartar duplicatas', max_length=100, verbose_name='ID do Evento')),
+                ('topic', models.CharField(blank=True, max_length=50, verbose_name='Tipo')),
+                ('resource_id', models.CharField(blank=True, max_length=100, verbose_name='ID do Recurso')),
+                ('payload', models.JSONField(verbose_name='Conteúdo Recebido')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('processed', 'Processado'), ('ignored', 'Ignorado'), ('failed', 'Falhou')], default='pending', max_length=20, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Recebido em')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+            ],
+            options={
+                'verbose_name': 'Evento de Webhook',
+                'verbose_name_plural': 'Eventos de Webhook',
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='orders_webh_status_1395f1_idx')],
+                'unique_together': {('gateway', 'event_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_init_point',
+            field=models.URLField(blank=True, max_length=500, verbose_name='Link de Pagamento'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_preference_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Preferência Expira em'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_preference_id',
+            field=models.CharField(blank=True, max_length=100, verbose_name='ID da Preferência de Pagamento'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:00
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_payment_preference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShippingZone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nome')),
+                ('state', models.CharField(blank=True, max_length=2, verbose_name='Estado')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Ativa')),
+            ],
+            options={
+                'verbose_name': 'Região de Entrega',
+                'verbose_name_plural': 'Regiões de Entrega',
+                'ordering': ['state', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='shippingrate',
+            name='zone',
+            field=models.ForeignKey(blank=True, help_text='Deixe em branco para valer para todos os destinos', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='orders.shippingzone', verbose_name='Região'),
+        ),
+        migrations.CreateModel(
+            name='ShippingZoneRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cep_start', models.CharField(max_length=5, validators=[django.core.validators.RegexValidator(message='Informe os 5 primeiros dígitos do CEP.', regex='^\\d{5}$')], verbose_name='Prefixo Inicial')),
+                ('cep_end', models.CharField(max_length=5, validators=[django.core.validators.RegexValidator(message='Informe os 5 primeiros dígitos do CEP.', regex='^\\d{5}$')], verbose_name='Prefixo Final')),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranges', to='orders.shippingzone', verbose_name='Região')),
+            ],
+            options={
+                'verbose_name': 'Faixa de CEP',
+                'verbose_name_plural': 'Faixas de CEP',
+                'ordering': ['cep_start'],
+            },
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:12
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_shipping_zones'),
+        ('store', '0006_inventory_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('order_number', models.CharField(blank=True, max_length=50, unique=True, verbose_name='Número do Pedido')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('confirmed', 'Confirmado'), ('processing', 'Processando'), ('shipped', 'Enviado'), ('delivered', 'Entregue'), ('cancelled', 'Cancelado'), ('refunded', 'Reembolsado')], default='pending', max_length=20, verbose_name='Status')),
+                ('payment_status', models.CharField(choices=[('pending', 'Pendente'), ('processing', 'Processando'), ('completed', 'Concluído'), ('failed', 'Falhou'), ('cancelled', 'Cancelado'), ('refunded', 'Reembolsado')], default='pending', max_length=20, verbose_name='Status do Pagamento')),
+                ('email', models.EmailField(max_length=254, verbose_name='E-mail')),
+                ('first_name', models.CharField(max_length=50, verbose_name='Nome')),
+                ('last_name', models.CharField(max_length=50, verbose_name='Sobrenome')),
+                ('phone', models.CharField(blank=True, max_length=20, verbose_name='Telefone')),
+                ('shipping_address_line_1', models.CharField(max_length=255, verbose_name='Endereço')),
+                ('shipping_address_line_2', models.CharField(blank=True, max_length=255, verbose_name='Complemento')),
+                ('shipping_city', models.CharField(max_length=100, verbose_name='Cidade')),
+                ('shipping_state', models.CharField(max_length=2, verbose_name='Estado')),
+                ('shipping_postal_code', models.CharField(max_length=9, verbose_name='CEP')),
+                ('shipping_country', models.CharField(default='Brasil', max_length=50, verbose_name='País')),
+                ('billing_same_as_shipping', models.BooleanField(default=True, verbose_name='Cobrança igual à entrega')),
+                ('billing_address_line_1', models.CharField(blank=True, max_length=255, verbose_name='Endereço de Cobrança')),
+                ('billing_address_line_2', models.CharField(blank=True, max_length=255, verbose_name='Complemento de Cobrança')),
+                ('billing_city', models.CharField(blank=True, max_length=100, verbose_name='Cidade de Cobrança')),
+                ('billing_state', models.CharField(blank=True, max_length=2, verbose_name='Estado de Cobrança')),
+                ('billing_postal_code', models.CharField(blank=True, max_length=9, verbose_name='CEP de Cobrança')),
+                ('billing_country', models.CharField(blank=True, default='Brasil', max_length=50, verbose_name='País de Cobrança')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))], verbose_name='Subtotal')),
+                ('shipping_cost', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))], verbose_name='Custo do Frete')),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))], verbose_name='Impostos')),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))], verbose_name='Desconto')),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Total')),
+                ('shipping_method', models.CharField(blank=True, max_length=100, verbose_name='Método de Entrega')),
+                ('tracking_number', models.CharField(blank=True, max_length=100, verbose_name='Código de Rastreamento')),
+                ('payment_preference_id', models.CharField(blank=True, max_length=100, verbose_name='ID da Preferência de Pagamento')),
+                ('payment_init_point', models.URLField(blank=True, max_length=500, verbose_name='Link de Pagamento')),
+                ('payment_preference_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Preferência Expira em')),
+                ('notes', models.TextField(blank=True, verbose_name='Observações')),
+                ('shipped_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado em')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='Entregue em')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(verbose_name='Atualizado em')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Arquivado em')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL, verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Pedido Arquivado',
+                'verbose_name_plural': 'Pedidos Arquivados',
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(help_text='Nome do produto no momento da compra', max_length=200, verbose_name='Nome do Produto')),
+                ('product_sku', models.CharField(blank=True, help_text='SKU do produto no momento da compra', max_length=50, verbose_name='SKU do Produto')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Quantidade')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Preço Unitário')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Preço Total')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.archivedorder', verbose_name='Pedido')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='store.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Item de Pedido Arquivado',
+                'verbose_name_plural': 'Itens de Pedidos Arquivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_id', models.CharField(blank=True, max_length=100, unique=True, verbose_name='ID do Pagamento')),
+                ('payment_method', models.CharField(choices=[('credit_card', 'Cartão de Crédito'), ('debit_card', 'Cartão de Débito'), ('pix', 'PIX'), ('boleto', 'Boleto Bancário'), ('bank_transfer', 'Transferência Bancária')], max_length=20, verbose_name='Método de Pagamento')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('processing', 'Processando'), ('completed', 'Concluído'), ('failed', 'Falhou'), ('cancelled', 'Cancelado'), ('refunded', 'Reembolsado')], default='pending', max_length=20, verbose_name='Status')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Valor')),
+                ('gateway', models.CharField(blank=True, max_length=50, verbose_name='Gateway')),
+                ('gateway_transaction_id', models.CharField(blank=True, max_length=100, verbose_name='ID da Transação no Gateway')),
+                ('gateway_response', models.JSONField(blank=True, null=True, verbose_name='Resposta do Gateway')),
+                ('installments', models.PositiveIntegerField(default=1, verbose_name='Parcelas')),
+                ('due_date', models.DateTimeField(blank=True, null=True, verbose_name='Data de Vencimento')),
+                ('paid_at', models.DateTimeField(blank=True, null=True, verbose_name='Pago em')),
+                ('created_at', models.DateTimeField(verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(verbose_name='Atualizado em')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='orders.archivedorder', verbose_name='Pedido')),
+            ],
+            options={
+                'verbose_name': 'Pagamento Arquivado',
+                'verbose_name_plural': 'Pagamentos Arquivados',
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', 'created_at'], name='orders_arch_user_id_101d40_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:14
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_archive'),
+        ('store', '0006_inventory_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='sales_recorded_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Vendas Registradas em'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='sales_recorded_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Vendas Registradas em'),
+        ),
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('orders', models.IntegerField(default=0, verbose_name='Pedidos')),
+                ('units', models.IntegerField(default=0, verbose_name='Unidades')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Receita')),
+                ('discounts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Descontos')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='store.category', verbose_name='Categoria')),
+            ],
+            options={
+                'verbose_name': 'Venda Diária por Categoria',
+                'verbose_name_plural': 'Vendas Diárias por Categoria',
+                'ordering': ['-date'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('date', 'category'), name='unique_daily_category_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('orders', models.IntegerField(default=0, verbose_name='Pedidos')),
+                ('units', models.IntegerField(default=0, verbose_name='Unidades')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Receita')),
+                ('discounts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Descontos')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='store.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Venda Diária por Produto',
+                'verbose_name_plural': 'Vendas Diárias por Produto',
+                'ordering': ['-date'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('date', 'product'), name='unique_daily_product_sales')],
+            },
+        ),
+    ]
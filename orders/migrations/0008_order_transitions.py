@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_orders(apps, schema_editor):
+    """Preenche os contadores por status com os pedidos existentes"""
+    Order = apps.get_model('orders', 'Order')
+    OrderStatusCount = apps.get_model('orders', 'OrderStatusCount')
+    counts = Order.objects.order_by().values_list('status', 'payment_status').annotate(count=Count('id'))
+    OrderStatusCount.objects.bulk_create([
+        OrderStatusCount(status=status, payment_status=payment_status, count=count)
+        for status, payment_status, count in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('confirmed', 'Confirmado'), ('processing', 'Processando'), ('shipped', 'Enviado'), ('delivered', 'Entregue'), ('cancelled', 'Cancelado'), ('refunded', 'Reembolsado')], max_length=20, verbose_name='Status')),
+                ('payment_status', models.CharField(choices=[('pending', 'Pendente'), ('processing', 'Processando'), ('completed', 'Concluído'), ('failed', 'Falhou'), ('cancelled', 'Cancelado'), ('refunded', 'Reembolsado')], max_length=20, verbose_name='Status do Pagamento')),
+                ('count', models.IntegerField(default=0, verbose_name='Pedidos')),
+            ],
+            options={
+                'verbose_name': 'Contagem de Pedidos por Status',
+                'verbose_name_plural': 'Contagens de Pedidos por Status',
+                'ordering': ['status', 'payment_status'],
+                'constraints': [models.UniqueConstraint(fields=('status', 'payment_status'), name='unique_order_status_count')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status_from', models.CharField(max_length=20, verbose_name='Status Anterior')),
+                ('status_to', models.CharField(max_length=20, verbose_name='Status')),
+                ('payment_status_from', models.CharField(max_length=20, verbose_name='Pagamento Anterior')),
+                ('payment_status_to', models.CharField(max_length=20, verbose_name='Pagamento')),
+                ('source', models.CharField(blank=True, max_length=20, verbose_name='Origem')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data')),
+                ('order', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='transitions', to='orders.order', verbose_name='Pedido')),
+            ],
+            options={
+                'verbose_name': 'Transição de Pedido',
+                'verbose_name_plural': 'Transições de Pedidos',
+                'indexes': [models.Index(fields=['order', 'created_at'], name='orders_orde_order_i_87d396_idx')],
+            },
+        ),
+        migrations.RunPython(count_orders, migrations.RunPython.noop),
+    ]
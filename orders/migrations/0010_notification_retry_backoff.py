@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_webhook_retry_backoff'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ordernotification',
+            name='orders_orde_status_93a765_idx',
+        ),
+        migrations.AddField(
+            model_name='ordernotification',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima Tentativa'),
+        ),
+        migrations.AddIndex(
+            model_name='ordernotification',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='orders_orde_status_8c3553_idx'),
+        ),
+    ]
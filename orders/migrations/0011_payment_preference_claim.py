@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_notification_retry_backoff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='payment_preference_requested_at',
+            field=models.DateTimeField(blank=True, help_text='Marca do processo que está criando a preferência no gateway', null=True, verbose_name='Preferência Solicitada em'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_preference_requested_at',
+            field=models.DateTimeField(blank=True, help_text='Marca do processo que está criando a preferência no gateway', null=True, verbose_name='Preferência Solicitada em'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_payment_preference_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordernotification',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Reservado em'),
+        ),
+        migrations.AlterField(
+            model_name='ordernotification',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendente'), ('sending', 'Enviando'), ('sent', 'Enviado'), ('failed', 'Falhou')], default='pending', max_length=20, verbose_name='Status'),
+        ),
+    ]
@@ -1,15 +1,16 @@
 from django.db import models
 from django.contrib.auth import get_user_model
-from django.core.validators import MinValueValidator
-from store.models import Product
+from django.core.validators import MinValueValidator, RegexValidator
+from django.utils import timezone
+from store.models import Category, Product
 from decimal import Decimal
 import uuid
 
 User = get_user_model()
 
 
-class Order(models.Model):
-    """Modelo principal para pedidos"""
+class OrderFields(models.Model):
+    """Campos e comportamento comuns a pedidos ativos e arquivados"""
     STATUS_CHOICES = [
         ('pending', 'Pendente'),
         ('confirmed', 'Confirmado'),
@@ -29,16 +30,11 @@ class Order(models.Model):
         ('refunded', 'Reembolsado'),
     ]
 
+    # Status em que o pedido não muda mais e pode ser arquivado
+    CLOSED_STATUSES = ['delivered', 'cancelled', 'refunded']
+
     # Identificação
     order_number = models.CharField('Número do Pedido', max_length=50, unique=True, blank=True)
-    user = models.ForeignKey(
-        User,
-        on_delete=models.CASCADE,
-        related_name='orders',
-        verbose_name='Cliente',
-        null=True,
-        blank=True
-    )
 
     # Status
     status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -111,6 +107,17 @@ class Order(models.Model):
     shipping_method = models.CharField('Método de Entrega', max_length=100, blank=True)
     tracking_number = models.CharField('Código de Rastreamento', max_length=100, blank=True)
 
+    # Preferência de pagamento criada no gateway
+    payment_preference_id = models.CharField('ID da Preferência de Pagamento', max_length=100, blank=True)
+    payment_init_point = models.URLField('Link de Pagamento', max_length=500, blank=True)
+    payment_preference_expires_at = models.DateTimeField('Preferência Expira em', null=True, blank=True)
+    payment_preference_requested_at = models.DateTimeField(
+        'Preferência Solicitada em',
+        null=True,
+        blank=True,
+        help_text='Marca do processo que está criando a preferência no gateway'
+    )
+
     # Observações
     notes = models.TextField('Observações', blank=True)
 
@@ -120,15 +127,12 @@ class Order(models.Model):
     shipped_at = models.DateTimeField('Enviado em', null=True, blank=True)
     delivered_at = models.DateTimeField('Entregue em', null=True, blank=True)
 
+    # Preenchido quando o pedido é somado às tabelas de vendas diárias
+    sales_recorded_at = models.DateTimeField('Vendas Registradas em', null=True, blank=True)
+
     class Meta:
-        verbose_name = 'Pedido'
-        verbose_name_plural = 'Pedidos'
+        abstract = True
         ordering = ['-created_at']
-        indexes = [
-            models.Index(fields=['order_number']),
-            models.Index(fields=['user', 'created_at']),
-            models.Index(fields=['status', 'payment_status']),
-        ]
 
     def save(self, *args, **kwargs):
         if not self.order_number:
@@ -159,6 +163,14 @@ class Order(models.Model):
         ]
         return ', '.join([part for part in address_parts if part])
 
+    def has_valid_payment_preference(self):
+        """Verifica se existe uma preferência de pagamento ainda válida"""
+        return bool(
+            self.payment_preference_id
+            and self.payment_preference_expires_at
+            and self.payment_preference_expires_at > timezone.now()
+        )
+
     def can_be_cancelled(self):
         """Verifica se o pedido pode ser cancelado"""
         return self.status in ['pending', 'confirmed']
@@ -168,14 +180,118 @@ class Order(models.Model):
         return sum(item.quantity for item in self.items.all())
 
 
-class OrderItem(models.Model):
-    """Modelo para itens do pedido"""
-    order = models.ForeignKey(
-        Order,
+class OrderManager(models.Manager):
+    """Manager de pedidos com acesso ao histórico que inclui os arquivados"""
+
+    def history(self, user):
+        """Pedidos ativos e arquivados do cliente, do mais recente ao mais antigo"""
+        return OrderHistory(user)
+
+
+class Order(OrderFields):
+    """Modelo principal para pedidos"""
+    user = models.ForeignKey(
+        User,
         on_delete=models.CASCADE,
-        related_name='items',
-        verbose_name='Pedido'
+        related_name='orders',
+        verbose_name='Cliente',
+        null=True,
+        blank=True
+    )
+
+    objects = OrderManager()
+
+    class Meta(OrderFields.Meta):
+        verbose_name = 'Pedido'
+        verbose_name_plural = 'Pedidos'
+        indexes = [
+            models.Index(fields=['order_number']),
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['status', 'payment_status']),
+        ]
+
+
+class ArchivedOrder(OrderFields):
+    """Pedido encerrado movido para a tabela de arquivo (mantém o id original)"""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_orders',
+        verbose_name='Cliente',
+        null=True,
+        blank=True
     )
+
+    # Copiados do pedido original, sem auto_now
+    created_at = models.DateTimeField('Criado em')
+    updated_at = models.DateTimeField('Atualizado em')
+    archived_at = models.DateTimeField('Arquivado em', auto_now_add=True)
+
+    class Meta(OrderFields.Meta):
+        verbose_name = 'Pedido Arquivado'
+        verbose_name_plural = 'Pedidos Arquivados'
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def can_be_cancelled(self):
+        return False
+
+
+class OrderHistory:
+    """
+    Sequência paginável com os pedidos ativos e arquivados de um cliente.
+
+    A ordenação e o recorte da página são feitos por um UNION ALL que lê só
+    (created_at, id) nos índices ``(user, created_at)`` das duas tabelas; os
+    pedidos da página são então carregados com seus itens.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def _keys(self):
+        live = Order.objects.filter(user=self.user).order_by().annotate(
+            archived=models.Value(False)
+        ).values_list('created_at', 'id', 'archived')
+        archived = ArchivedOrder.objects.filter(user=self.user).order_by().annotate(
+            archived=models.Value(True)
+        ).values_list('created_at', 'id', 'archived')
+        return live.union(archived, all=True).order_by('-created_at', '-id')
+
+    def count(self):
+        return (
+            Order.objects.filter(user=self.user).count()
+            + ArchivedOrder.objects.filter(user=self.user).count()
+        )
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+
+        keys = list(self._keys()[key])
+        live_ids = [pk for _, pk, archived in keys if not archived]
+        archived_ids = [pk for _, pk, archived in keys if archived]
+
+        orders = {}
+        if live_ids:
+            for order in Order.objects.filter(id__in=live_ids).prefetch_related('items'):
+                orders[(False, order.id)] = order
+        if archived_ids:
+            for order in ArchivedOrder.objects.filter(id__in=archived_ids).prefetch_related('items'):
+                orders[(True, order.id)] = order
+        return [orders[(archived, pk)] for _, pk, archived in keys if (archived, pk) in orders]
+
+
+class OrderItemFields(models.Model):
+    """Campos e comportamento comuns a itens de pedidos ativos e arquivados"""
     product = models.ForeignKey(
         Product,
         on_delete=models.CASCADE,
@@ -207,8 +323,7 @@ class OrderItem(models.Model):
     )
 
     class Meta:
-        verbose_name = 'Item do Pedido'
-        verbose_name_plural = 'Itens do Pedido'
+        abstract = True
 
     def save(self, *args, **kwargs):
         if not self.product_name:
@@ -223,8 +338,36 @@ class OrderItem(models.Model):
         return f"{self.quantity}x {self.product_name}"
 
 
-class Payment(models.Model):
-    """Modelo para pagamentos"""
+class OrderItem(OrderItemFields):
+    """Modelo para itens do pedido"""
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name='Pedido'
+    )
+
+    class Meta:
+        verbose_name = 'Item do Pedido'
+        verbose_name_plural = 'Itens do Pedido'
+
+
+class ArchivedOrderItem(OrderItemFields):
+    """Item de um pedido arquivado"""
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name='Pedido'
+    )
+
+    class Meta:
+        verbose_name = 'Item de Pedido Arquivado'
+        verbose_name_plural = 'Itens de Pedidos Arquivados'
+
+
+class PaymentFields(models.Model):
+    """Campos e comportamento comuns a pagamentos de pedidos ativos e arquivados"""
     PAYMENT_METHOD_CHOICES = [
         ('credit_card', 'Cartão de Crédito'),
         ('debit_card', 'Cartão de Débito'),
@@ -242,12 +385,6 @@ class Payment(models.Model):
         ('refunded', 'Reembolsado'),
     ]
 
-    order = models.ForeignKey(
-        Order,
-        on_delete=models.CASCADE,
-        related_name='payments',
-        verbose_name='Pedido'
-    )
     payment_id = models.CharField('ID do Pagamento', max_length=100, unique=True, blank=True)
     payment_method = models.CharField(
         'Método de Pagamento',
@@ -276,8 +413,7 @@ class Payment(models.Model):
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
 
     class Meta:
-        verbose_name = 'Pagamento'
-        verbose_name_plural = 'Pagamentos'
+        abstract = True
         ordering = ['-created_at']
 
     def save(self, *args, **kwargs):
@@ -289,10 +425,92 @@ class Payment(models.Model):
         return f"Pagamento {self.payment_id} - {self.get_payment_method_display()}"
 
 
+class Payment(PaymentFields):
+    """Modelo para pagamentos"""
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='payments',
+        verbose_name='Pedido'
+    )
+
+    class Meta(PaymentFields.Meta):
+        verbose_name = 'Pagamento'
+        verbose_name_plural = 'Pagamentos'
+
+
+class ArchivedPayment(PaymentFields):
+    """Pagamento de um pedido arquivado"""
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='payments',
+        verbose_name='Pedido'
+    )
+
+    # Copiados do pagamento original, sem auto_now
+    created_at = models.DateTimeField('Criado em')
+    updated_at = models.DateTimeField('Atualizado em')
+
+    class Meta(PaymentFields.Meta):
+        verbose_name = 'Pagamento Arquivado'
+        verbose_name_plural = 'Pagamentos Arquivados'
+
+
+cep_prefix_validator = RegexValidator(
+    regex=r'^\d{5}$',
+    message='Informe os 5 primeiros dígitos do CEP.'
+)
+
+
+class ShippingZone(models.Model):
+    """Região de entrega formada por faixas de CEP"""
+    name = models.CharField('Nome', max_length=100)
+    state = models.CharField('Estado', max_length=2, blank=True)
+    is_active = models.BooleanField('Ativa', default=True)
+
+    class Meta:
+        verbose_name = 'Região de Entrega'
+        verbose_name_plural = 'Regiões de Entrega'
+        ordering = ['state', 'name']
+
+    def __str__(self):
+        return f"{self.name} ({self.state})" if self.state else self.name
+
+
+class ShippingZoneRange(models.Model):
+    """Faixa de prefixos de CEP (5 dígitos) pertencente a uma região"""
+    zone = models.ForeignKey(
+        ShippingZone,
+        on_delete=models.CASCADE,
+        related_name='ranges',
+        verbose_name='Região'
+    )
+    cep_start = models.CharField('Prefixo Inicial', max_length=5, validators=[cep_prefix_validator])
+    cep_end = models.CharField('Prefixo Final', max_length=5, validators=[cep_prefix_validator])
+
+    class Meta:
+        verbose_name = 'Faixa de CEP'
+        verbose_name_plural = 'Faixas de CEP'
+        ordering = ['cep_start']
+
+    def __str__(self):
+        return f"{self.cep_start}-{self.cep_end}"
+
+
 class ShippingRate(models.Model):
     """Modelo para tarifas de frete"""
     name = models.CharField('Nome do Serviço', max_length=100)
     carrier = models.CharField('Transportadora', max_length=100)
+    zone = models.ForeignKey(
+        ShippingZone,
+        on_delete=models.CASCADE,
+        related_name='rates',
+        verbose_name='Região',
+        null=True,
+        blank=True,
+        help_text='Deixe em branco para valer para todos os destinos'
+    )
     min_weight = models.DecimalField(
         'Peso Mínimo (kg)',
         max_digits=8,
@@ -336,4 +554,191 @@ class ShippingRate(models.Model):
         
         additional_weight = weight - self.min_weight
         additional_cost = additional_weight * self.price_per_kg
-        return self.base_price + additional_cost
\ No newline at end of file
+        return self.base_price + additional_cost
+
+class WebhookEvent(models.Model):
+    """Notificações recebidas dos gateways, enfileiradas para processamento"""
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('processed', 'Processado'),
+        ('ignored', 'Ignorado'),
+        ('failed', 'Falhou'),
+    ]
+
+    gateway = models.CharField('Gateway', max_length=50, default='mercadopago')
+    event_id = models.CharField(
+        'ID do Evento',
+        max_length=100,
+        help_text='Identificador da notificação no gateway, usado para descartar duplicatas'
+    )
+    topic = models.CharField('Tipo', max_length=50, blank=True)
+    resource_id = models.CharField('ID do Recurso', max_length=100, blank=True)
+    payload = models.JSONField('Conteúdo Recebido')
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField('Tentativas', default=0)
+    last_error = models.TextField('Último Erro', blank=True)
+
+    received_at = models.DateTimeField('Recebido em', auto_now_add=True)
+    next_attempt_at = models.DateTimeField('Próxima Tentativa', default=timezone.now)
+    processed_at = models.DateTimeField('Processado em', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Evento de Webhook'
+        verbose_name_plural = 'Eventos de Webhook'
+        ordering = ['received_at']
+        unique_together = ['gateway', 'event_id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.gateway} {self.topic} {self.event_id}"
+
+
+class OrderNotification(models.Model):
+    """Avisos ao cliente enfileirados para envio em lote (comando send_notifications)"""
+    KIND_CHOICES = [
+        ('shipped', 'Pedido Enviado'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviado'),
+        ('failed', 'Falhou'),
+    ]
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Pedido'
+    )
+    kind = models.CharField('Tipo', max_length=20, choices=KIND_CHOICES)
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField('Tentativas', default=0)
+    last_error = models.TextField('Último Erro', blank=True)
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    next_attempt_at = models.DateTimeField('Próxima Tentativa', default=timezone.now)
+    claimed_at = models.DateTimeField('Reservado em', null=True, blank=True)
+    sent_at = models.DateTimeField('Enviado em', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Aviso de Pedido'
+        verbose_name_plural = 'Avisos de Pedidos'
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'kind'], name='unique_order_notification'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} {self.kind}"
+
+
+class OrderTransition(models.Model):
+    """
+    Histórico de mudanças de status dos pedidos (uma linha por transição).
+
+    A referência ao pedido não tem chave estrangeira no banco: o histórico
+    continua válido depois que o pedido é arquivado.
+    """
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='transitions',
+        verbose_name='Pedido'
+    )
+    status_from = models.CharField('Status Anterior', max_length=20)
+    status_to = models.CharField('Status', max_length=20)
+    payment_status_from = models.CharField('Pagamento Anterior', max_length=20)
+    payment_status_to = models.CharField('Pagamento', max_length=20)
+    source = models.CharField('Origem', max_length=20, blank=True)
+    created_at = models.DateTimeField('Data', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Transição de Pedido'
+        verbose_name_plural = 'Transições de Pedidos'
+        indexes = [
+            models.Index(fields=['order', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id}: {self.status_from}/{self.payment_status_from} -> {self.status_to}/{self.payment_status_to}"
+
+
+class OrderStatusCount(models.Model):
+    """Quantidade de pedidos por (status, status do pagamento), mantida a cada transição"""
+    status = models.CharField('Status', max_length=20, choices=OrderFields.STATUS_CHOICES)
+    payment_status = models.CharField(
+        'Status do Pagamento', max_length=20, choices=OrderFields.PAYMENT_STATUS_CHOICES
+    )
+    count = models.IntegerField('Pedidos', default=0)
+
+    class Meta:
+        verbose_name = 'Contagem de Pedidos por Status'
+        verbose_name_plural = 'Contagens de Pedidos por Status'
+        ordering = ['status', 'payment_status']
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'payment_status'], name='unique_order_status_count'),
+        ]
+
+    def __str__(self):
+        return f"{self.status}/{self.payment_status}: {self.count}"
+
+
+class DailySalesFields(models.Model):
+    """Totais diários de vendas (atualizados de forma incremental)"""
+    date = models.DateField('Data')
+    orders = models.IntegerField('Pedidos', default=0)
+    units = models.IntegerField('Unidades', default=0)
+    revenue = models.DecimalField('Receita', max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    discounts = models.DecimalField('Descontos', max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        abstract = True
+        ordering = ['-date']
+
+
+class DailyCategorySales(DailySalesFields):
+    """Vendas por dia e categoria"""
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        verbose_name='Categoria'
+    )
+
+    class Meta(DailySalesFields.Meta):
+        verbose_name = 'Venda Diária por Categoria'
+        verbose_name_plural = 'Vendas Diárias por Categoria'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='unique_daily_category_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.category_id}"
+
+
+class DailyProductSales(DailySalesFields):
+    """Vendas por dia e produto"""
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        verbose_name='Produto'
+    )
+
+    class Meta(DailySalesFields.Meta):
+        verbose_name = 'Venda Diária por Produto'
+        verbose_name_plural = 'Vendas Diárias por Produto'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_product_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.product_id}"
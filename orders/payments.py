@@ -0,0 +1,245 @@
+"""
+Preferências de pagamento do Mercado Pago.
+
+A preferência é criada em segundo plano logo após o pedido ser gravado e fica
+armazenada no próprio pedido com uma data de expiração. As views de pagamento
+apenas reutilizam a preferência armazenada; o gateway só é chamado no fluxo da
+requisição quando ela ainda não existe ou expirou.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, router, transaction
+from django.urls import reverse
+from django.utils import timezone
+import logging
+import time
+
+from core.gateway import GatewayError, get_gateway_client
+from .models import Order, Payment
+
+logger = logging.getLogger(__name__)
+
+# Segundos em que a reserva do pedido vale (pior caso da chamada ao gateway, com as novas tentativas)
+PREFERENCE_CLAIM_TIMEOUT = 90
+
+# Espera pela preferência criada por outro processo
+PREFERENCE_WAIT_SECONDS = 5
+PREFERENCE_POLL_INTERVAL = 0.25
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.MERCADOPAGO_PREFERENCE_WORKERS,
+    thread_name_prefix='mp-preference',
+)
+
+
+def build_preference_data(order, expires_at):
+    """Monta os dados da preferência de pagamento para o pedido"""
+    items = []
+    for item in order.items.all():
+        items.append({
+            "title": item.product_name,
+            "quantity": item.quantity,
+            "unit_price": float(item.unit_price),
+            "currency_id": "BRL"
+        })
+
+    # Adicionar frete como item
+    if order.shipping_cost > 0:
+        items.append({
+            "title": f"Frete - {order.shipping_method}",
+            "quantity": 1,
+            "unit_price": float(order.shipping_cost),
+            "currency_id": "BRL"
+        })
+
+    def absolute_url(name, **kwargs):
+        return f"{settings.SITE_URL}{reverse(name, kwargs=kwargs)}"
+
+    return {
+        "items": items,
+        "payer": {
+            "name": order.first_name,
+            "surname": order.last_name,
+            "email": order.email,
+            "phone": {
+                "number": order.phone
+            } if order.phone else None
+        },
+        "back_urls": {
+            "success": absolute_url('orders:payment_success', order_id=order.id),
+            "failure": absolute_url('orders:payment_failure', order_id=order.id),
+            "pending": absolute_url('orders:payment_pending', order_id=order.id),
+        },
+        "notification_url": absolute_url('orders:mercadopago_webhook'),
+        "auto_return": "approved",
+        "external_reference": order.order_number,
+        "statement_descriptor": "LOJA ONLINE",
+        "expires": True,
+        "expiration_date_to": expires_at.isoformat(),
+    }
+
+
+def ensure_payment_preference(order, client=None):
+    """
+    Garante que o pedido tenha uma preferência de pagamento válida.
+
+    Reutiliza a preferência armazenada quando ainda não expirou; caso
+    contrário cria uma nova no gateway e atualiza o registro de pagamento
+    da preferência anterior (sem criar linhas duplicadas).
+
+    A tarefa em segundo plano e a view de pagamento podem chegar ao mesmo
+    tempo. Antes de chamar o gateway, o processo reserva o pedido em uma
+    transação curta (``payment_preference_requested_at``); a chamada HTTP
+    acontece fora de qualquer transação, com uma chave de idempotência
+    derivada da reserva, e o resultado só é gravado se a reserva ainda for
+    deste processo. Quem encontra a reserva de outro processo aguarda até
+    ``PREFERENCE_WAIT_SECONDS`` pela preferência.
+
+    Args:
+        order: Instância do modelo Order
+        client: Cliente do gateway (por padrão, o cliente compartilhado)
+
+    Returns:
+        Order: O pedido com os dados da preferência preenchidos
+
+    Raises:
+        GatewayError: Se o gateway não criar a preferência ou se outro
+            processo ainda estiver criando
+    """
+    if order.has_valid_payment_preference():
+        return order
+
+    using = router.db_for_write(Order)
+    deadline = time.monotonic() + PREFERENCE_WAIT_SECONDS
+    while True:
+        claim, previous_preference_id = _claim_preference(order, using)
+        if claim is not None or order.has_valid_payment_preference():
+            break
+        if time.monotonic() >= deadline:
+            raise GatewayError(f"Preferência do pedido {order.order_number} em criação por outro processo")
+        time.sleep(PREFERENCE_POLL_INTERVAL)
+
+    if claim is None:
+        return order
+
+    claimed = Order.objects.using(using).filter(pk=order.pk, payment_preference_requested_at=claim)
+    client = client or get_gateway_client()
+    expires_at = timezone.now() + timedelta(hours=settings.MERCADOPAGO_PREFERENCE_TTL_HOURS)
+    try:
+        preference_response = client.create_preference(
+            build_preference_data(order, expires_at),
+            idempotency_key=f"preference-{order.pk}-{claim.timestamp():.6f}",
+        )
+        if preference_response['status'] not in (200, 201):
+            raise GatewayError(f"Erro ao criar preferência: {preference_response}")
+    except Exception:
+        # Libera a reserva para a próxima tentativa
+        claimed.update(payment_preference_requested_at=None)
+        raise
+
+    preference = preference_response['response']
+    with transaction.atomic(using=using):
+        updated = claimed.update(
+            payment_preference_id=preference['id'],
+            payment_init_point=preference['init_point'],
+            payment_preference_expires_at=expires_at,
+            payment_preference_requested_at=None,
+        )
+        if not updated:
+            # A reserva expirou e outro processo gravou a preferência dele
+            _load_preference(order, Order.objects.using(using).get(pk=order.pk))
+            return order
+
+        order.payment_preference_id = preference['id']
+        order.payment_init_point = preference['init_point']
+        order.payment_preference_expires_at = expires_at
+        order.payment_preference_requested_at = None
+
+        # O pagamento é identificado pela preferência que ele acompanha
+        updated = 0
+        if previous_preference_id:
+            updated = Payment.objects.using(using).filter(
+                order=order,
+                gateway='mercadopago',
+                status='pending',
+                gateway_transaction_id=previous_preference_id,
+            ).update(
+                amount=order.total,
+                gateway_transaction_id=preference['id'],
+                updated_at=timezone.now(),
+            )
+        if not updated:
+            Payment.objects.using(using).create(
+                order=order,
+                gateway='mercadopago',
+                status='pending',
+                payment_method='mercadopago',
+                amount=order.total,
+                gateway_transaction_id=preference['id'],
+            )
+
+    return order
+
+
+def _load_preference(order, stored):
+    order.payment_preference_id = stored.payment_preference_id
+    order.payment_init_point = stored.payment_init_point
+    order.payment_preference_expires_at = stored.payment_preference_expires_at
+    order.payment_preference_requested_at = stored.payment_preference_requested_at
+
+
+def _claim_preference(order, using):
+    """
+    Reserva o pedido para criar a preferência (transação curta).
+
+    Returns:
+        tuple: (marca da reserva ou None, preferência anterior). Sem reserva
+        quando a preferência armazenada ainda vale ou outro processo a está
+        criando; os dados armazenados são copiados para ``order``.
+    """
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        stored = Order.objects.using(using).select_for_update().only(
+            'payment_preference_id', 'payment_init_point',
+            'payment_preference_expires_at', 'payment_preference_requested_at',
+        ).get(pk=order.pk)
+        _load_preference(order, stored)
+        if order.has_valid_payment_preference():
+            return None, None
+        requested_at = stored.payment_preference_requested_at
+        if requested_at and requested_at > now - timedelta(seconds=PREFERENCE_CLAIM_TIMEOUT):
+            return None, None
+        Order.objects.using(using).filter(pk=order.pk).update(payment_preference_requested_at=now)
+    order.payment_preference_requested_at = now
+    return now, stored.payment_preference_id
+
+
+def schedule_payment_preference(order_id):
+    """
+    Agenda a criação da preferência para depois do commit do pedido.
+
+    Com MERCADOPAGO_PREFERENCE_ASYNC desativado a criação acontece no próprio
+    processo, logo após o commit (útil em testes e scripts).
+    """
+    if settings.MERCADOPAGO_PREFERENCE_ASYNC:
+        transaction.on_commit(lambda: _executor.submit(_create_preference_task, order_id))
+    else:
+        transaction.on_commit(lambda: _create_preference(order_id))
+
+
+def _create_preference(order_id):
+    try:
+        order = Order.objects.get(pk=order_id)
+        ensure_payment_preference(order)
+    except Exception as e:
+        # A view de pagamento tenta novamente se a preferência não existir
+        logger.error(f"Erro ao criar preferência do pedido {order_id}: {str(e)}")
+
+
+def _create_preference_task(order_id):
+    try:
+        _create_preference(order_id)
+    finally:
+        # As threads do executor abrem suas próprias conexões com o banco
+        connection.close()
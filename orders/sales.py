@@ -0,0 +1,181 @@
+"""
+Tabelas de vendas diárias por categoria e por produto.
+
+Os totais são atualizados de forma incremental quando um pedido passa a
+contar como venda (pagamento confirmado) ou deixa de contar (cancelamento).
+``Order.sales_recorded_at`` marca os pedidos já somados, de modo que
+notificações repetidas ou reprocessamentos não contam o mesmo pedido duas
+vezes. O painel de vendas lê apenas estas tabelas.
+
+O desconto do pedido é distribuído entre os itens proporcionalmente ao
+valor de cada um.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedOrder, DailyCategorySales, DailyProductSales, Order
+
+# Pedidos que deixam de contar como venda mesmo com pagamento confirmado
+VOID_STATUSES = ['cancelled', 'refunded']
+
+CENT = Decimal('0.01')
+
+
+def countable_orders(model=Order):
+    """Pedidos com pagamento confirmado que não foram cancelados nem reembolsados"""
+    return model.objects.filter(payment_status='completed').exclude(status__in=VOID_STATUSES)
+
+
+def _collect(model, orders):
+    """Soma os itens dos pedidos por (data, categoria) e (data, produto)"""
+    item_model = model._meta.get_field('items').related_model
+    orders = {order.id: order for order in orders}
+    items = (
+        item_model.objects.filter(order_id__in=orders.keys())
+        .values_list('order_id', 'product_id', 'product__category_id', 'quantity', 'total_price')
+    )
+
+    lines_by_order = defaultdict(list)
+    for order_id, product_id, category_id, quantity, total_price in items:
+        lines_by_order[order_id].append((product_id, category_id, quantity, total_price))
+
+    def totals():
+        return {'orders': 0, 'units': 0, 'revenue': Decimal('0.00'), 'discounts': Decimal('0.00')}
+
+    by_category = defaultdict(totals)
+    by_product = defaultdict(totals)
+    for order_id, lines in lines_by_order.items():
+        order = orders[order_id]
+        day = timezone.localdate(order.created_at)
+        subtotal = sum(total_price for _, _, _, total_price in lines)
+
+        categories = set()
+        products = set()
+        for product_id, category_id, quantity, total_price in lines:
+            discount = Decimal('0.00')
+            if order.discount_amount and subtotal:
+                discount = (order.discount_amount * total_price / subtotal).quantize(
+                    CENT, rounding=ROUND_HALF_UP
+                )
+            for key, target in (((day, category_id), by_category), ((day, product_id), by_product)):
+                target[key]['units'] += quantity
+                target[key]['revenue'] += total_price
+                target[key]['discounts'] += discount
+
+            categories.add(category_id)
+            products.add(product_id)
+
+        for category_id in categories:
+            by_category[(day, category_id)]['orders'] += 1
+        for product_id in products:
+            by_product[(day, product_id)]['orders'] += 1
+
+    return by_category, by_product
+
+
+def _apply(rollup_model, key_field, totals, sign):
+    """Soma (ou subtrai) os totais nas linhas das tabelas de vendas diárias"""
+    # Ordem fixa: duas transações nunca bloqueiam as mesmas linhas em ordens diferentes
+    for (day, key), values in sorted(totals.items()):
+        lookup = {'date': day, key_field: key}
+        updated = rollup_model.objects.filter(**lookup).update(
+            **{field: F(field) + sign * value for field, value in values.items()}
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                rollup_model.objects.create(
+                    **lookup, **{field: sign * value for field, value in values.items()}
+                )
+        except IntegrityError:
+            # Outro processo criou a linha ao mesmo tempo
+            rollup_model.objects.filter(**lookup).update(
+                **{field: F(field) + sign * value for field, value in values.items()}
+            )
+
+
+def _update_rollups(model, order_ids, record):
+    with transaction.atomic():
+        orders = list(
+            model.objects.select_for_update()
+            .filter(id__in=order_ids, sales_recorded_at__isnull=record)
+            .only('id', 'created_at', 'discount_amount')
+        )
+        if not orders:
+            return 0
+
+        model.objects.filter(id__in=[order.id for order in orders]).update(
+            sales_recorded_at=timezone.now() if record else None
+        )
+        by_category, by_product = _collect(model, orders)
+        sign = 1 if record else -1
+        _apply(DailyCategorySales, 'category_id', by_category, sign)
+        _apply(DailyProductSales, 'product_id', by_product, sign)
+    return len(orders)
+
+
+def record_order_sales(order_ids, model=Order):
+    """
+    Soma os pedidos às tabelas de vendas diárias (pedidos já somados são ignorados).
+
+    Returns:
+        int: Quantidade de pedidos somados
+    """
+    order_ids = countable_orders(model).filter(id__in=order_ids).values_list('id', flat=True)
+    return _update_rollups(model, list(order_ids), record=True)
+
+
+def revert_order_sales(order_ids, model=Order):
+    """
+    Retira os pedidos das tabelas de vendas diárias (ex: após cancelamento).
+
+    Returns:
+        int: Quantidade de pedidos retirados
+    """
+    return _update_rollups(model, list(order_ids), record=False)
+
+
+def backfill_sales(batch_size=1000, rebuild=False, progress=None):
+    """
+    Soma às tabelas de vendas os pedidos ainda não registrados, em blocos.
+
+    Inclui os pedidos arquivados. Com ``rebuild`` as tabelas são apagadas e
+    todos os pedidos são somados novamente.
+
+    Args:
+        batch_size: Quantidade de pedidos por transação
+        rebuild: Recalcula as tabelas desde o início
+        progress: Função chamada após cada bloco com (pedidos somados, total)
+
+    Returns:
+        int: Quantidade de pedidos somados
+    """
+    models = [Order, ArchivedOrder]
+    if rebuild:
+        with transaction.atomic():
+            DailyCategorySales.objects.all().delete()
+            DailyProductSales.objects.all().delete()
+            for model in models:
+                model.objects.exclude(sales_recorded_at=None).update(sales_recorded_at=None)
+
+    pending = [countable_orders(model).filter(sales_recorded_at=None) for model in models]
+    total = sum(queryset.count() for queryset in pending)
+    recorded = 0
+    for model, queryset in zip(models, pending):
+        last_id = 0
+        while True:
+            ids = list(
+                queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            recorded += _update_rollups(model, ids, record=True)
+            last_id = ids[-1]
+            if progress:
+                progress(recorded, total)
+
+    return recorded
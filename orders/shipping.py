@@ -0,0 +1,141 @@
+"""
+Índice em memória das tarifas de frete.
+
+Todas as tarifas ativas e as faixas de CEP das regiões são carregadas uma vez
+por processo em listas ordenadas, e a cotação para (peso, CEP) é resolvida
+com busca binária, sem consultas ao banco. O índice é recarregado quando a
+versão guardada no cache muda (ver ``bump_rates_version``, chamado pelos
+sinais de ShippingRate, ShippingZone e ShippingZoneRange).
+"""
+from bisect import bisect_right
+from django.core.cache import cache
+from decimal import Decimal
+import threading
+import uuid
+
+from .models import ShippingRate, ShippingZoneRange
+
+RATES_VERSION_KEY = 'shipping:rates:version'
+
+
+class IntervalList:
+    """
+    Lista de intervalos fechados [início, fim] ordenada pelo início.
+
+    ``containing(ponto)`` encontra por busca binária o último intervalo que
+    começa antes do ponto e percorre para trás apenas enquanto o maior fim
+    acumulado ainda alcança o ponto.
+    """
+
+    def __init__(self, intervals):
+        intervals = sorted(intervals, key=lambda interval: interval[0])
+        self.starts = [start for start, _, _ in intervals]
+        self.intervals = intervals
+        self.max_ends = []
+        max_end = None
+        for _, end, _ in intervals:
+            max_end = end if max_end is None else max(max_end, end)
+            self.max_ends.append(max_end)
+
+    def containing(self, point):
+        """Retorna os valores dos intervalos que contêm o ponto"""
+        found = []
+        index = bisect_right(self.starts, point) - 1
+        while index >= 0 and self.max_ends[index] >= point:
+            _, end, value = self.intervals[index]
+            if end >= point:
+                found.append(value)
+            index -= 1
+        return found
+
+
+class RateIndex:
+    """Tarifas agrupadas por região, indexadas por faixa de peso"""
+
+    def __init__(self, version, rates, zone_ranges):
+        self.version = version
+
+        rates_by_zone = {}
+        for rate in rates:
+            rates_by_zone.setdefault(rate.zone_id, []).append(
+                (rate.min_weight, rate.max_weight, rate)
+            )
+        self.rates_by_zone = {
+            zone_id: IntervalList(intervals)
+            for zone_id, intervals in rates_by_zone.items()
+        }
+        self.zones = IntervalList(
+            (int(zone_range.cep_start), int(zone_range.cep_end), zone_range.zone_id)
+            for zone_range in zone_ranges
+        )
+
+    def zones_for(self, postal_code):
+        """Regiões que contêm o CEP informado"""
+        digits = ''.join(filter(str.isdigit, str(postal_code or '')))
+        if len(digits) < 5:
+            return []
+        return self.zones.containing(int(digits[:5]))
+
+    def find(self, weight, postal_code=None):
+        """Tarifas aplicáveis ao peso e ao CEP, na ordem padrão do modelo"""
+        zone_ids = [None] + self.zones_for(postal_code)
+        rates = []
+        for zone_id in zone_ids:
+            intervals = self.rates_by_zone.get(zone_id)
+            if intervals:
+                rates.extend(intervals.containing(weight))
+        return sorted(rates, key=lambda rate: (rate.delivery_time, rate.base_price, rate.id))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_rate_index():
+    """
+    Retorna o índice do processo, recarregando-o se a versão mudou.
+
+    No caminho comum há apenas uma leitura no cache e nenhuma consulta ao banco.
+    """
+    global _index
+    version = cache.get(RATES_VERSION_KEY)
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                rates = ShippingRate.objects.filter(is_active=True)
+                zone_ranges = ShippingZoneRange.objects.filter(zone__is_active=True)
+                _index = RateIndex(version, list(rates), list(zone_ranges))
+            index = _index
+    return index
+
+
+def bump_rates_version():
+    """Invalida os índices de todos os processos"""
+    cache.set(RATES_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def quote_shipping(weight, postal_code=None):
+    """
+    Calcula as opções de frete para o peso e o CEP de destino.
+
+    Args:
+        weight: Peso total em kg
+        postal_code: CEP de destino (opcional; sem ele só valem tarifas nacionais)
+
+    Returns:
+        list: Opções de frete com custo e prazo
+    """
+    weight = Decimal(str(weight))
+    options = []
+    for rate in get_rate_index().find(weight, postal_code):
+        cost = rate.calculate_shipping_cost(weight)
+        options.append({
+            'id': rate.id,
+            'name': rate.name,
+            'carrier': rate.carrier,
+            'cost': cost,
+            'delivery_time': rate.delivery_time,
+            'description': f"{rate.carrier} - {rate.name} (até {rate.delivery_time} dias úteis)"
+        })
+    return options
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Order, ShippingRate, ShippingZone, ShippingZoneRange
+from .shipping import bump_rates_version
+from .transitions import count_new_orders
+
+
+@receiver([post_save, post_delete], sender=ShippingRate)
+@receiver([post_save, post_delete], sender=ShippingZone)
+@receiver([post_save, post_delete], sender=ShippingZoneRange)
+def shipping_rates_changed(sender, using=None, **kwargs):
+    """
+    Invalida o índice de tarifas de frete em memória.
+
+    A versão muda depois do commit: antes dele, outro processo reconstruiria
+    o índice com as tarifas antigas e o guardaria com a versão nova.
+    """
+    transaction.on_commit(bump_rates_version, using=using)
+
+
+@receiver(post_save, sender=Order)
+def order_created(sender, instance, created, raw=False, **kwargs):
+    """Soma o pedido novo aos contadores por status"""
+    if created and not raw:
+        count_new_orders([instance])
@@ -1,3 +1,996 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import io
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from unittest import mock
+import pyarrow.parquet as pq
+
+from store.models import Category, InventoryMovement, Product
+from .archive import archive_orders
+from .events import Subscription, get_order_events
+from .export import export_all
+from .fulfillment import import_shipments, read_shipments, send_pending_notifications
+from .models import (
+    ArchivedOrder, DailyCategorySales, DailyProductSales, Order, OrderItem, OrderNotification,
+    OrderStatusCount, OrderTransition, Payment, ShippingRate, ShippingZone, ShippingZoneRange, WebhookEvent
+)
+from .sales import backfill_sales, record_order_sales
+from .shipping import quote_shipping
+from .payments import ensure_payment_preference, schedule_payment_preference
+from .transitions import InvalidTransition, rebuild_status_counts, transition_order
+from .webhooks import MAX_ATTEMPTS, process_pending_events, requeue_failed_events
+from core.gateway import CircuitBreaker, CircuitOpenError, GatewayClient, GatewayError
+from core.services import FreteService
+
+User = get_user_model()
+
+
+class FakeGateway:
+    """
+    Gateway falso que responde com pagamentos pré-definidos e conta consultas.
+    """
+
+    def __init__(self, payments):
+        self.payments = payments
+        self.calls = []
+
+    def get_payment_info(self, payment_id):
+        self.calls.append(payment_id)
+        if payment_id in self.payments:
+            return {"success": True, "payment": self.payments[payment_id]}
+        return {"success": False, "error": "Pagamento não encontrado"}
+
+
+class FakePreferenceClient:
+    """
+    Cliente falso do gateway que cria preferências numeradas.
+    """
+
+    def __init__(self):
+        self.created = 0
+
+    def create_preference(self, preference_data, idempotency_key=None):
+        self.created += 1
+        return {
+            'status': 201,
+            'response': {
+                'id': f'PREF-{self.created}',
+                'init_point': f'https://example.com/pay/{self.created}',
+            }
+        }
+
+
+def create_order(user, **kwargs):
+    """Cria um pedido simples com um item."""
+    category, _ = Category.objects.get_or_create(name='Eletrônicos', slug='eletronicos')
+    product, _ = Product.objects.get_or_create(
+        sku='SMART001',
+        defaults={
+            'name': 'Smartphone',
+            'slug': 'smartphone',
+            'category': category,
+            'description': 'Uma descrição do smartphone',
+            'price': Decimal('999.99'),
+            'stock_quantity': 10,
+        }
+    )
+    data = {
+        'user': user,
+        'email': user.email,
+        'first_name': 'Maria',
+        'last_name': 'Silva',
+        'shipping_address_line_1': 'Rua A, 1',
+        'shipping_city': 'São Paulo',
+        'shipping_state': 'SP',
+        'shipping_postal_code': '01310-100',
+        'subtotal': Decimal('999.99'),
+        'total': Decimal('999.99'),
+    }
+    data.update(kwargs)
+    order = Order.objects.create(**data)
+    OrderItem.objects.create(
+        order=order,
+        product=product,
+        quantity=1,
+        unit_price=Decimal('999.99'),
+        total_price=Decimal('999.99')
+    )
+    return order
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    """
+    Servidor HTTP local que imita a API do Mercado Pago.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        if self.server.fail:
+            self.reply(503, {'message': 'indisponível'})
+        else:
+            self.reply(200, {'id': self.path.rsplit('/', 1)[-1], 'status': 'approved'})
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address)
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.reply(201, {'id': 'PREF-1', 'init_point': 'https://example.com/pay'})
+
+    def reply(self, status, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GatewayClientTest(SimpleTestCase):
+    """
+    Testes para o cliente HTTP compartilhado do gateway, usando um servidor local.
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubGatewayHandler)
+        self.server.connections = set()
+        self.server.fail = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        host, port = self.server.server_address
+        self.client = GatewayClient(
+            access_token='TEST',
+            base_url=f'http://{host}:{port}',
+            max_retries=0,
+            breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        )
+        self.addCleanup(self.client.session.close)
+
+    def test_reuses_connection(self):
+        """Testa que chamadas consecutivas reaproveitam a mesma conexão."""
+        self.client.get_payment('1')
+        self.client.get_payment('2')
+        response = self.client.create_preference({'items': []})
+
+        self.assertEqual(response['status'], 201)
+        self.assertEqual(response['response']['id'], 'PREF-1')
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_circuit_opens_after_failures(self):
+        """Testa que o disjuntor recusa chamadas após falhas consecutivas."""
+        self.server.fail = True
+        self.client.get_payment('1')
+        self.client.get_payment('2')
+
+        with self.assertRaises(CircuitOpenError):
+            self.client.get_payment('3')
+
+        stats = self.client.stats()
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['errors'], 2)
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(stats['circuit_state'], 'open')
+
+
+class MercadoPagoWebhookTest(TestCase):
+    """
+    Testes para o registro e processamento de webhooks do Mercado Pago.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.order = create_order(self.user)
+        self.payment = Payment.objects.create(
+            order=self.order,
+            payment_method='credit_card',
+            amount=self.order.total,
+            gateway='mercadopago',
+            gateway_transaction_id='PREF-1'
+        )
+        self.url = reverse('orders:mercadopago_webhook')
+
+    def notify(self, event_id, payment_id):
+        return self.client.post(
+            self.url,
+            data=json.dumps({'id': event_id, 'type': 'payment', 'data': {'id': payment_id}}),
+            content_type='application/json'
+        )
+
+    def test_webhook_only_records_event(self):
+        """Testa que o webhook responde sem consultar o gateway."""
+        response = self.notify(1, '555')
+
+        self.assertEqual(response.status_code, 200)
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.resource_id, '555')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'pending')
+
+    def test_webhook_deduplicates_redeliveries(self):
+        """Testa que reentregas da mesma notificação não são duplicadas."""
+        self.notify(1, '555')
+        self.notify(1, '555')
+
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_webhook_rejects_invalid_json(self):
+        """Testa que um corpo inválido é recusado."""
+        response = self.client.post(self.url, data='{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_process_coalesces_events_for_same_payment(self):
+        """Testa que várias notificações do mesmo pagamento geram uma consulta."""
+        self.notify(1, '555')
+        self.notify(2, '555')
+        gateway = FakeGateway({
+            '555': {
+                'status': 'approved',
+                'external_reference': self.order.order_number,
+                'preference_id': 'PREF-1',
+            }
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = process_pending_events(gateway=gateway)
+
+        self.assertEqual(result, {'processed': 2, 'failed': 0})
+        self.assertEqual(gateway.calls, ['555'])
+        self.order.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.order.status, 'confirmed')
+        self.assertEqual(self.order.payment_status, 'completed')
+        self.assertEqual(self.payment.status, 'completed')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(WebhookEvent.objects.filter(status='pending').exists())
+
+    def test_process_does_not_resend_confirmation(self):
+        """Testa que notificações repetidas de pedido já pago não reenviam e-mail."""
+        gateway = FakeGateway({
+            '555': {
+                'status': 'approved',
+                'external_reference': self.order.order_number,
+                'preference_id': 'PREF-1',
+            }
+        })
+        self.notify(1, '555')
+        with self.captureOnCommitCallbacks(execute=True):
+            process_pending_events(gateway=gateway)
+        self.notify(2, '555')
+        with self.captureOnCommitCallbacks(execute=True):
+            process_pending_events(gateway=gateway)
+
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_process_keeps_event_pending_on_gateway_error(self):
+        """Testa que falhas do gateway mantêm o evento na fila para nova tentativa."""
+        self.notify(1, '999')
+
+        result = process_pending_events(gateway=FakeGateway({}))
+
+        self.assertEqual(result, {'processed': 0, 'failed': 1})
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+        # A nova tentativa só acontece depois da espera
+        self.assertEqual(process_pending_events(gateway=FakeGateway({})), {'processed': 0, 'failed': 0})
+        with mock.patch('orders.webhooks.timezone.now', return_value=timezone.now() + timedelta(minutes=1)):
+            result = process_pending_events(gateway=FakeGateway({}))
+        self.assertEqual(result, {'processed': 0, 'failed': 1})
+        self.assertEqual(WebhookEvent.objects.get().attempts, 2)
+
+    def test_failed_events_can_be_requeued(self):
+        """Testa que eventos que esgotaram as tentativas voltam para a fila."""
+        self.notify(1, '999')
+        WebhookEvent.objects.update(status='failed', attempts=MAX_ATTEMPTS)
+
+        self.assertEqual(requeue_failed_events(), 1)
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.attempts, 0)
+
+
+class PaymentPreferenceTest(TestCase):
+    """
+    Testes para a criação antecipada e reutilização de preferências de pagamento.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.client.force_login(self.user)
+        self.order = create_order(self.user)
+        self.gateway = FakePreferenceClient()
+
+    def test_preference_is_reused(self):
+        """Testa que chamadas repetidas reutilizam a mesma preferência e pagamento."""
+        ensure_payment_preference(self.order, client=self.gateway)
+        ensure_payment_preference(self.order, client=self.gateway)
+
+        self.assertEqual(self.gateway.created, 1)
+        self.assertEqual(self.order.payments.count(), 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_preference_id, 'PREF-1')
+
+    def test_expired_preference_is_replaced(self):
+        """Testa que uma preferência expirada é recriada sem duplicar o pagamento."""
+        ensure_payment_preference(self.order, client=self.gateway)
+        self.order.payment_preference_expires_at = timezone.now() - timedelta(minutes=1)
+        Order.objects.filter(pk=self.order.pk).update(
+            payment_preference_expires_at=self.order.payment_preference_expires_at
+        )
+
+        ensure_payment_preference(self.order, client=self.gateway)
+
+        self.assertEqual(self.gateway.created, 2)
+        payment = self.order.payments.get()
+        self.assertEqual(payment.gateway_transaction_id, 'PREF-2')
+
+    def test_preference_created_concurrently_is_reused(self):
+        """Testa que a preferência gravada por outro processo é reutilizada."""
+        stale = Order.objects.get(pk=self.order.pk)
+        ensure_payment_preference(self.order, client=self.gateway)
+        # Pagamento pendente de outra tentativa não interfere na busca
+        self.order.payments.create(
+            gateway='mercadopago', status='pending', payment_method='pix',
+            amount=self.order.total, gateway_transaction_id='OUTRO',
+        )
+
+        ensure_payment_preference(stale, client=self.gateway)
+
+        self.assertEqual(self.gateway.created, 1)
+        self.assertEqual(stale.payment_preference_id, 'PREF-1')
+        self.assertEqual(self.order.payments.filter(gateway_transaction_id='PREF-1').count(), 1)
+
+    @mock.patch('orders.payments.PREFERENCE_WAIT_SECONDS', 0)
+    def test_preference_claimed_by_another_process_is_not_duplicated(self):
+        """Testa que a reserva de outro processo impede uma segunda chamada ao gateway."""
+        Order.objects.filter(pk=self.order.pk).update(payment_preference_requested_at=timezone.now())
+
+        with self.assertRaises(GatewayError):
+            ensure_payment_preference(self.order, client=self.gateway)
+        self.assertEqual(self.gateway.created, 0)
+
+        # Reserva abandonada (processo interrompido) expira
+        Order.objects.filter(pk=self.order.pk).update(
+            payment_preference_requested_at=timezone.now() - timedelta(minutes=5)
+        )
+        ensure_payment_preference(self.order, client=self.gateway)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_preference_id, 'PREF-1')
+        self.assertIsNone(self.order.payment_preference_requested_at)
+
+    def test_gateway_error_releases_claim(self):
+        """Testa que uma falha do gateway libera a reserva para a próxima tentativa."""
+        self.gateway.create_preference = mock.Mock(return_value={'status': 500, 'response': None})
+
+        with self.assertRaises(GatewayError):
+            ensure_payment_preference(self.order, client=self.gateway)
+
+        self.order.refresh_from_db()
+        self.assertIsNone(self.order.payment_preference_requested_at)
+
+    @override_settings(MERCADOPAGO_PREFERENCE_ASYNC=False)
+    def test_preference_created_after_commit(self):
+        """Testa que a preferência é criada após o commit do pedido."""
+        with mock.patch('orders.payments.get_gateway_client', return_value=self.gateway):
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_payment_preference(self.order.id)
+
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.has_valid_payment_preference())
+
+    def test_pay_endpoints_do_not_call_gateway(self):
+        """Testa que a página de pagamento e create_payment usam a preferência armazenada."""
+        ensure_payment_preference(self.order, client=self.gateway)
+
+        with mock.patch('orders.payments.get_gateway_client') as get_client:
+            response = self.client.get(reverse('orders:payment', kwargs={'order_id': self.order.id}))
+            self.assertContains(response, 'https://example.com/pay/1')
+
+            response = self.client.post(
+                reverse('orders:create_payment', kwargs={'order_id': self.order.id})
+            )
+            self.assertEqual(response.json()['init_point'], 'https://example.com/pay/1')
+
+        get_client.assert_not_called()
+
+
+class StubCorreiosHandler(BaseHTTPRequestHandler):
+    """
+    Servidor HTTP local que imita a cotação dos Correios, com atraso por serviço.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        servico = parse_qs(urlparse(self.path).query)['servico'][0]
+        self.server.requests.append(servico)
+        time.sleep(self.server.delays.get(servico, 0))
+        content = json.dumps({'valor': '20.00', 'prazo': '3 dias úteis'}).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente desistiu da cotação lenta
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FreteServiceTest(TestCase):
+    """
+    Testes para a cotação paralela e em cache do FreteService.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubCorreiosHandler)
+        self.server.requests = []
+        self.server.delays = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        host, port = self.server.server_address
+        settings_override = override_settings(
+            CORREIOS_API_URL=f'http://{host}:{port}/calcular',
+            CORREIOS_QUOTE_TIMEOUT=0.5,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        ShippingRate.objects.create(
+            name='Econômico',
+            carrier='Transportadora',
+            base_price=Decimal('12.00'),
+        )
+
+    def quote(self, cep='04567-000', peso=1.2):
+        return FreteService().calculate_shipping(cep, peso, 20, 10, 15)
+
+    def test_services_are_quoted_concurrently(self):
+        """Testa que os serviços são cotados em paralelo."""
+        self.server.delays = {'04014': 0.3, '04510': 0.3, '04782': 0.3}
+
+        start = time.monotonic()
+        result = self.quote()
+
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual(len(result['opcoes']), 3)
+
+    def test_quotes_are_cached_by_region_and_bucket(self):
+        """Testa que cotações na mesma região e faixa de peso usam o cache."""
+        first = self.quote(cep='04567-000', peso=1.2)
+        second = self.quote(cep='04567-999', peso=1.4)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_slow_carrier_falls_back_to_rate_table(self):
+        """Testa que serviços lentos são substituídos pela tabela de frete."""
+        self.server.delays = {'04782': 1.5}
+
+        result = self.quote()
+
+        codes = [opcao['codigo'] for opcao in result['opcoes']]
+        self.assertIn('04014', codes)
+        self.assertNotIn('04782', codes)
+        self.assertTrue(any(code.startswith('tabela-') for code in codes))
+
+        # Resultado parcial não deve ficar em cache
+        self.quote()
+        self.assertEqual(self.server.requests.count('04014'), 2)
+
+
+class ShippingRateIndexTest(TestCase):
+    """
+    Testes para o índice em memória de tarifas por faixa de peso e região.
+    """
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sudeste = ShippingZone.objects.create(name='Capital SP', state='SP')
+            ShippingZoneRange.objects.create(zone=self.sudeste, cep_start='01000', cep_end='05999')
+            ShippingRate.objects.create(
+                name='Nacional Leve', carrier='Correios',
+                min_weight=Decimal('0'), max_weight=Decimal('5'),
+                base_price=Decimal('20.00'), delivery_time=7
+            )
+            ShippingRate.objects.create(
+                name='Nacional Pesado', carrier='Correios',
+                min_weight=Decimal('5'), max_weight=Decimal('30'),
+                base_price=Decimal('40.00'), price_per_kg=Decimal('2.00'), delivery_time=9
+            )
+            ShippingRate.objects.create(
+                name='Expresso Capital', carrier='Motoboy', zone=self.sudeste,
+                min_weight=Decimal('0'), max_weight=Decimal('10'),
+                base_price=Decimal('15.00'), delivery_time=1
+            )
+
+    def test_quote_by_weight_and_zone(self):
+        """Testa a seleção de tarifas por peso e região de CEP."""
+        names = [option['name'] for option in quote_shipping(Decimal('2'), '01310-100')]
+        self.assertEqual(names, ['Expresso Capital', 'Nacional Leve'])
+
+        names = [option['name'] for option in quote_shipping(Decimal('2'), '90000-000')]
+        self.assertEqual(names, ['Nacional Leve'])
+
+        options = quote_shipping(Decimal('8'), '01310-100')
+        self.assertEqual([option['name'] for option in options], ['Expresso Capital', 'Nacional Pesado'])
+        self.assertEqual(options[1]['cost'], Decimal('46.00'))
+
+    def test_quote_without_queries(self):
+        """Testa que, com o índice carregado, a cotação não consulta o banco."""
+        quote_shipping(Decimal('2'), '01310-100')
+
+        with self.assertNumQueries(0):
+            quote_shipping(Decimal('3'), '02000-000')
+
+    def test_index_reloads_when_rates_change(self):
+        """Testa que alterações nas tarifas invalidam o índice."""
+        quote_shipping(Decimal('2'))
+        with self.captureOnCommitCallbacks(execute=True):
+            ShippingRate.objects.filter(name='Nacional Leve').get().delete()
+
+        self.assertEqual(quote_shipping(Decimal('2')), [])
+
+
+class CancelOrderTest(TestCase):
+    """
+    Testes para a devolução de estoque no cancelamento de pedidos.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.client.force_login(self.user)
+        self.order = create_order(self.user)
+        self.product = self.order.items.get().product
+
+    def test_cancel_appends_ledger_movements(self):
+        """Testa que o cancelamento devolve o estoque pelo livro-razão."""
+        self.client.post(reverse('orders:cancel_order', args=[self.order.id]))
+
+        movement = InventoryMovement.objects.get(product=self.product)
+        self.assertEqual(movement.kind, 'cancel')
+        self.assertEqual(movement.quantity, 1)
+        self.assertEqual(movement.reference, self.order.order_number)
+        self.assertEqual(self.product.current_stock, 11)
+
+
+class OrderArchiveTest(TestCase):
+    """
+    Testes para o arquivamento de pedidos encerrados.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.client.force_login(self.user)
+        now = timezone.now()
+
+        self.old_delivered = create_order(self.user, status='delivered')
+        Payment.objects.create(
+            order=self.old_delivered,
+            payment_method='pix',
+            amount=Decimal('999.99'),
+            status='completed'
+        )
+        self.old_pending = create_order(self.user)
+        self.recent_delivered = create_order(self.user, status='delivered')
+
+        Order.objects.filter(pk=self.old_delivered.pk).update(created_at=now - timedelta(days=400))
+        Order.objects.filter(pk=self.old_pending.pk).update(created_at=now - timedelta(days=300))
+
+    def test_only_old_closed_orders_are_archived(self):
+        """Testa que só pedidos encerrados e antigos são movidos, com itens e pagamentos."""
+        progress = []
+
+        archived = archive_orders(older_than_days=180, progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(archived, 1)
+        self.assertEqual(progress, [(1, 1)])
+        self.assertFalse(Order.objects.filter(pk=self.old_delivered.pk).exists())
+
+        archived_order = ArchivedOrder.objects.get(pk=self.old_delivered.pk)
+        self.assertEqual(archived_order.order_number, self.old_delivered.order_number)
+        self.assertEqual(archived_order.created_at.date(), (timezone.now() - timedelta(days=400)).date())
+        self.assertEqual(archived_order.items.count(), 1)
+        self.assertEqual(archived_order.payments.get().status, 'completed')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_history_includes_archived_orders(self):
+        """Testa que a lista e o detalhe de pedidos enxergam os arquivados."""
+        archive_orders(older_than_days=180)
+
+        response = self.client.get(reverse('orders:order_list'))
+
+        self.assertEqual(
+            [order.pk for order in response.context['orders']],
+            [self.recent_delivered.pk, self.old_pending.pk, self.old_delivered.pk]
+        )
+
+        response = self.client.get(reverse('orders:order_detail', args=[self.old_delivered.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.context['order'], ArchivedOrder)
+
+
+class DailySalesTest(TestCase):
+    """
+    Testes para as tabelas de vendas diárias.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.order = create_order(
+            self.user, payment_status='completed', status='confirmed', discount_amount=Decimal('99.99')
+        )
+
+    def test_orders_are_recorded_once_and_reverted_on_cancel(self):
+        """Testa que o pedido pago é somado uma vez e retirado ao ser cancelado."""
+        self.assertEqual(record_order_sales([self.order.id]), 1)
+        self.assertEqual(record_order_sales([self.order.id]), 0)
+
+        sales = DailyProductSales.objects.get()
+        self.assertEqual((sales.orders, sales.units), (1, 1))
+        self.assertEqual(sales.revenue, Decimal('999.99'))
+        self.assertEqual(sales.discounts, Decimal('99.99'))
+        self.assertEqual(DailyCategorySales.objects.get().revenue, Decimal('999.99'))
+
+        self.client.force_login(self.user)
+        self.client.post(reverse('orders:cancel_order', args=[self.order.id]))
+
+        sales.refresh_from_db()
+        self.assertEqual((sales.orders, sales.units, sales.revenue), (0, 0, Decimal('0.00')))
+
+    def test_backfill_and_dashboard(self):
+        """Testa o preenchimento do histórico e o painel que lê as tabelas."""
+        create_order(self.user)  # pendente: não conta como venda
+
+        self.assertEqual(backfill_sales(), 1)
+        self.assertEqual(backfill_sales(rebuild=True), 1)
+        self.assertEqual(DailyProductSales.objects.get().units, 1)
+
+        admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='senha-segura-123', is_staff=True
+        )
+        self.client.force_login(admin)
+        response = self.client.get(reverse('orders:sales_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['summary']['revenue'], Decimal('999.99'))
+        self.assertContains(response, 'SMART001')
+
+
+@mock.patch('orders.export.SAFETY_LAG', timedelta(0))
+class ParquetExportTest(TestCase):
+    """
+    Testes para a exportação incremental em Parquet.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.order = create_order(self.user)
+        self.output = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output.cleanup)
+
+    def test_export_is_partitioned_typed_and_incremental(self):
+        """Testa as partições por mês, o schema e a exportação apenas do que mudou."""
+        result = export_all(self.output.name)
+        self.assertEqual(result, {'orders': 1, 'order_items': 1, 'payments': 0, 'products': 1})
+
+        month = self.order.created_at.strftime('%Y-%m')
+        files = list((Path(self.output.name) / 'orders' / f"month={month}").glob('*.parquet'))
+        self.assertEqual(len(files), 1)
+
+        table = pq.read_table(files[0])
+        self.assertEqual(str(table.schema.field('total').type), 'decimal128(10, 2)')
+        self.assertEqual(str(table.schema.field('created_at').type), 'timestamp[us, tz=UTC]')
+        self.assertEqual(table.column('total')[0].as_py(), Decimal('999.99'))
+
+        self.assertEqual(sum(export_all(self.output.name).values()), 0)
+
+        self.order.status = 'processing'
+        self.order.save()
+        result = export_all(self.output.name)
+        self.assertEqual(result, {'orders': 1, 'order_items': 1, 'payments': 0, 'products': 0})
+
+
+class OrderAdminTest(TestCase):
+    """
+    Testes para o admin de pedidos.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='senha-segura-123'
+        )
+        self.client.force_login(self.user)
+
+    def test_mark_shipped_only_updates_eligible_orders(self):
+        """Testa que a ação só marca como enviados os pedidos confirmados ou em processamento."""
+        confirmed = create_order(self.user, status='confirmed')
+        pending = create_order(self.user)
+
+        response = self.client.post(
+            reverse('admin:orders_order_changelist'),
+            {'action': 'mark_shipped', '_selected_action': [confirmed.pk, pending.pk]}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        confirmed.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertEqual(confirmed.status, 'shipped')
+        self.assertIsNotNone(confirmed.shipped_at)
+        self.assertEqual(pending.status, 'pending')
+
+
+class FulfillmentTest(TestCase):
+    """
+    Testes para a importação de envios e a fila de avisos.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.confirmed = create_order(self.user, status='confirmed')
+        self.cancelled = create_order(self.user, status='cancelled')
+
+    def run_import(self, content):
+        return import_shipments(read_shipments(io.StringIO(content)), chunk_size=1)
+
+    def test_import_ships_orders_and_queues_one_notification(self):
+        """Testa o envio em lote, os erros de validação e a reimportação sem efeitos."""
+        content = (
+            'order_number;tracking_number\n'
+            f'{self.confirmed.order_number};BR123\n'
+            f'{self.cancelled.order_number};BR456\n'
+            'PED-INEXISTENTE;BR789\n'
+        )
+        result = self.run_import(content)
+
+        self.assertEqual((result['shipped'], len(result['errors'])), (1, 2))
+        self.confirmed.refresh_from_db()
+        self.assertEqual((self.confirmed.status, self.confirmed.tracking_number), ('shipped', 'BR123'))
+        self.assertIsNotNone(self.confirmed.shipped_at)
+        self.assertEqual(Order.objects.get(pk=self.cancelled.pk).status, 'cancelled')
+
+        result = self.run_import(content)
+        self.assertEqual((result['shipped'], result['unchanged']), (0, 1))
+        self.assertEqual(OrderNotification.objects.count(), 1)
+
+        result = self.run_import(f'{self.confirmed.order_number},BR999\n')
+        self.assertEqual(result['retracked'], 1)
+        self.assertEqual(Order.objects.get(pk=self.confirmed.pk).tracking_number, 'BR999')
+        self.assertEqual(OrderNotification.objects.count(), 1)
+
+    def test_notifications_are_sent_once(self):
+        """Testa o envio dos avisos pendentes."""
+        self.run_import(f'{self.confirmed.order_number},BR123\n')
+
+        self.assertEqual(send_pending_notifications(), {'sent': 1, 'failed': 0})
+        self.assertEqual(send_pending_notifications(), {'sent': 0, 'failed': 0})
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('BR123', mail.outbox[0].body)
+        self.assertEqual(OrderNotification.objects.get().status, 'sent')
+
+    def test_notifications_claimed_by_another_worker_are_skipped(self):
+        """Testa que avisos em envio por outro worker só voltam depois do prazo da reserva."""
+        self.run_import(f'{self.confirmed.order_number},BR123\n')
+        OrderNotification.objects.update(status='sending', claimed_at=timezone.now())
+
+        self.assertEqual(send_pending_notifications(), {'sent': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 0)
+
+        OrderNotification.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(send_pending_notifications(), {'sent': 1, 'failed': 0})
+        self.assertEqual(OrderNotification.objects.get().status, 'sent')
+
+    def test_connection_failure_counts_attempt_and_backs_off(self):
+        """Testa que falha ao abrir a conexão SMTP registra a tentativa e adia o aviso."""
+        self.run_import(f'{self.confirmed.order_number},BR123\n')
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=OSError('recusada')):
+            self.assertEqual(send_pending_notifications(), {'sent': 0, 'failed': 1})
+
+        notification = OrderNotification.objects.get()
+        self.assertEqual(notification.status, 'pending')
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(notification.last_error, 'recusada')
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertEqual(send_pending_notifications(), {'sent': 0, 'failed': 0})
+
+
+class OrderTransitionTest(TestCase):
+    """
+    Testes para o motor de transições de status.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order = create_order(self.user)
+
+    def counts(self):
+        return {
+            (row.status, row.payment_status): row.count
+            for row in OrderStatusCount.objects.exclude(count=0)
+        }
+
+    def test_reloading_payment_success_is_free(self):
+        """Testa que recarregar o retorno do pagamento não grava nem reenvia o e-mail."""
+        url = reverse('orders:payment_success', args=[self.order.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(url)
+
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.status, self.order.payment_status), ('confirmed', 'completed'))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(OrderTransition.objects.filter(order=self.order).count(), 1)
+        self.assertEqual(DailyProductSales.objects.get().orders, 1)
+        self.assertEqual(self.counts(), {('confirmed', 'completed'): 1})
+
+        with self.assertNumQueries(0):
+            self.assertFalse(transition_order(self.order, payment_status='completed'))
+
+    def test_stale_instance_does_not_overwrite_concurrent_transition(self):
+        """Testa que uma instância desatualizada não desfaz o cancelamento feito por outra."""
+        stale = Order.objects.get(pk=self.order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(transition_order(self.order, status='cancelled', source='customer'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(transition_order(stale, payment_status='completed', source='webhook'))
+
+        self.assertEqual((stale.status, stale.payment_status), ('cancelled', 'completed'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(DailyProductSales.objects.exists())
+        with self.assertRaises(InvalidTransition):
+            transition_order(stale, status='shipped')
+        self.assertEqual(self.counts(), {('cancelled', 'completed'): 1})
+
+    def test_counts_are_applied_after_commit(self):
+        """Testa que os contadores não são alterados dentro da transação do pedido."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_order(self.user)
+            self.assertEqual(self.counts(), {('pending', 'pending'): 1})
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.counts(), {('pending', 'pending'): 2})
+
+    def test_counts_follow_creation_archive_and_rebuild(self):
+        """Testa os contadores incrementais contra o recálculo completo."""
+        with self.captureOnCommitCallbacks(execute=True):
+            delivered = create_order(self.user, status='delivered')
+            transition_order(self.order, payment_status='completed')
+            Order.objects.filter(pk=delivered.pk).update(created_at=timezone.now() - timedelta(days=400))
+            archive_orders(older_than_days=180)
+
+        incremental = self.counts()
+        self.assertEqual(incremental, {('confirmed', 'completed'): 1})
+        self.assertEqual(rebuild_status_counts(), 1)
+        self.assertEqual(self.counts(), incremental)
+
+
+class OrderEventsTest(TestCase):
+    """
+    Testes para o stream SSE de status dos pedidos.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='maria',
+            email='maria@example.com',
+            password='senha-segura-123'
+        )
+        self.order = create_order(self.user)
+
+    def test_transitions_publish_after_commit(self):
+        """Testa que a transição publica o novo estado para o dono do pedido."""
+        with mock.patch('orders.transitions.publish_order_events') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                transition_order(self.order, status='cancelled')
+                publish.assert_not_called()
+
+        [(user_id, event)] = publish.call_args.args[0]
+        self.assertEqual(user_id, self.user.pk)
+        self.assertEqual((event['order_id'], event['status']), (self.order.pk, 'cancelled'))
+        self.assertEqual(event['status_display'], 'Cancelado')
+
+    async def test_stream_sends_snapshot_and_events(self):
+        """Testa o estado inicial, os eventos publicados e o fim da assinatura."""
+        response = await self.async_client.get(reverse('orders:order_events'))
+        self.assertEqual(response.status_code, 401)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('orders:order_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        self.assertIn(self.order.order_number.encode(), await anext(stream))
+
+        broker = get_order_events()
+        broker.publish(self.user.pk, {'order_id': self.order.pk, 'status': 'shipped'})
+        self.assertIn(b'"status": "shipped"', await anext(stream))
+        self.assertEqual(broker.connections(), 1)
+
+        # Desconexão do cliente: o servidor ASGI cancela a leitura pendente
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(broker.connections(), 0)
+
+    async def test_subscription_memory_is_bounded(self):
+        """Testa que uma conexão lenta descarta a fila em vez de acumular eventos."""
+        subscription = Subscription(self.user.pk, max_pending=2)
+        for status in ('confirmed', 'processing', 'shipped'):
+            subscription.push({'status': status})
+
+        self.assertTrue(subscription.overflowed)
+        self.assertEqual(await subscription.get(timeout=0), [])
 
-# Create your tests here.
\ No newline at end of file
@@ -0,0 +1,307 @@
+"""
+Transições de status dos pedidos.
+
+Todas as mudanças de ``status`` e ``payment_status`` passam por
+``transition_orders`` (ou ``transition_order``, para um único pedido):
+
+- pedir o estado em que o pedido já está não faz nada: nenhuma escrita,
+  nenhum e-mail;
+- só são aceitas as transições de ``ORDER_TRANSITIONS`` e
+  ``PAYMENT_TRANSITIONS``; pagamento confirmado de um pedido pendente
+  também confirma o pedido;
+- os pedidos são bloqueados e o UPDATE (um por par de estados de origem e
+  destino) filtra pelo estado lido, de modo que uma transição concorrente
+  nunca é sobrescrita;
+- cada transição grava uma linha em ``OrderTransition`` e, depois do
+  commit, atualiza os contadores de ``OrderStatusCount``, lidos pelos
+  painéis no lugar de um GROUP BY sobre os pedidos;
+- pagamento confirmado soma o pedido às vendas diárias e envia o e-mail de
+  confirmação depois do commit; cancelamento ou reembolso retira o pedido
+  das vendas;
+- depois do commit, o novo estado é publicado para o stream SSE do dono do
+  pedido (``orders.events``).
+
+Os contadores cobrem a tabela ``Order``: pedidos criados entram pelo sinal
+``post_save`` e pedidos arquivados ou apagados no admin são descontados.
+``rebuild_status_counts`` recalcula os contadores a partir dos pedidos.
+"""
+from collections import Counter, defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .events import order_event, publish_order_events
+from .models import Order, OrderStatusCount, OrderTransition
+from .sales import VOID_STATUSES, record_order_sales, revert_order_sales
+
+ORDER_TRANSITIONS = {
+    'pending': {'confirmed', 'processing', 'cancelled'},
+    'confirmed': {'processing', 'shipped', 'cancelled', 'refunded'},
+    'processing': {'shipped', 'cancelled', 'refunded'},
+    'shipped': {'delivered', 'refunded'},
+    'delivered': {'refunded'},
+    'cancelled': set(),
+    'refunded': set(),
+}
+
+PAYMENT_TRANSITIONS = {
+    'pending': {'processing', 'completed', 'failed', 'cancelled'},
+    'processing': {'completed', 'failed', 'cancelled'},
+    'failed': {'processing', 'completed', 'cancelled'},
+    'cancelled': {'processing', 'completed'},
+    'completed': {'refunded'},
+    'refunded': set(),
+}
+
+# Campo preenchido quando o pedido chega ao status
+STATUS_TIMESTAMPS = {
+    'shipped': 'shipped_at',
+    'delivered': 'delivered_at',
+}
+
+
+class InvalidTransition(ValueError):
+    """Transição de status não permitida"""
+
+
+def resolve_transition(status, payment_status, new_status=None, new_payment_status=None):
+    """
+    Estado de destino de um pedido.
+
+    Args:
+        status, payment_status: Estado atual
+        new_status, new_payment_status: Estado pedido (None mantém o atual)
+
+    Returns:
+        tuple: (status, status do pagamento) de destino
+
+    Raises:
+        InvalidTransition: Se alguma das mudanças não é permitida
+    """
+    new_status = status if new_status is None else new_status
+    new_payment_status = payment_status if new_payment_status is None else new_payment_status
+    if new_payment_status == 'completed' and new_status == 'pending':
+        new_status = 'confirmed'
+
+    if new_status != status and new_status not in ORDER_TRANSITIONS.get(status, ()):
+        raise InvalidTransition(f"Pedido não pode passar de '{status}' para '{new_status}'")
+    if new_payment_status != payment_status and new_payment_status not in PAYMENT_TRANSITIONS.get(payment_status, ()):
+        raise InvalidTransition(
+            f"Pagamento não pode passar de '{payment_status}' para '{new_payment_status}'"
+        )
+    return new_status, new_payment_status
+
+
+def adjust_status_counts(deltas):
+    """
+    Soma as variações aos contadores de pedidos depois do commit.
+
+    Os contadores são poucas linhas disputadas por todos os checkouts: o
+    UPDATE roda em uma transação própria e curta depois do commit, em vez de
+    manter o lock da linha até o fim da transação do pedido. Se o processo
+    cair entre os dois commits a variação se perde; ``rebuild_status_counts``
+    corrige os contadores.
+
+    Args:
+        deltas: {(status, status do pagamento): variação}
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: _apply_status_counts(deltas))
+
+
+def _apply_status_counts(deltas):
+    # Ordem fixa: duas transações nunca bloqueiam os mesmos contadores em ordens diferentes
+    with transaction.atomic():
+        for (status, payment_status), delta in sorted(deltas.items()):
+            lookup = {'status': status, 'payment_status': payment_status}
+            if OrderStatusCount.objects.filter(**lookup).update(count=F('count') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    OrderStatusCount.objects.create(**lookup, count=delta)
+            except IntegrityError:
+                # Outro processo criou a linha ao mesmo tempo
+                OrderStatusCount.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def count_new_orders(orders):
+    """Soma os pedidos criados aos contadores"""
+    adjust_status_counts(Counter((order.status, order.payment_status) for order in orders))
+
+
+def discount_orders(orders):
+    """Desconta dos contadores os pedidos que saíram da tabela (arquivados ou apagados)"""
+    deltas = Counter()
+    for order in orders:
+        deltas[(order.status, order.payment_status)] -= 1
+    adjust_status_counts(deltas)
+
+
+def status_counts():
+    """Quantidade de pedidos por status, na ordem de ``Order.STATUS_CHOICES``"""
+    counts = defaultdict(int)
+    for status, count in OrderStatusCount.objects.values_list('status', 'count'):
+        counts[status] += count
+    return [(label, counts[status]) for status, label in Order.STATUS_CHOICES]
+
+
+def rebuild_status_counts():
+    """
+    Recalcula os contadores com um GROUP BY sobre os pedidos.
+
+    Transições feitas durante o recálculo podem ficar de fora; rode com pouco movimento.
+
+    Returns:
+        int: Quantidade de pedidos contados
+    """
+    counts = (
+        Order.objects.order_by()
+        .values_list('status', 'payment_status')
+        .annotate(count=Count('id'))
+    )
+    with transaction.atomic():
+        OrderStatusCount.objects.all().delete()
+        rows = OrderStatusCount.objects.bulk_create([
+            OrderStatusCount(status=status, payment_status=payment_status, count=count)
+            for status, payment_status, count in counts
+        ])
+    return sum(row.count for row in rows)
+
+
+def _send_confirmations(order_ids):
+    from .views import send_order_confirmation_email
+
+    for order in Order.objects.filter(id__in=order_ids):
+        send_order_confirmation_email(order)
+
+
+def transition_orders(changes, source='', now=None):
+    """
+    Aplica transições de status a vários pedidos.
+
+    Args:
+        changes: {id do pedido: (status, status do pagamento)}; None mantém o valor atual
+        source: Origem das transições, gravada no histórico (ex: 'webhook', 'admin')
+        now: Momento das transições
+
+    Returns:
+        tuple: (transições feitas, como ``OrderTransition``; {id do pedido: motivo} das recusadas)
+    """
+    if not changes:
+        return [], {}
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        current = (
+            Order.objects.select_for_update()
+            .filter(id__in=changes.keys())
+            .order_by('id')
+            .values_list('id', 'user_id', 'order_number', 'status', 'payment_status')
+        )
+        transitions = []
+        events = []
+        rejected = {order_id: 'Pedido não encontrado' for order_id in changes}
+        for order_id, user_id, order_number, status, payment_status in current:
+            del rejected[order_id]
+            try:
+                new_status, new_payment_status = resolve_transition(
+                    status, payment_status, *changes[order_id]
+                )
+            except InvalidTransition as e:
+                rejected[order_id] = str(e)
+                continue
+            if (new_status, new_payment_status) == (status, payment_status):
+                continue
+            transitions.append(OrderTransition(
+                order_id=order_id,
+                status_from=status,
+                status_to=new_status,
+                payment_status_from=payment_status,
+                payment_status_to=new_payment_status,
+                source=source,
+                created_at=now,
+            ))
+            if user_id is not None:
+                events.append((user_id, order_event({
+                    'id': order_id,
+                    'order_number': order_number,
+                    'status': new_status,
+                    'payment_status': new_payment_status,
+                })))
+        if not transitions:
+            return [], rejected
+
+        groups = defaultdict(list)
+        deltas = Counter()
+        for item in transitions:
+            source_state = (item.status_from, item.payment_status_from)
+            target_state = (item.status_to, item.payment_status_to)
+            groups[(source_state, target_state)].append(item.order_id)
+            deltas[source_state] -= 1
+            deltas[target_state] += 1
+
+        for ((status, payment_status), (new_status, new_payment_status)), order_ids in groups.items():
+            fields = {'status': new_status, 'payment_status': new_payment_status, 'updated_at': now}
+            if new_status != status and new_status in STATUS_TIMESTAMPS:
+                fields[STATUS_TIMESTAMPS[new_status]] = now
+            Order.objects.filter(id__in=order_ids, status=status, payment_status=payment_status).update(**fields)
+
+        OrderTransition.objects.bulk_create(transitions)
+        adjust_status_counts(deltas)
+
+        paid = [
+            item for item in transitions
+            if item.payment_status_to == 'completed' and item.payment_status_from != 'completed'
+        ]
+        voided = [
+            item.order_id for item in transitions
+            if item.status_to in VOID_STATUSES or item.payment_status_to == 'refunded'
+        ]
+        record_order_sales([item.order_id for item in paid])
+        revert_order_sales(voided)
+
+        confirmed = [item.order_id for item in paid if item.status_to not in VOID_STATUSES]
+        if confirmed:
+            transaction.on_commit(lambda: _send_confirmations(confirmed))
+        if events:
+            transaction.on_commit(lambda: publish_order_events(events))
+
+    return transitions, rejected
+
+
+def transition_order(order, status=None, payment_status=None, source=''):
+    """
+    Aplica uma transição a um pedido e atualiza a instância.
+
+    Se a instância já está no estado pedido, nada é consultado nem gravado.
+
+    Returns:
+        bool: Se o pedido mudou
+
+    Raises:
+        InvalidTransition: Se a transição não é permitida
+    """
+    try:
+        target = resolve_transition(order.status, order.payment_status, status, payment_status)
+        if target == (order.status, order.payment_status):
+            return False
+    except InvalidTransition:
+        # A instância pode estar desatualizada: o banco decide
+        pass
+
+    transitions, rejected = transition_orders({order.pk: (status, payment_status)}, source=source)
+    if order.pk in rejected:
+        raise InvalidTransition(rejected[order.pk])
+    if not transitions:
+        # Outra requisição já levou o pedido ao estado pedido
+        order.refresh_from_db(fields=['status', 'payment_status', 'updated_at'])
+        return False
+
+    item = transitions[0]
+    order.status = item.status_to
+    order.payment_status = item.payment_status_to
+    order.updated_at = item.created_at
+    if item.status_to != item.status_from and item.status_to in STATUS_TIMESTAMPS:
+        setattr(order, STATUS_TIMESTAMPS[item.status_to], item.created_at)
+    return True
@@ -18,9 +18,15 @@ urlpatterns = [
     path('<int:order_id>/payment-failure/', views.payment_failure, name='payment_failure'),
     path('<int:order_id>/payment-pending/', views.payment_pending, name='payment_pending'),
     
+    # Status em tempo real (SSE)
+    path('eventos/', views.order_events, name='order_events'),
+    
     # Cancelamento
     path('<int:order_id>/cancel/', views.cancel_order, name='cancel_order'),
     
+    # Relatórios
+    path('relatorios/vendas/', views.sales_dashboard, name='sales_dashboard'),
+    
     # Webhook do Mercado Pago
     path('webhook/mercadopago/', views.mercadopago_webhook, name='mercadopago_webhook'),
 ]
\ No newline at end of file
@@ -1,25 +1,34 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.http import JsonResponse, Http404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
 from django.views.generic import ListView, DetailView
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.utils.decorators import method_decorator
 from django.conf import settings
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Sum
+from datetime import timedelta
 from decimal import Decimal
 import json
-import mercadopago
 import logging
 
-from .models import Order, OrderItem, Payment, ShippingRate
+from .events import POLL_RETRY_MS, format_event, open_order_events, order_event_stream
+from .models import ArchivedOrder, DailyCategorySales, DailyProductSales, Order, OrderItem
+from .shipping import quote_shipping
+from .transitions import InvalidTransition, status_counts, transition_order
+from .payments import ensure_payment_preference, schedule_payment_preference
+from .webhooks import record_webhook_event
 from cart.cart import Cart
-from store.models import Product
+from core.replicas import replica_reads
+from store.ledger import record_movements
+from store.models import InventoryMovement, Product
 from accounts.models import Address
 
 logger = logging.getLogger(__name__)
@@ -33,7 +42,8 @@ class OrderListView(LoginRequiredMixin, ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+        # Inclui os pedidos arquivados
+        return Order.objects.history(self.request.user)
 
 
 class OrderDetailView(LoginRequiredMixin, DetailView):
@@ -46,6 +56,13 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user)
 
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            # Pedidos antigos podem ter sido movidos para o arquivo
+            return super().get_object(ArchivedOrder.objects.filter(user=self.request.user))
+
 
 @login_required
 def checkout(request):
@@ -62,6 +79,9 @@ def checkout(request):
                 # Criar pedido
                 order = create_order_from_cart(request, cart)
                 
+                # Criar a preferência de pagamento fora do fluxo da requisição
+                schedule_payment_preference(order.id)
+                
                 # Limpar carrinho
                 cart.clear()
                 
@@ -78,7 +98,8 @@ def checkout(request):
         user_addresses = request.user.addresses.filter(is_active=True)
     
     # Calcular opções de frete
-    shipping_options = calculate_shipping_options(cart)
+    postal_code = request.GET.get('cep') or request.user.postal_code
+    shipping_options = calculate_shipping_options(cart, postal_code)
     
     context = {
         'cart': cart,
@@ -122,50 +143,59 @@ def create_order_from_cart(request, cart):
         **shipping_data
     )
     
-    # Criar itens do pedido
-    for item in cart:
-        OrderItem.objects.create(
-            order=order,
-            product=item['product'],
-            product_name=item['product'].name,
-            product_sku=item['product'].sku,
-            quantity=item['quantity'],
-            unit_price=item['price'],
-            total_price=item['total_price']
+    # Bloqueia as linhas dos produtos do livro-razão até o commit: a
+    # verificação do estoque e a gravação da baixa não podem ser intercaladas
+    # com outro checkout. Ordem por id para evitar deadlocks entre carrinhos.
+    ledger_ids = [
+        item['product'].id for item in cart
+        if item['product'].track_stock and not item['product'].high_contention
+    ]
+    if ledger_ids:
+        list(
+            Product.objects.select_for_update()
+            .filter(id__in=ledger_ids)
+            .order_by('id')
+            .values_list('id', flat=True)
         )
-        
-        # Reduzir estoque
-        item['product'].reduce_stock(item['quantity'])
+
+    # Criar itens do pedido
+    reserved = []
+    try:
+        for item in cart:
+            product = item['product']
+            OrderItem.objects.create(
+                order=order,
+                product=product,
+                product_name=product.name,
+                product_sku=product.sku,
+                quantity=item['quantity'],
+                unit_price=item['price'],
+                total_price=item['total_price']
+            )
+            
+            # Reduzir estoque
+            if product.reduce_stock(item['quantity'], reference=order.order_number):
+                if product.high_contention:
+                    reserved.append((product, item['quantity']))
+            elif product.track_stock and not product.allow_backorder:
+                raise ValueError(f"Estoque insuficiente para {product.sku}")
+    except Exception:
+        # Baixas nos contadores de alta concorrência não são desfeitas pelo rollback
+        for product, quantity in reserved:
+            product.increase_stock(quantity)
+        raise
     
     return order
 
 
-def calculate_shipping_options(cart):
+def calculate_shipping_options(cart, postal_code=None):
     """Calcula opções de frete para o carrinho"""
     total_weight = sum(
         Decimal(str(item['product'].weight or 0)) * item['quantity'] 
         for item in cart
     )
     
-    shipping_rates = ShippingRate.objects.filter(
-        is_active=True,
-        min_weight__lte=total_weight,
-        max_weight__gte=total_weight
-    )
-    
-    options = []
-    for rate in shipping_rates:
-        cost = rate.calculate_shipping_cost(total_weight)
-        options.append({
-            'id': rate.id,
-            'name': rate.name,
-            'carrier': rate.carrier,
-            'cost': cost,
-            'delivery_time': rate.delivery_time,
-            'description': f"{rate.carrier} - {rate.name} (até {rate.delivery_time} dias úteis)"
-        })
-    
-    return options
+    return quote_shipping(total_weight, postal_code)
 
 
 @login_required
@@ -180,6 +210,7 @@ def payment(request, order_id):
     context = {
         'order': order,
         'mercadopago_public_key': settings.MERCADOPAGO_PUBLIC_KEY,
+        'payment_init_point': order.payment_init_point if order.has_valid_payment_preference() else '',
     }
     
     return render(request, 'orders/payment.html', context)
@@ -188,72 +219,24 @@ def payment(request, order_id):
 @csrf_exempt
 @require_http_methods(["POST"])
 def create_payment(request, order_id):
-    """Cria preferência de pagamento no Mercado Pago"""
+    """
+    Retorna a preferência de pagamento do pedido no Mercado Pago.
+
+    Normalmente a preferência já foi criada em segundo plano após o pedido;
+    o gateway só é chamado aqui se ela ainda não existir ou tiver expirado.
+    """
     try:
         order = get_object_or_404(Order, id=order_id)
-        
-        # Configurar SDK do Mercado Pago
-        sdk = mercadopago.SDK(settings.MERCADOPAGO_ACCESS_TOKEN)
-        
-        # Criar itens para o Mercado Pago
-        items = []
-        for item in order.items.all():
-            items.append({
-                "title": item.product_name,
-                "quantity": item.quantity,
-                "unit_price": float(item.unit_price),
-                "currency_id": "BRL"
-            })
-        
-        # Adicionar frete como item
-        if order.shipping_cost > 0:
-            items.append({
-                "title": f"Frete - {order.shipping_method}",
-                "quantity": 1,
-                "unit_price": float(order.shipping_cost),
-                "currency_id": "BRL"
-            })
-        
-        # Configurar preferência
-        preference_data = {
-            "items": items,
-            "payer": {
-                "name": order.first_name,
-                "surname": order.last_name,
-                "email": order.email,
-                "phone": {
-                    "number": order.phone
-                } if order.phone else None
-            },
-            "back_urls": {
-                "success": request.build_absolute_uri(f"/orders/{order.id}/payment-success/"),
-                "failure": request.build_absolute_uri(f"/orders/{order.id}/payment-failure/"),
-                "pending": request.build_absolute_uri(f"/orders/{order.id}/payment-pending/")
-            },
-            "auto_return": "approved",
-            "external_reference": order.order_number,
-            "statement_descriptor": "LOJA ONLINE"
-        }
-        
-        # Criar preferência
-        preference_response = sdk.preference().create(preference_data)
-        preference = preference_response["response"]
-        
-        # Salvar pagamento
-        payment = Payment.objects.create(
-            order=order,
-            payment_method='mercadopago',
-            amount=order.total,
-            gateway='mercadopago',
-            gateway_transaction_id=preference['id']
-        )
+        order = ensure_payment_preference(order)
         
         return JsonResponse({
             'status': 'success',
-            'preference_id': preference['id'],
-            'init_point': preference['init_point']
+            'preference_id': order.payment_preference_id,
+            'init_point': order.payment_init_point
         })
         
+    except Http404:
+        raise
     except Exception as e:
         logger.error(f"Erro ao criar pagamento: {str(e)}")
         return JsonResponse({
@@ -267,13 +250,11 @@ def payment_success(request, order_id):
     """View para pagamento aprovado"""
     order = get_object_or_404(Order, id=order_id, user=request.user)
     
-    # Atualizar status do pedido
-    order.status = 'confirmed'
-    order.payment_status = 'completed'
-    order.save()
-    
-    # Enviar email de confirmação
-    send_order_confirmation_email(order)
+    # Recarregar a página não grava nada nem reenvia o e-mail de confirmação
+    try:
+        transition_order(order, payment_status='completed', source='checkout')
+    except InvalidTransition as e:
+        logger.warning(f"Retorno de pagamento aprovado ignorado para {order.order_number}: {e}")
     
     messages.success(request, 'Pagamento aprovado! Seu pedido foi confirmado.')
     return render(request, 'orders/payment_success.html', {'order': order})
@@ -293,8 +274,11 @@ def payment_pending(request, order_id):
     """View para pagamento pendente"""
     order = get_object_or_404(Order, id=order_id, user=request.user)
     
-    order.payment_status = 'processing'
-    order.save()
+    try:
+        transition_order(order, payment_status='processing', source='checkout')
+    except InvalidTransition:
+        # Pagamento já aprovado ou recusado pelo webhook
+        pass
     
     messages.info(request, 'Pagamento em processamento. Você será notificado quando for aprovado.')
     return render(request, 'orders/payment_pending.html', {'order': order})
@@ -303,48 +287,21 @@ def payment_pending(request, order_id):
 @csrf_exempt
 @require_http_methods(["POST"])
 def mercadopago_webhook(request):
-    """Webhook para receber notificações do Mercado Pago"""
+    """
+    Webhook para receber notificações do Mercado Pago.
+
+    A notificação é apenas registrada e confirmada; a consulta ao gateway e a
+    atualização do pedido são feitas pelo comando process_webhooks.
+    """
     try:
         data = json.loads(request.body)
-        
-        if data.get('type') == 'payment':
-            payment_id = data['data']['id']
-            
-            # Consultar pagamento no Mercado Pago
-            sdk = mercadopago.SDK(settings.MERCADOPAGO_ACCESS_TOKEN)
-            payment_info = sdk.payment().get(payment_id)
-            
-            if payment_info['status'] == 200:
-                payment_data = payment_info['response']
-                external_reference = payment_data.get('external_reference')
-                
-                try:
-                    order = Order.objects.get(order_number=external_reference)
-                    payment = order.payments.filter(
-                        gateway_transaction_id=payment_data.get('preference_id')
-                    ).first()
-                    
-                    if payment:
-                        # Atualizar status do pagamento
-                        payment.status = map_mercadopago_status(payment_data['status'])
-                        payment.gateway_response = payment_data
-                        payment.save()
-                        
-                        # Atualizar pedido
-                        if payment.status == 'completed':
-                            order.status = 'confirmed'
-                            order.payment_status = 'completed'
-                            send_order_confirmation_email(order)
-                        elif payment.status == 'failed':
-                            order.payment_status = 'failed'
-                        
-                        order.save()
-                        
-                except Order.DoesNotExist:
-                    logger.error(f"Pedido não encontrado: {external_reference}")
-        
+    except ValueError:
+        return JsonResponse({'status': 'error'}, status=400)
+
+    try:
+        record_webhook_event('mercadopago', data)
         return JsonResponse({'status': 'ok'})
-        
+
     except Exception as e:
         logger.error(f"Erro no webhook Mercado Pago: {str(e)}")
         return JsonResponse({'status': 'error'}, status=500)
@@ -386,6 +343,33 @@ def send_order_confirmation_email(order):
         logger.error(f"Erro ao enviar email de confirmação: {str(e)}")
 
 
+async def order_events(request):
+    """
+    Stream SSE com as mudanças de status dos pedidos do usuário.
+
+    Servido pelo ASGI (``ecommerce/asgi.py``): cada conexão ociosa custa uma
+    fila pequena na memória, sem thread nem conexão com o banco. Fora do
+    ASGI a resposta traz apenas o estado atual e o navegador consulta de
+    novo após ``POLL_RETRY_MS``.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(order_event_stream(user.pk), content_type='text/event-stream')
+    else:
+        events = await open_order_events(user.pk)
+        response = HttpResponse(
+            f"retry: {POLL_RETRY_MS}\n\n" + ''.join(format_event(event) for event in events),
+            content_type='text/event-stream'
+        )
+    response['Cache-Control'] = 'no-cache'
+    # O nginx não deve acumular o stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def cancel_order(request, order_id):
     """Cancela um pedido"""
@@ -397,14 +381,73 @@ def cancel_order(request, order_id):
     
     if request.method == 'POST':
         with transaction.atomic():
-            order.status = 'cancelled'
-            order.save()
+            try:
+                cancelled = transition_order(order, status='cancelled', source='customer')
+            except InvalidTransition:
+                cancelled = False
+            if not cancelled:
+                # Pedido alterado por outra requisição (ex: enviado ou já cancelado)
+                messages.error(request, 'Este pedido não pode ser cancelado.')
+                return redirect('orders:order_detail', order_id=order.id)
             
-            # Devolver produtos ao estoque
-            for item in order.items.all():
-                item.product.increase_stock(item.quantity)
+            # Devolver produtos ao estoque: um único INSERT no livro-razão
+            movements = []
+            for item in order.items.select_related('product'):
+                if item.product.high_contention:
+                    item.product.increase_stock(item.quantity)
+                elif item.product.track_stock:
+                    movements.append(InventoryMovement(
+                        product=item.product,
+                        kind='cancel',
+                        quantity=item.quantity,
+                        reference=order.order_number
+                    ))
+            record_movements(movements)
             
             messages.success(request, 'Pedido cancelado com sucesso.')
             return redirect('orders:order_detail', order_id=order.id)
     
-    return render(request, 'orders/cancel_order.html', {'order': order})
\ No newline at end of file
+    return render(request, 'orders/cancel_order.html', {'order': order})
+
+
+@staff_member_required
+@replica_reads
+def sales_dashboard(request):
+    """
+    Painel de vendas por dia, categoria e produto.
+
+    Lê apenas as tabelas de vendas diárias, sem consultar pedidos e itens.
+    """
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 366)
+    except ValueError:
+        days = 30
+    start = timezone.localdate() - timedelta(days=days - 1)
+
+    category_sales = DailyCategorySales.objects.filter(date__gte=start)
+    product_sales = DailyProductSales.objects.filter(date__gte=start)
+    totals = ('units', 'revenue', 'discounts')
+
+    context = {
+        'days': days,
+        'start': start,
+        'summary': category_sales.aggregate(**{field: Sum(field) for field in totals}),
+        'daily': (
+            category_sales.values('date')
+            .annotate(**{field: Sum(field) for field in totals})
+            .order_by('-date')
+        ),
+        'categories': (
+            category_sales.values('category__name')
+            .annotate(orders=Sum('orders'), **{field: Sum(field) for field in totals})
+            .order_by('-revenue')
+        ),
+        'top_products': (
+            product_sales.values('product__sku', 'product__name')
+            .annotate(orders=Sum('orders'), **{field: Sum(field) for field in totals})
+            .order_by('-units')[:20]
+        ),
+        'status_counts': status_counts(),
+        'title': 'Painel de Vendas',
+    }
+    return render(request, 'orders/sales_dashboard.html', context)
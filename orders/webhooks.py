@@ -0,0 +1,222 @@
+"""
+Fila de webhooks de pagamento.
+
+O endpoint do webhook apenas grava o evento bruto (com deduplicação pelo ID
+do gateway) e responde imediatamente. O processamento — consulta do pagamento
+no gateway e atualização de Payment/Order — é feito em lote pelo comando
+``process_webhooks``.
+
+Cada lote é reservado com ``select_for_update(skip_locked=True)``: os eventos
+ficam indisponíveis para outros workers por ``CLAIM_TIMEOUT`` segundos (ou até
+o processamento terminar). Eventos com falha no gateway voltam para a fila com
+espera exponencial (``next_attempt_at``), de modo que uma instabilidade curta
+do gateway não esgota as tentativas.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+from .models import Order, Payment, WebhookEvent
+from .transitions import transition_orders
+
+logger = logging.getLogger(__name__)
+
+# Número de tentativas antes de marcar o evento como falho
+MAX_ATTEMPTS = 10
+
+# Espera antes da nova tentativa: RETRY_BASE_DELAY * 2^(tentativas - 1), até RETRY_MAX_DELAY (segundos)
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 60 * 60
+
+# Segundos em que um lote reservado fica fora da fila (worker interrompido no meio do lote)
+CLAIM_TIMEOUT = 5 * 60
+
+
+def retry_delay(attempts):
+    """Espera antes da próxima tentativa de um evento que já falhou ``attempts`` vezes"""
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def claim_pending_events(batch_size, now=None):
+    """
+    Reserva um lote de eventos pendentes para este worker.
+
+    Eventos bloqueados por outro worker são pulados; os reservados só voltam a
+    ser entregues depois de ``CLAIM_TIMEOUT`` segundos.
+    """
+    now = now or timezone.now()
+    with transaction.atomic(using=WebhookEvent.objects.db):
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if events:
+            WebhookEvent.objects.filter(id__in=[event.id for event in events]).update(
+                next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT)
+            )
+    return events
+
+
+def requeue_failed_events():
+    """
+    Devolve à fila os eventos que esgotaram as tentativas (depois de uma
+    indisponibilidade longa do gateway).
+
+    Returns:
+        int: Quantidade de eventos devolvidos
+    """
+    return WebhookEvent.objects.filter(status='failed').update(
+        status='pending', attempts=0, next_attempt_at=timezone.now()
+    )
+
+
+def record_webhook_event(gateway, data):
+    """
+    Persiste uma notificação recebida do gateway.
+
+    Notificações repetidas (mesmo ID de evento) são descartadas pelo índice
+    único, portanto reentregas do gateway não geram trabalho duplicado.
+
+    Args:
+        gateway: Nome do gateway (ex: 'mercadopago')
+        data: Corpo JSON da notificação
+    """
+    topic = str(data.get('type') or data.get('topic') or '')
+    resource_id = str((data.get('data') or {}).get('id') or '')
+    event_id = str(data.get('id') or f"{topic}:{resource_id}:{data.get('action', '')}")
+
+    WebhookEvent.objects.bulk_create(
+        [
+            WebhookEvent(
+                gateway=gateway,
+                event_id=event_id,
+                topic=topic,
+                resource_id=resource_id,
+                payload=data,
+                status='pending' if topic == 'payment' and resource_id else 'ignored',
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def process_pending_events(gateway=None, batch_size=100):
+    """
+    Processa um lote de eventos pendentes.
+
+    Eventos que se referem ao mesmo pagamento são agrupados, de modo que cada
+    pagamento é consultado no gateway uma única vez por lote.
+
+    Args:
+        gateway: Objeto com o método ``get_payment_info(payment_id)``
+            (por padrão, ``MercadoPagoService``)
+        batch_size: Quantidade máxima de eventos por lote
+
+    Returns:
+        dict: Contagem de eventos processados e com falha
+    """
+    events = claim_pending_events(batch_size)
+    if not events:
+        return {'processed': 0, 'failed': 0}
+
+    if gateway is None:
+        from core.services import MercadoPagoService
+        gateway = MercadoPagoService()
+
+    events_by_resource = {}
+    for event in events:
+        events_by_resource.setdefault(event.resource_id, []).append(event)
+
+    fetched = []
+    processed_ids = []
+    failed_events = []
+    for resource_id, resource_events in events_by_resource.items():
+        payment_info = gateway.get_payment_info(resource_id)
+        if payment_info['success']:
+            fetched.append(payment_info['payment'])
+            processed_ids.extend(event.id for event in resource_events)
+        else:
+            for event in resource_events:
+                event.last_error = str(payment_info.get('error', ''))
+                failed_events.append(event)
+
+    apply_payment_updates(fetched)
+
+    now = timezone.now()
+    WebhookEvent.objects.filter(id__in=processed_ids).update(
+        status='processed',
+        processed_at=now,
+        last_error='',
+    )
+    for event in failed_events:
+        event.attempts += 1
+        event.next_attempt_at = now + retry_delay(event.attempts)
+        if event.attempts >= MAX_ATTEMPTS:
+            event.status = 'failed'
+    WebhookEvent.objects.bulk_update(failed_events, ['attempts', 'status', 'last_error', 'next_attempt_at'])
+
+    return {'processed': len(processed_ids), 'failed': len(failed_events)}
+
+
+def apply_payment_updates(payments_data):
+    """
+    Aplica em lote os dados de pagamentos consultados no gateway.
+
+    Os pedidos e pagamentos envolvidos são carregados em duas consultas; os
+    pagamentos são gravados com ``bulk_update`` e os pedidos passam pelo
+    motor de transições, que ignora notificações repetidas (sem reenviar o
+    e-mail de confirmação) e soma os pedidos pagos às vendas diárias.
+
+    Args:
+        payments_data: Lista de respostas do gateway (uma por pagamento)
+    """
+    from .views import map_mercadopago_status
+
+    references = {data.get('external_reference') for data in payments_data}
+    orders = {
+        order.order_number: order
+        for order in Order.objects.filter(order_number__in=references)
+    }
+    payments = {
+        (payment.order_id, payment.gateway_transaction_id): payment
+        for payment in Payment.objects.filter(
+            order__in=orders.values(),
+            gateway_transaction_id__in={data.get('preference_id') for data in payments_data},
+        )
+    }
+
+    now = timezone.now()
+    changed_payments = {}
+    order_changes = {}
+    for data in payments_data:
+        external_reference = data.get('external_reference')
+        order = orders.get(external_reference)
+        if order is None:
+            logger.error(f"Pedido não encontrado: {external_reference}")
+            continue
+
+        payment = payments.get((order.id, data.get('preference_id')))
+        if payment is None:
+            continue
+
+        payment.status = map_mercadopago_status(data['status'])
+        payment.gateway_response = data
+        payment.updated_at = now
+        changed_payments[payment.id] = payment
+
+        if payment.status == 'completed':
+            order_changes[order.id] = (None, 'completed')
+        elif payment.status == 'failed' and order.payment_status != 'completed':
+            # Uma tentativa recusada não desfaz outra aprovada no mesmo lote
+            order_changes.setdefault(order.id, (None, 'failed'))
+
+    with transaction.atomic():
+        Payment.objects.bulk_update(
+            changed_payments.values(), ['status', 'gateway_response', 'updated_at']
+        )
+        _, rejected = transition_orders(order_changes, source='webhook', now=now)
+
+    for order_id, reason in rejected.items():
+        logger.warning(f"Notificação de pagamento ignorada para o pedido {order_id}: {reason}")
@@ -1,3 +1,171 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.db.models.functions import Now
+from django.utils import timezone
+from decimal import Decimal, InvalidOperation
 
-# Register your models here.
\ No newline at end of file
+from core.admin import LargeTableAdmin
+from .cache import bump_versions
+from .models import Category, PriceRule, PriceHistory, Product, StockForecast
+from .pricing import apply_rule, run_scheduled_rules
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    """
+    Admin para categorias
+    """
+    list_display = ('name', 'parent', 'is_active', 'sort_order')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'slug')
+    prepopulated_fields = {'slug': ('name',)}
+    autocomplete_fields = ('parent',)
+
+
+class ProductActionForm(ActionForm):
+    """Formulário das ações em lote, com o percentual do reajuste"""
+    percentage = forms.DecimalField(
+        label='Reajuste (%)',
+        required=False,
+        max_digits=6,
+        decimal_places=2,
+    )
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    """
+    Admin para produtos
+
+    A busca usa apenas campos com índice único (SKU e slug exatos).
+    """
+    list_display = (
+        'sku', 'name', 'category', 'price', 'stock_quantity',
+        'stock_status', 'is_active', 'updated_at'
+    )
+    list_filter = ('is_active', 'stock_status', 'is_featured', 'high_contention')
+    list_select_related = ('category',)
+    search_fields = ('sku__exact', 'slug__exact')
+    search_help_text = 'SKU ou slug exatos'
+    autocomplete_fields = ('category',)
+    prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ('stock_status', 'ledger_watermark', 'created_at', 'updated_at')
+    action_form = ProductActionForm
+    actions = ['activate', 'deactivate', 'reprice']
+
+    def _set_active(self, queryset, is_active):
+        slugs = list(queryset.values_list('slug', flat=True))
+        updated = queryset.update(is_active=is_active, updated_at=Now())
+        bump_versions('product', slugs)
+        bump_versions('listing', ['all'])
+        return updated
+
+    def activate(self, request, queryset):
+        """Ativa os produtos selecionados com um único UPDATE"""
+        updated = self._set_active(queryset, True)
+        self.message_user(request, f"{updated} produto(s) ativado(s).", messages.SUCCESS)
+    activate.short_description = 'Ativar produtos selecionados'
+
+    def deactivate(self, request, queryset):
+        """Desativa os produtos selecionados com um único UPDATE"""
+        updated = self._set_active(queryset, False)
+        self.message_user(request, f"{updated} produto(s) desativado(s).", messages.SUCCESS)
+    deactivate.short_description = 'Desativar produtos selecionados'
+
+    def reprice(self, request, queryset):
+        """
+        Reajusta os preços pelo percentual informado, por meio de uma regra
+        de preço (gravada no histórico e reversível)
+        """
+        try:
+            percentage = Decimal(request.POST.get('percentage') or '')
+        except InvalidOperation:
+            percentage = None
+        if percentage is None or not percentage.is_finite():
+            self.message_user(request, 'Informe o percentual do reajuste.', messages.ERROR)
+            return
+
+        now = timezone.now()
+        rule = PriceRule.objects.create(
+            name=f"Reajuste manual de {percentage}% por {request.user.get_username()}",
+            skus='\n'.join(queryset.values_list('sku', flat=True)),
+            adjustment_type='percentage',
+            value=percentage,
+            set_compare_price=False,
+            starts_at=now,
+            status='active',
+            activated_at=now,
+        )
+        changed = apply_rule(rule)
+        self.message_user(
+            request, f"{changed} produto(s) reajustado(s) (regra \"{rule.name}\").", messages.SUCCESS
+        )
+    reprice.short_description = 'Reajustar preços (%%) dos produtos selecionados'
+
+
+@admin.register(PriceRule)
+class PriceRuleAdmin(admin.ModelAdmin):
+    """
+    Admin para regras de preço (campanhas)
+    """
+    list_display = (
+        'name', 'category', 'adjustment_type', 'value',
+        'starts_at', 'ends_at', 'status'
+    )
+    list_filter = ('status', 'adjustment_type')
+    search_fields = ('name', 'skus')
+    autocomplete_fields = ('category',)
+    readonly_fields = ('status', 'activated_at', 'expired_at', 'created_at')
+    actions = ['run_now']
+
+    def run_now(self, request, queryset):
+        """Executa imediatamente a ativação e o encerramento das regras vencidas"""
+        result = run_scheduled_rules()
+        self.message_user(
+            request,
+            f"{result['activated']} regra(s) ativada(s), {result['expired']} encerrada(s), "
+            f"{result['products']} produto(s) alterado(s).",
+            messages.SUCCESS
+        )
+    run_now.short_description = 'Processar regras agendadas agora'
+
+
+@admin.register(PriceHistory)
+class PriceHistoryAdmin(LargeTableAdmin):
+    """
+    Admin para o histórico de preços (somente leitura)
+    """
+    list_display = ('product', 'rule', 'old_price', 'new_price', 'changed_at')
+    list_filter = ('changed_at',)
+    search_fields = ('product__sku__exact',)
+    list_select_related = ('product', 'rule')
+    raw_id_fields = ('product', 'rule')
+    date_hierarchy = 'changed_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockForecast)
+class StockForecastAdmin(admin.ModelAdmin):
+    """
+    Admin para a previsão de estoque (somente leitura; ver comando forecast_stock)
+    """
+    list_display = (
+        'product', 'daily_demand', 'stock', 'days_of_cover',
+        'reorder_point', 'needs_reorder', 'computed_at'
+    )
+    list_filter = ('needs_reorder', 'method')
+    search_fields = ('product__sku', 'product__name')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,73 @@
+"""
+Chaves de cache versionadas do catálogo.
+
+Em vez de apagar entradas, cada grupo de dados tem um número de versão
+guardado no cache e incluído nas chaves. Incrementar a versão invalida todas
+as entradas do grupo de uma vez, e alterações em lote só precisam incrementar
+as versões realmente afetadas:
+
+- ``product``: página de detalhes, por slug do produto
+- ``listing``: dados compartilhados das listagens (categorias, faixa de preços,
+  sugestões de busca)
+- ``prices``: preços dos produtos; os carrinhos comparam esta versão com a
+  guardada na sessão para atualizar preços desatualizados
+"""
+from django.core.cache import cache
+
+# Tempo de vida das entradas versionadas (as versões em si não expiram)
+CATALOG_CACHE_TIMEOUT = 60 * 15
+
+
+def _version_key(namespace, ident):
+    return f"store:version:{namespace}:{ident}"
+
+
+def get_version(namespace, ident='all'):
+    """Versão atual de um grupo de dados do catálogo"""
+    key = _version_key(namespace, ident)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def versioned_key(namespace, ident='all', suffix=''):
+    """Chave de cache que muda quando a versão do grupo é incrementada"""
+    return f"store:{namespace}:{ident}:v{get_version(namespace, ident)}{suffix}"
+
+
+async def aget_version(namespace, ident='all'):
+    """Versão assíncrona de ``get_version`` (views ASGI)"""
+    key = _version_key(namespace, ident)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, 1, None)
+        version = await cache.aget(key, 1)
+    return version
+
+
+async def aversioned_key(namespace, ident='all', suffix=''):
+    """Versão assíncrona de ``versioned_key`` (views ASGI)"""
+    return f"store:{namespace}:{ident}:v{await aget_version(namespace, ident)}{suffix}"
+
+
+def bump_versions(namespace, idents):
+    """
+    Incrementa as versões de vários itens.
+
+    Cada versão é incrementada com ``cache.incr``, atômico no Redis: duas
+    invalidações simultâneas não se anulam. Versão ausente vale 1 para os
+    leitores, então passa direto para 2.
+
+    Args:
+        namespace: Grupo de dados ('product', 'listing', ...)
+        idents: Identificadores afetados (ex: slugs dos produtos)
+    """
+    for ident in set(idents):
+        key = _version_key(namespace, ident)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 2, None):
+                cache.incr(key)
@@ -0,0 +1,312 @@
+"""
+Contadores de estoque para produtos em modo de alta concorrência.
+
+Durante promoções relâmpago alguns produtos recebem milhares de baixas de
+estoque simultâneas, e o lock da linha em ``store_product`` limita o checkout.
+Para produtos com ``high_contention`` ativo a baixa é feita em um contador
+atômico (Redis, via script Lua) sem acessar o banco. Cada baixa ou devolução
+é anotada em um log somente de inclusão, que o comando ``reconcile_stock``
+aplica periodicamente no livro-razão de estoque (ver ``store.ledger``).
+
+O contador é inicializado com o estoque atual na primeira reserva (o estoque
+só é calculado quando o contador ainda não existe). Se o estoque for reduzido
+por fora enquanto a promoção está ativa (ERP, admin), a reconciliação pode
+resultar em quantidade negativa: isso é relatado como venda acima do estoque
+e o estoque é zerado.
+
+Cada entrada do log tem um id (``<época>:<sequência>``). As movimentações de
+um bloco são gravadas com o id da última entrada como referência, na mesma
+transação; se a reconciliação for interrompida antes de remover o bloco do
+log, a próxima execução pula as entradas já aplicadas. A época muda quando a
+sequência recomeça (Redis esvaziado), para que entradas novas não sejam
+confundidas com as antigas.
+"""
+from collections import defaultdict, deque
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+import itertools
+import logging
+import threading
+import uuid
+
+from .ledger import current_stock_map, record_movements
+from .models import InventoryMovement, Product
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_LOCK_KEY = 'stock:reconcile:lock'
+RECONCILE_LOCK_TIMEOUT = 300
+
+# Prefixo da referência das movimentações gravadas pela reconciliação
+REFERENCE_PREFIX = 'log:'
+
+
+def new_epoch():
+    return uuid.uuid4().hex[:12]
+
+
+class LocMemStockCounter:
+    """Contadores em memória do processo (desenvolvimento e testes)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._log = deque()
+        self._epoch = new_epoch()
+        self._sequence = itertools.count(1)
+
+    def _append(self, product_id, delta):
+        self._log.append((f'{self._epoch}:{next(self._sequence)}', product_id, delta))
+
+    def reserve(self, product_id, quantity, initial):
+        with self._lock:
+            if product_id not in self._counters:
+                self._counters[product_id] = initial()
+            stock = self._counters[product_id]
+            if stock < quantity:
+                return False
+            self._counters[product_id] = stock - quantity
+            self._append(product_id, -quantity)
+            return True
+
+    def release(self, product_id, quantity):
+        with self._lock:
+            if product_id in self._counters:
+                self._counters[product_id] += quantity
+            self._append(product_id, quantity)
+
+    def get(self, product_id):
+        with self._lock:
+            return self._counters.get(product_id)
+
+    def peek(self, limit):
+        with self._lock:
+            return [self._log[i] for i in range(min(limit, len(self._log)))]
+
+    def trim(self, count):
+        with self._lock:
+            for _ in range(count):
+                self._log.popleft()
+
+    def product_ids(self):
+        with self._lock:
+            return set(self._counters)
+
+    def discard(self, product_id):
+        with self._lock:
+            self._counters.pop(product_id, None)
+
+
+class RedisStockCounter:
+    """Contadores no Redis; reserva e anotação no log em um único script Lua"""
+
+    COUNTER_KEY = 'stock:counter:{}'
+    PRODUCTS_KEY = 'stock:counters'
+    LOG_KEY = 'stock:log'
+    SEQUENCE_KEY = 'stock:log:sequence'
+    EPOCH_KEY = 'stock:log:epoch'
+
+    # Id da próxima entrada do log (``<época>:<sequência>``); a época informada
+    # só é usada quando a sequência recomeça
+    NEXT_ID_FUNCTION = """
+        local function next_id(sequence_key, epoch_key, new_epoch)
+            local sequence = redis.call('INCR', sequence_key)
+            local epoch = redis.call('GET', epoch_key)
+            if sequence == 1 or not epoch then
+                epoch = new_epoch
+                redis.call('SET', epoch_key, epoch)
+            end
+            return epoch .. ':' .. sequence
+        end
+    """
+
+    # Retorna -1 quando o contador não existe e o estoque inicial não foi informado
+    RESERVE_SCRIPT = NEXT_ID_FUNCTION + """
+        local stock = redis.call('GET', KEYS[1])
+        if not stock then
+            if ARGV[2] == '' then
+                return -1
+            end
+            stock = ARGV[2]
+            redis.call('SET', KEYS[1], stock)
+            redis.call('SADD', KEYS[3], ARGV[3])
+        end
+        local quantity = tonumber(ARGV[1])
+        if tonumber(stock) < quantity then
+            return 0
+        end
+        redis.call('DECRBY', KEYS[1], quantity)
+        local entry_id = next_id(KEYS[4], KEYS[5], ARGV[4])
+        redis.call('RPUSH', KEYS[2], entry_id .. ':' .. ARGV[3] .. ':-' .. ARGV[1])
+        return 1
+    """
+
+    RELEASE_SCRIPT = NEXT_ID_FUNCTION + """
+        if redis.call('EXISTS', KEYS[1]) == 1 then
+            redis.call('INCRBY', KEYS[1], ARGV[1])
+        end
+        local entry_id = next_id(KEYS[3], KEYS[4], ARGV[3])
+        redis.call('RPUSH', KEYS[2], entry_id .. ':' .. ARGV[2] .. ':' .. ARGV[1])
+    """
+
+    def __init__(self, connection=None):
+        if connection is None:
+            from django_redis import get_redis_connection
+            connection = get_redis_connection('default')
+        self.redis = connection
+        self._reserve = connection.register_script(self.RESERVE_SCRIPT)
+        self._release = connection.register_script(self.RELEASE_SCRIPT)
+
+    def reserve(self, product_id, quantity, initial):
+        keys = [
+            self.COUNTER_KEY.format(product_id), self.LOG_KEY, self.PRODUCTS_KEY,
+            self.SEQUENCE_KEY, self.EPOCH_KEY,
+        ]
+        reserved = self._reserve(keys=keys, args=[quantity, '', product_id, new_epoch()])
+        if reserved == -1:
+            reserved = self._reserve(keys=keys, args=[quantity, initial(), product_id, new_epoch()])
+        return reserved == 1
+
+    def release(self, product_id, quantity):
+        keys = [self.COUNTER_KEY.format(product_id), self.LOG_KEY, self.SEQUENCE_KEY, self.EPOCH_KEY]
+        self._release(keys=keys, args=[quantity, product_id, new_epoch()])
+
+    def get(self, product_id):
+        value = self.redis.get(self.COUNTER_KEY.format(product_id))
+        return int(value) if value is not None else None
+
+    def peek(self, limit):
+        entries = []
+        for entry in self.redis.lrange(self.LOG_KEY, 0, limit - 1):
+            epoch, sequence, product_id, delta = entry.decode().split(':')
+            entries.append((f'{epoch}:{sequence}', int(product_id), int(delta)))
+        return entries
+
+    def trim(self, count):
+        self.redis.ltrim(self.LOG_KEY, count, -1)
+
+    def product_ids(self):
+        return {int(product_id) for product_id in self.redis.smembers(self.PRODUCTS_KEY)}
+
+    def discard(self, product_id):
+        pipe = self.redis.pipeline()
+        pipe.delete(self.COUNTER_KEY.format(product_id))
+        pipe.srem(self.PRODUCTS_KEY, product_id)
+        pipe.execute()
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_stock_counter():
+    """Retorna o backend de contadores do processo (ver STOCK_COUNTER_BACKEND)"""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                if settings.STOCK_COUNTER_BACKEND == 'redis':
+                    _counter = RedisStockCounter()
+                else:
+                    _counter = LocMemStockCounter()
+    return _counter
+
+
+def reconcile_stock(batch_size=1000):
+    """
+    Aplica o log de baixas dos contadores como movimentações de estoque.
+
+    As entradas só são removidas do log depois que o bloco foi gravado no
+    banco; entradas já aplicadas por uma execução interrompida são puladas.
+    Ao final, os contadores de produtos que saíram do modo de alta
+    concorrência são descartados.
+
+    Returns:
+        dict: Entradas aplicadas, produtos atualizados e vendas acima do
+        estoque (lista de {'product_id', 'sku', 'oversold'})
+    """
+    result = {'entries': 0, 'products': 0, 'oversold': []}
+    if not cache.add(RECONCILE_LOCK_KEY, 1, RECONCILE_LOCK_TIMEOUT):
+        logger.info('Reconciliação de estoque já em andamento')
+        return result
+
+    try:
+        counter = get_stock_counter()
+        applied = last_applied_entry()
+        while True:
+            entries = counter.peek(batch_size)
+            if not entries:
+                break
+
+            deltas = defaultdict(int)
+            for entry_id, product_id, delta in entries:
+                if not _is_applied(entry_id, applied):
+                    deltas[product_id] += delta
+
+            last_id = entries[-1][0]
+            if deltas:
+                with transaction.atomic():
+                    _apply_deltas(deltas, result, reference=f'{REFERENCE_PREFIX}{last_id}')
+                applied = last_id
+            counter.trim(len(entries))
+            result['entries'] += len(entries)
+
+            if len(entries) < batch_size:
+                break
+
+        hot_ids = set(
+            Product.objects.filter(id__in=counter.product_ids(), high_contention=True)
+            .values_list('id', flat=True)
+        )
+        for product_id in counter.product_ids() - hot_ids:
+            counter.discard(product_id)
+    finally:
+        cache.delete(RECONCILE_LOCK_KEY)
+
+    return result
+
+
+def last_applied_entry():
+    """Id da última entrada do log gravada no banco (referência da última movimentação do contador)"""
+    reference = (
+        InventoryMovement.objects.filter(kind='counter', reference__startswith=REFERENCE_PREFIX)
+        .order_by('-id')
+        .values_list('reference', flat=True)
+        .first()
+    )
+    return reference[len(REFERENCE_PREFIX):] if reference else None
+
+
+def _is_applied(entry_id, applied):
+    if applied is None:
+        return False
+    epoch, sequence = entry_id.split(':')
+    applied_epoch, applied_sequence = applied.split(':')
+    return epoch == applied_epoch and int(sequence) <= int(applied_sequence)
+
+
+def _apply_deltas(deltas, result, reference):
+    """Grava as variações de estoque de um bloco do log como movimentações"""
+    stock = current_stock_map(deltas.keys())
+    movements = []
+    for product in Product.objects.filter(id__in=stock.keys()).only('id', 'sku'):
+        delta = deltas[product.id]
+        quantity = stock[product.id] + delta
+        if quantity < 0:
+            logger.error(
+                f"Venda acima do estoque: produto {product.sku} com {-quantity} unidade(s) a mais"
+            )
+            result['oversold'].append({
+                'product_id': product.id,
+                'sku': product.sku,
+                'oversold': -quantity,
+            })
+            delta = -stock[product.id]
+        if delta:
+            movements.append(
+                InventoryMovement(product=product, kind='counter', quantity=delta, reference=reference)
+            )
+
+    record_movements(movements)
+    result['products'] += len(movements)
@@ -0,0 +1,169 @@
+"""
+Previsão de demanda e ponto de reposição dos produtos.
+
+As vendas diárias de cada produto (tabela ``DailyProductSales``, mantida a
+partir dos itens dos pedidos pagos) são carregadas em uma matriz NumPy
+(produtos x dias) e a previsão é calculada para todos os produtos do bloco
+de uma vez, sem laços por produto:
+
+- ``sma``: média móvel dos últimos ``window`` dias;
+- ``ewma``: suavização exponencial, calculada como produto da matriz pelo
+  vetor de pesos ``alpha * (1 - alpha) ** idade``.
+
+A partir da demanda prevista e do estoque atual são derivados os dias de
+cobertura e o ponto de reposição (demanda no prazo de reposição mais um
+estoque de segurança). Os produtos são processados em blocos, de modo que
+a memória usada depende apenas de ``batch_size`` e do período analisado.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+import numpy as np
+
+from orders.models import DailyProductSales
+from .ledger import annotate_current_stock
+from .models import Product, StockForecast
+
+# Fator da distribuição normal para nível de serviço de ~95%
+SERVICE_FACTOR = 1.65
+
+
+def load_demand(product_ids, start, days):
+    """
+    Carrega as unidades vendidas por dia em uma matriz (produtos x dias).
+
+    Args:
+        product_ids: Ids dos produtos, em ordem crescente (linhas da matriz)
+        start: Primeiro dia (coluna 0)
+        days: Quantidade de dias (colunas)
+    """
+    demand = np.zeros((len(product_ids), days), dtype=np.float64)
+    sales = list(
+        DailyProductSales.objects.filter(
+            product_id__in=product_ids, date__gte=start, date__lt=start + timedelta(days=days)
+        ).values_list('product_id', 'date', 'units')
+    )
+    if not sales:
+        return demand
+
+    sale_products, sale_dates, units = zip(*sales)
+    rows = np.searchsorted(np.asarray(product_ids), np.asarray(sale_products))
+    columns = (np.asarray(sale_dates, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(int)
+    np.add.at(demand, (rows, columns), np.asarray(units, dtype=np.float64))
+    return demand
+
+
+def moving_average(demand, window):
+    """Média e desvio padrão da demanda nos últimos ``window`` dias"""
+    recent = demand[:, -window:]
+    return recent.mean(axis=1), recent.std(axis=1)
+
+
+def exponential_smoothing(demand, alpha):
+    """Nível e desvio padrão com pesos exponenciais (dias recentes pesam mais)"""
+    ages = np.arange(demand.shape[1] - 1, -1, -1)
+    weights = alpha * (1 - alpha) ** ages
+    weights /= weights.sum()
+    level = demand @ weights
+    variance = (demand - level[:, None]) ** 2 @ weights
+    return level, np.sqrt(variance)
+
+
+def reorder_metrics(daily_demand, demand_std, stock, lead_time):
+    """
+    Dias de cobertura, ponto de reposição e necessidade de reposição (vetorizados).
+
+    Produtos sem demanda têm cobertura indefinida (NaN) e nunca pedem reposição.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(daily_demand > 0, stock / daily_demand, np.nan)
+    reorder_point = np.ceil(
+        daily_demand * lead_time + SERVICE_FACTOR * demand_std * np.sqrt(lead_time)
+    ).astype(int)
+    needs_reorder = (daily_demand > 0) & (stock <= reorder_point)
+    return days_of_cover, reorder_point, needs_reorder
+
+
+def forecast_stock(method='ewma', history_days=365, window=28, alpha=0.1,
+                   lead_time=None, batch_size=10000, progress=None):
+    """
+    Recalcula a previsão de estoque dos produtos ativos com controle de estoque.
+
+    Args:
+        method: 'sma' (média móvel) ou 'ewma' (suavização exponencial)
+        history_days: Dias de histórico carregados
+        window: Janela da média móvel, em dias
+        alpha: Fator de suavização exponencial
+        lead_time: Prazo de reposição em dias (padrão: REORDER_LEAD_TIME_DAYS)
+        batch_size: Quantidade de produtos por bloco
+        progress: Função chamada após cada bloco com a quantidade de produtos processados
+
+    Returns:
+        dict: Produtos processados e produtos que precisam de reposição
+    """
+    if lead_time is None:
+        lead_time = settings.REORDER_LEAD_TIME_DAYS
+    now = timezone.now()
+    # Histórico até ontem: o dia atual ainda está incompleto e puxaria a previsão para baixo
+    start = timezone.localdate(now) - timedelta(days=history_days)
+
+    result = {'products': 0, 'reorder': 0}
+    last_id = 0
+    while True:
+        stock_by_product = list(
+            annotate_current_stock(
+                Product.objects.filter(is_active=True, track_stock=True, id__gt=last_id)
+            )
+            .order_by('id')
+            .values_list('id', 'ledger_stock')[:batch_size]
+        )
+        if not stock_by_product:
+            break
+
+        product_ids, stock = zip(*stock_by_product)
+        demand = load_demand(product_ids, start, history_days)
+        if method == 'sma':
+            daily_demand, demand_std = moving_average(demand, window)
+        else:
+            daily_demand, demand_std = exponential_smoothing(demand, alpha)
+        stock = np.asarray(stock, dtype=np.float64)
+        days_of_cover, reorder_point, needs_reorder = reorder_metrics(
+            daily_demand, demand_std, stock, lead_time
+        )
+
+        forecasts = [
+            StockForecast(
+                product_id=product_id,
+                method=method,
+                daily_demand=demand_value,
+                demand_std=std_value,
+                stock=int(stock_value),
+                days_of_cover=None if np.isnan(cover) else cover,
+                reorder_point=max(point, 0),
+                needs_reorder=reorder,
+                computed_at=now,
+            )
+            for product_id, demand_value, std_value, stock_value, cover, point, reorder in zip(
+                product_ids, daily_demand.tolist(), demand_std.tolist(), stock.tolist(),
+                days_of_cover.tolist(), reorder_point.tolist(), needs_reorder.tolist()
+            )
+        ]
+        StockForecast.objects.bulk_create(
+            forecasts,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=[
+                'method', 'daily_demand', 'demand_std', 'stock', 'days_of_cover',
+                'reorder_point', 'needs_reorder', 'computed_at',
+            ],
+        )
+
+        result['products'] += len(forecasts)
+        result['reorder'] += int(needs_reorder.sum())
+        last_id = product_ids[-1]
+        if progress:
+            progress(result['products'])
+
+    # Produtos desativados ou sem controle de estoque desde a última execução
+    StockForecast.objects.filter(computed_at__lt=now).delete()
+    return result
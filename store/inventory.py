@@ -0,0 +1,179 @@
+"""
+Sincronização de estoque em lote (integração com o ERP).
+
+Os lotes chegam como pares (sku, stock_quantity, stock_status opcional) em
+JSON ou CSV e são aplicados em blocos: a diferença para o estoque atual é
+gravada como movimentação de ajuste no livro-razão (``store.ledger``) e o
+status com ``bulk_update``. Erros por SKU são relatados sem interromper o
+restante do lote.
+"""
+from django.db import transaction
+from django.utils import timezone
+import csv
+import json
+import logging
+
+from .cache import bump_versions
+from .ledger import annotate_current_stock
+from .models import InventoryMovement, Product
+
+logger = logging.getLogger(__name__)
+
+VALID_STOCK_STATUSES = {choice for choice, _ in Product.STOCK_STATUS_CHOICES}
+
+# O status do estoque é sempre derivado; um status explícito do ERP apenas
+# define se o produto aceita pré-venda quando não houver estoque
+BACKORDER_BY_STATUS = {'pre_order': True, 'out_of_stock': False}
+
+
+class InventoryFormatError(ValueError):
+    """Lote de estoque em formato inválido."""
+
+
+def parse_inventory_json(stream):
+    """
+    Lê um lote em JSON: uma lista de objetos ou ``{"items": [...]}``.
+    """
+    try:
+        data = json.load(stream)
+    except ValueError as e:
+        raise InventoryFormatError(f"JSON inválido: {e}") from e
+
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list):
+        raise InventoryFormatError('Esperada uma lista de itens de estoque')
+    return data
+
+
+def parse_inventory_csv(stream):
+    """
+    Lê um lote em CSV com cabeçalho ``sku,stock_quantity[,stock_status]``.
+    """
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames or not {'sku', 'stock_quantity'} <= set(reader.fieldnames):
+        raise InventoryFormatError('O CSV deve ter as colunas sku e stock_quantity')
+    return reader
+
+
+def _validate_row(row):
+    """Normaliza uma linha do lote; retorna (sku, quantidade, status) ou lança ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError('Item inválido')
+
+    sku = str(row.get('sku') or '').strip()
+    if not sku:
+        raise ValueError('SKU não informado')
+
+    try:
+        quantity = int(row.get('stock_quantity'))
+    except (TypeError, ValueError):
+        raise ValueError('Quantidade inválida') from None
+    if quantity < 0:
+        raise ValueError('Quantidade não pode ser negativa')
+
+    status = (row.get('stock_status') or '').strip() or None
+    if status is not None and status not in VALID_STOCK_STATUSES:
+        raise ValueError(f'Status de estoque inválido: {status}')
+
+    return sku, quantity, status
+
+
+def apply_inventory_batch(rows, chunk_size=1000):
+    """
+    Aplica um lote de atualizações de estoque.
+
+    Cada bloco de SKUs é carregado em uma consulta e gravado com um único
+    INSERT de movimentações de ajuste e um ``bulk_update``. O status é
+    recalculado com ``Product.compute_stock_status``; um ``stock_status``
+    informado só ajusta ``allow_backorder`` (ver ``BACKORDER_BY_STATUS``).
+    Só as versões de cache dos produtos
+    alterados são incrementadas, e as listagens apenas quando algum status
+    de estoque mudou.
+
+    Args:
+        rows: Iterável de dicionários com sku, stock_quantity e stock_status
+        chunk_size: Quantidade de SKUs por bloco
+
+    Returns:
+        dict: Totais de atualizados e inalterados, e a lista de falhas por SKU
+    """
+    result = {'updated': 0, 'unchanged': 0, 'failures': []}
+    listing_changed = False
+
+    chunk = {}
+    for line, row in enumerate(rows, start=1):
+        try:
+            sku, quantity, status = _validate_row(row)
+        except ValueError as e:
+            sku = row.get('sku', '') if isinstance(row, dict) else ''
+            result['failures'].append({'sku': sku, 'line': line, 'error': str(e)})
+            continue
+
+        # SKUs repetidos no lote: vale a última ocorrência
+        chunk[sku] = (quantity, status)
+        if len(chunk) >= chunk_size:
+            listing_changed |= _apply_chunk(chunk, result)
+            chunk = {}
+
+    if chunk:
+        listing_changed |= _apply_chunk(chunk, result)
+
+    if listing_changed:
+        bump_versions('listing', ['all'])
+
+    return result
+
+
+def _apply_chunk(chunk, result):
+    """Aplica um bloco de SKUs; retorna True se algum status de estoque mudou"""
+    products = annotate_current_stock(Product.objects.filter(sku__in=chunk.keys())).only(
+        'id', 'sku', 'slug', 'stock_status', 'track_stock', 'allow_backorder'
+    )
+
+    now = timezone.now()
+    changed = []
+    movements = []
+    status_changed = False
+    found = set()
+    for product in products:
+        found.add(product.sku)
+        quantity, status = chunk[product.sku]
+        allow_backorder = BACKORDER_BY_STATUS.get(status, product.allow_backorder)
+        status = Product.compute_stock_status(quantity, product.track_stock, allow_backorder)
+        delta = quantity - product.ledger_stock
+        if (
+            not delta
+            and product.allow_backorder == allow_backorder
+            and product.stock_status == status
+        ):
+            result['unchanged'] += 1
+            continue
+
+        status_changed |= product.stock_status != status
+        if delta:
+            movements.append(InventoryMovement(
+                product=product, kind='adjustment', quantity=delta, reference='erp'
+            ))
+        product.allow_backorder = allow_backorder
+        product.stock_status = status
+        product.updated_at = now
+        changed.append(product)
+
+    for sku in chunk.keys() - found:
+        result['failures'].append({'sku': sku, 'error': 'SKU não encontrado'})
+
+    try:
+        with transaction.atomic():
+            InventoryMovement.objects.bulk_create(movements)
+            Product.objects.bulk_update(changed, ['allow_backorder', 'stock_status', 'updated_at'])
+    except Exception as e:
+        logger.error(f"Erro ao gravar bloco de estoque: {str(e)}")
+        result['failures'].extend(
+            {'sku': product.sku, 'error': 'Erro ao gravar no banco de dados'} for product in changed
+        )
+        return False
+
+    result['updated'] += len(changed)
+    bump_versions('product', [product.slug for product in changed])
+    return status_changed
@@ -0,0 +1,177 @@
+"""
+Livro-razão de estoque.
+
+Cada venda, cancelamento, reposição ou ajuste é gravado como uma linha em
+``InventoryMovement``, sem atualizar a linha do produto. O checkout bloqueia
+a linha (``select_for_update``) da verificação do estoque até o commit do
+pedido, para que dois pedidos não vendam a mesma unidade.
+``Product.stock_quantity`` guarda o saldo consolidado até o id
+``Product.ledger_watermark``, e o estoque atual é esse saldo mais as
+movimentações posteriores (índice em ``(product, id)``).
+
+O comando ``compact_inventory`` consolida periodicamente as movimentações
+no saldo. Só são consolidadas movimentações com mais de ``lag`` segundos,
+para que transações ainda abertas com ids menores não fiquem para trás do
+watermark.
+
+A linha do produto só é atualizada quando o status do estoque muda (ex:
+a última unidade foi vendida), para manter o filtro de disponíveis correto.
+"""
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+import logging
+
+from .cache import bump_versions
+from .models import InventoryMovement, Product
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_LOCK_KEY = 'stock:compaction:lock'
+COMPACTION_LOCK_TIMEOUT = 600
+
+
+def pending_deltas(product_ids):
+    """Soma das movimentações ainda não consolidadas, por produto"""
+    return dict(
+        InventoryMovement.objects.filter(
+            product_id__in=product_ids,
+            id__gt=F('product__ledger_watermark'),
+        )
+        .values('product_id')
+        .annotate(delta=Sum('quantity'))
+        .values_list('product_id', 'delta')
+    )
+
+
+def annotate_current_stock(queryset):
+    """Anota ``ledger_stock`` (saldo mais movimentações recentes) em um queryset de produtos"""
+    pending = (
+        InventoryMovement.objects.filter(product=OuterRef('pk'), id__gt=OuterRef('ledger_watermark'))
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    return queryset.annotate(
+        ledger_stock=F('stock_quantity') + Coalesce(Subquery(pending), 0)
+    )
+
+
+def current_stock_map(product_ids):
+    """Estoque atual dos produtos informados, em uma consulta"""
+    return dict(
+        annotate_current_stock(Product.objects.filter(id__in=product_ids))
+        .values_list('id', 'ledger_stock')
+    )
+
+
+def record_movements(movements):
+    """
+    Grava movimentações com um único INSERT e atualiza o status do estoque
+    dos produtos cujo status mudou.
+
+    Args:
+        movements: Lista de instâncias (não salvas) de InventoryMovement
+    """
+    if not movements:
+        return
+    InventoryMovement.objects.bulk_create(movements)
+    refresh_stock_status({movement.product_id for movement in movements})
+
+
+def refresh_stock_status(product_ids):
+    """Recalcula o status do estoque a partir do estoque atual; grava só os que mudaram"""
+    products = annotate_current_stock(Product.objects.filter(id__in=product_ids)).only(
+        'id', 'slug', 'stock_status', 'track_stock', 'allow_backorder'
+    )
+    changed = []
+    for product in products:
+        status = Product.compute_stock_status(
+            product.ledger_stock, product.track_stock, product.allow_backorder
+        )
+        if status != product.stock_status:
+            product.stock_status = status
+            changed.append(product)
+
+    if changed:
+        Product.objects.bulk_update(changed, ['stock_status'])
+        bump_versions('product', [product.slug for product in changed])
+
+
+def compact_movements(batch_size=1000, lag=60):
+    """
+    Consolida as movimentações no saldo dos produtos.
+
+    Args:
+        batch_size: Quantidade de produtos atualizados por UPDATE
+        lag: Idade mínima, em segundos, das movimentações consolidadas
+
+    Returns:
+        dict: Movimentações consolidadas, produtos atualizados e saldos que
+        ficariam negativos (lista de {'product_id', 'sku', 'oversold'})
+    """
+    result = {'movements': 0, 'products': 0, 'oversold': []}
+    if not cache.add(COMPACTION_LOCK_KEY, 1, COMPACTION_LOCK_TIMEOUT):
+        logger.info('Consolidação de estoque já em andamento')
+        return result
+
+    try:
+        cutoff = InventoryMovement.objects.filter(
+            created_at__lt=timezone.now() - timedelta(seconds=lag)
+        ).aggregate(cutoff=Max('id'))['cutoff']
+        if cutoff is None:
+            return result
+
+        pending = list(
+            InventoryMovement.objects.filter(id__gt=F('product__ledger_watermark'), id__lte=cutoff)
+            .values('product_id')
+            .annotate(delta=Sum('quantity'), movements=Count('id'))
+            .order_by('product_id')
+            .values_list('product_id', 'delta', 'movements')
+        )
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            _compact_chunk(chunk, cutoff, result)
+            result['movements'] += sum(movements for _, _, movements in chunk)
+    finally:
+        cache.delete(COMPACTION_LOCK_KEY)
+
+    return result
+
+
+def _compact_chunk(chunk, cutoff, result):
+    """Grava os novos saldos de um bloco de produtos com um único UPDATE"""
+    deltas = {product_id: delta for product_id, delta, _ in chunk}
+    with transaction.atomic():
+        products = (
+            Product.objects.select_for_update()
+            .filter(id__in=deltas.keys())
+            .values_list('id', 'sku', 'slug', 'stock_quantity')
+        )
+        balances = {}
+        slugs = []
+        for product_id, sku, slug, stock_quantity in products:
+            balance = stock_quantity + deltas[product_id]
+            if balance < 0:
+                logger.error(
+                    f"Venda acima do estoque: produto {sku} com {-balance} unidade(s) a mais"
+                )
+                result['oversold'].append({'product_id': product_id, 'sku': sku, 'oversold': -balance})
+                balance = 0
+            balances[product_id] = balance
+            slugs.append(slug)
+
+        Product.objects.filter(id__in=balances.keys()).update(
+            stock_quantity=Case(
+                *[When(id=product_id, then=Value(balance)) for product_id, balance in balances.items()],
+                output_field=IntegerField(),
+            ),
+            ledger_watermark=cutoff,
+            updated_at=Now(),
+        )
+
+    result['products'] += len(slugs)
+    bump_versions('product', slugs)
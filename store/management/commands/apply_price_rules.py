@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+import time
+
+from store.pricing import run_scheduled_rules
+
+
+class Command(BaseCommand):
+    help = 'Ativa e encerra as regras de preço agendadas (executar periodicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continua executando em intervalos regulares'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Intervalo em segundos entre execuções no modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = run_scheduled_rules()
+            if result['activated'] or result['expired']:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Regras de preço: {result['activated']} ativadas, "
+                        f"{result['expired']} encerradas, {result['products']} produtos alterados."
+                    )
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
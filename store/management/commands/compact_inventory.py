@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+import time
+
+from store.ledger import compact_movements
+
+
+class Command(BaseCommand):
+    help = 'Consolida as movimentações de estoque no saldo dos produtos (executar periodicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de produtos atualizados por transação'
+        )
+        parser.add_argument(
+            '--lag',
+            type=int,
+            default=60,
+            help='Idade mínima, em segundos, das movimentações consolidadas'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continua executando em intervalos regulares'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Intervalo em segundos entre execuções no modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = compact_movements(batch_size=options['batch_size'], lag=options['lag'])
+
+            for oversold in result['oversold']:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"  ✗ Saldo negativo: {oversold['sku']} ({oversold['oversold']} unidade(s))"
+                    )
+                )
+
+            if result['movements']:
+                self.stdout.write(
+                    f"Movimentações consolidadas: {result['movements']} | "
+                    f"produtos atualizados: {result['products']}"
+                )
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+import time
+
+from store.forecasting import forecast_stock
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a previsão de demanda e o ponto de reposição dos produtos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--method',
+            choices=['sma', 'ewma'],
+            default='ewma',
+            help='Média móvel (sma) ou suavização exponencial (ewma)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Dias de histórico de vendas considerados'
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=28,
+            help='Janela da média móvel, em dias'
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=0.1,
+            help='Fator da suavização exponencial (0 a 1)'
+        )
+        parser.add_argument(
+            '--lead-time',
+            type=int,
+            default=None,
+            help='Prazo de reposição em dias (padrão: REORDER_LEAD_TIME_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Quantidade de produtos calculados por bloco'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(products):
+            self.stdout.write(f"  Produtos calculados: {products}")
+
+        result = forecast_stock(
+            method=options['method'],
+            history_days=options['days'],
+            window=options['window'],
+            alpha=options['alpha'],
+            lead_time=options['lead_time'],
+            batch_size=options['batch_size'],
+            progress=progress
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Previsão concluída em {time.monotonic() - started:.1f}s: "
+                f"{result['products']} produtos, {result['reorder']} para repor."
+            )
+        )
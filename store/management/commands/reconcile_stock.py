@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+import time
+
+from store.counters import reconcile_stock
+
+
+class Command(BaseCommand):
+    help = 'Aplica no banco as baixas de estoque dos produtos em modo de alta concorrência'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de entradas do log aplicadas por transação'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continua executando em intervalos regulares'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Intervalo em segundos entre execuções no modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = reconcile_stock(batch_size=options['batch_size'])
+
+            for oversold in result['oversold']:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"  ✗ Venda acima do estoque: {oversold['sku']} "
+                        f"({oversold['oversold']} unidade(s))"
+                    )
+                )
+
+            if result['entries']:
+                self.stdout.write(
+                    f"Entradas aplicadas: {result['entries']} | produtos atualizados: {result['products']}"
+                )
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
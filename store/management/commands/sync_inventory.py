@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.inventory import (
+    InventoryFormatError, apply_inventory_batch, parse_inventory_csv, parse_inventory_json
+)
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza o estoque a partir de um arquivo CSV ou JSON exportado pelo ERP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo com os pares sku/stock_quantity')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json'],
+            help='Formato do arquivo (padrão: pela extensão)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Quantidade de SKUs gravados por bloco'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('json' if path.endswith('.json') else 'csv')
+
+        try:
+            with open(path, encoding='utf-8', newline='') as stream:
+                if file_format == 'csv':
+                    rows = parse_inventory_csv(stream)
+                else:
+                    rows = parse_inventory_json(stream)
+                result = apply_inventory_batch(rows, chunk_size=options['chunk_size'])
+        except (OSError, InventoryFormatError) as e:
+            raise CommandError(str(e))
+
+        for failure in result['failures']:
+            self.stdout.write(
+                self.style.WARNING(f"  ⚠ {failure['sku'] or '(sem SKU)'}: {failure['error']}")
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Estoque sincronizado: {result['updated']} atualizados, "
+                f"{result['unchanged']} inalterados, {len(result['failures'])} falhas."
+            )
+        )
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_alter_category_options_alter_productimage_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nome da Campanha')),
+                ('skus', models.TextField(blank=True, help_text='Lista de SKUs separados por vírgula ou quebra de linha', verbose_name='SKUs')),
+                ('adjustment_type', models.CharField(choices=[('percentage', 'Percentual'), ('absolute', 'Valor Absoluto')], default='percentage', max_length=20, verbose_name='Tipo de Reajuste')),
+                ('value', models.DecimalField(decimal_places=2, help_text='Percentual ou valor em reais; use negativo para descontos', max_digits=10, verbose_name='Valor')),
+                ('set_compare_price', models.BooleanField(default=True, verbose_name='Usar preço anterior como preço de comparação')),
+                ('starts_at', models.DateTimeField(blank=True, null=True, verbose_name='Início')),
+                ('ends_at', models.DateTimeField(blank=True, null=True, verbose_name='Término')),
+                ('status', models.CharField(choices=[('scheduled', 'Agendada'), ('active', 'Ativa'), ('expired', 'Encerrada'), ('cancelled', 'Cancelada')], default='scheduled', max_length=20, verbose_name='Status')),
+                ('activated_at', models.DateTimeField(blank=True, null=True, verbose_name='Aplicada em')),
+                ('expired_at', models.DateTimeField(blank=True, null=True, verbose_name='Encerrada em')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_rules', to='store.category', verbose_name='Categoria')),
+            ],
+            options={
+                'verbose_name': 'Regra de Preço',
+                'verbose_name_plural': 'Regras de Preço',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço Anterior')),
+                ('new_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Novo Preço')),
+                ('old_compare_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Preço de Comparação Anterior')),
+                ('new_compare_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Novo Preço de Comparação')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, verbose_name='Alterado em')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='store.product', verbose_name='Produto')),
+                ('rule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='history', to='store.pricerule', verbose_name='Regra')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Preço',
+                'verbose_name_plural': 'Históricos de Preço',
+                'ordering': ['-changed_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pricerule',
+            index=models.Index(fields=['status', 'starts_at'], name='store_price_status_e66669_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricerule',
+            index=models.Index(fields=['status', 'ends_at'], name='store_price_status_651eee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricehistory',
+            index=models.Index(fields=['product', 'changed_at'], name='store_price_product_f07df6_idx'),
+        ),
+    ]
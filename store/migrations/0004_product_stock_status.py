@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:06
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+def recompute_stock_status(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Product.objects.update(stock_status=Case(
+        When(track_stock=False, then=Value('in_stock')),
+        When(stock_quantity__gt=0, then=Value('in_stock')),
+        When(allow_backorder=True, then=Value('pre_order')),
+        default=Value('out_of_stock'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_price_rules'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_stock_status, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('stock_status__in', ['in_stock', 'pre_order'])), fields=['category', '-created_at'], name='product_available_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_product_stock_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='high_contention',
+            field=models.BooleanField(default=False, help_text='Baixas de estoque em contador no Redis, reconciliadas em segundo plano (promoções relâmpago)', verbose_name='Modo de Alta Concorrência'),
+        ),
+    ]
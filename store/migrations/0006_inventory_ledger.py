@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_product_high_contention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='ledger_watermark',
+            field=models.BigIntegerField(default=0, editable=False, help_text='stock_quantity já inclui as movimentações até este id', verbose_name='Última Movimentação Consolidada'),
+        ),
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Venda'), ('cancel', 'Cancelamento'), ('restock', 'Reposição'), ('adjustment', 'Ajuste'), ('counter', 'Contador de Alta Concorrência')], max_length=20, verbose_name='Tipo')),
+                ('quantity', models.IntegerField(help_text='Positiva para entradas e negativa para saídas', verbose_name='Quantidade')),
+                ('reference', models.CharField(blank=True, max_length=50, verbose_name='Referência')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='store.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Movimentação de Estoque',
+                'verbose_name_plural': 'Movimentações de Estoque',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['product', 'id'], name='store_inven_product_f36e7e_idx'), models.Index(fields=['created_at'], name='store_inven_created_f606dc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_inventory_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('sma', 'Média Móvel'), ('ewma', 'Suavização Exponencial')], max_length=10, verbose_name='Método')),
+                ('daily_demand', models.FloatField(verbose_name='Demanda Diária Prevista')),
+                ('demand_std', models.FloatField(verbose_name='Desvio da Demanda Diária')),
+                ('stock', models.IntegerField(verbose_name='Estoque no Cálculo')),
+                ('days_of_cover', models.FloatField(blank=True, null=True, verbose_name='Dias de Cobertura')),
+                ('reorder_point', models.PositiveIntegerField(verbose_name='Ponto de Reposição')),
+                ('needs_reorder', models.BooleanField(default=False, verbose_name='Repor')),
+                ('computed_at', models.DateTimeField(verbose_name='Calculado em')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='store.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Previsão de Estoque',
+                'verbose_name_plural': 'Previsões de Estoque',
+                'ordering': ['days_of_cover'],
+                'indexes': [models.Index(fields=['needs_reorder', 'days_of_cover'], name='store_stock_needs_r_fb8aa6_idx')],
+            },
+        ),
+    ]
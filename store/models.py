@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.urls import reverse
 from django.utils.text import slugify
@@ -76,6 +78,12 @@ class Product(models.Model):
         ('pre_order', 'Pré-venda'),
     ]
 
+    # Status que permitem a compra (cobertos pelo índice parcial de disponíveis)
+    AVAILABLE_STOCK_STATUSES = ['in_stock', 'pre_order']
+
+    # Campos dos quais o status do estoque é derivado
+    STOCK_SOURCE_FIELDS = {'stock_quantity', 'track_stock', 'allow_backorder'}
+
     # Informações básicas
     name = models.CharField('Nome do Produto', max_length=200)
     slug = models.SlugField('Slug', max_length=200, unique=True, blank=True)
@@ -122,6 +130,17 @@ class Product(models.Model):
     )
     track_stock = models.BooleanField('Controlar Estoque', default=True)
     allow_backorder = models.BooleanField('Permitir Pré-venda', default=False)
+    ledger_watermark = models.BigIntegerField(
+        'Última Movimentação Consolidada',
+        default=0,
+        editable=False,
+        help_text='stock_quantity já inclui as movimentações até este id'
+    )
+    high_contention = models.BooleanField(
+        'Modo de Alta Concorrência',
+        default=False,
+        help_text='Baixas de estoque em contador no Redis, reconciliadas em segundo plano (promoções relâmpago)'
+    )
 
     # Dimensões e peso (para cálculo de frete)
     weight = models.DecimalField(
@@ -174,6 +193,11 @@ class Product(models.Model):
             models.Index(fields=['is_active', 'is_featured']),
             models.Index(fields=['category', 'is_active']),
             models.Index(fields=['price']),
+            models.Index(
+                fields=['category', '-created_at'],
+                name='product_available_idx',
+                condition=Q(is_active=True, stock_status__in=['in_stock', 'pre_order']),
+            ),
         ]
 
     def save(self, *args, **kwargs):
@@ -181,6 +205,17 @@ class Product(models.Model):
             self.slug = slugify(self.name)
         if not self.sku:
             self.sku = f"PRD-{uuid.uuid4().hex[:8].upper()}"
+
+        # O status do estoque é sempre derivado, nunca editado diretamente
+        stock = self.stock_quantity
+        if self.pk:
+            from .ledger import pending_deltas
+            stock += pending_deltas([self.pk]).get(self.pk, 0)
+        self.stock_status = self.compute_stock_status(stock, self.track_stock, self.allow_backorder)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.STOCK_SOURCE_FIELDS & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'stock_status'}
+
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -201,26 +236,94 @@ class Product(models.Model):
             return round(((self.compare_price - self.price) / self.compare_price) * 100)
         return 0
 
+    @staticmethod
+    def compute_stock_status(stock_quantity, track_stock, allow_backorder):
+        """Status do estoque derivado da quantidade e das regras de controle"""
+        if not track_stock or stock_quantity > 0:
+            return 'in_stock'
+        if allow_backorder:
+            return 'pre_order'
+        return 'out_of_stock'
+
     @property
     def is_in_stock(self):
         """Verifica se o produto está em estoque"""
+        return self.stock_status in self.AVAILABLE_STOCK_STATUSES
+
+    @property
+    def current_stock(self):
+        """Estoque atual: saldo consolidado mais as movimentações recentes"""
+        from .ledger import current_stock_map
+        return current_stock_map([self.pk]).get(self.pk, self.stock_quantity)
+
+    def reduce_stock(self, quantity, reference=''):
+        """Reduz o estoque do produto se houver quantidade suficiente"""
         if not self.track_stock:
-            return True
-        return self.stock_quantity > 0 or self.allow_backorder
-
-    def reduce_stock(self, quantity):
-        """Reduz o estoque do produto"""
-        if self.track_stock and self.stock_quantity >= quantity:
-            self.stock_quantity -= quantity
-            self.save(update_fields=['stock_quantity'])
-            return True
-        return False
-
-    def increase_stock(self, quantity):
+            return False
+        if self.high_contention:
+            from .counters import get_stock_counter
+            # O estoque só é calculado quando o contador ainda não existe
+            return get_stock_counter().reserve(self.pk, quantity, initial=lambda: self.current_stock)
+
+        from .ledger import record_movements
+        if self.current_stock < quantity:
+            return False
+        record_movements([
+            InventoryMovement(product=self, kind='sale', quantity=-quantity, reference=reference)
+        ])
+        return True
+
+    def increase_stock(self, quantity, kind='restock', reference=''):
         """Aumenta o estoque do produto"""
-        if self.track_stock:
-            self.stock_quantity += quantity
-            self.save(update_fields=['stock_quantity'])
+        if not self.track_stock:
+            return
+        if self.high_contention:
+            from .counters import get_stock_counter
+            get_stock_counter().release(self.pk, quantity)
+            return
+
+        from .ledger import record_movements
+        record_movements([
+            InventoryMovement(product=self, kind=kind, quantity=quantity, reference=reference)
+        ])
+
+
+class InventoryMovement(models.Model):
+    """Movimentação de estoque (livro-razão somente de inclusão)"""
+    KIND_CHOICES = [
+        ('sale', 'Venda'),
+        ('cancel', 'Cancelamento'),
+        ('restock', 'Reposição'),
+        ('adjustment', 'Ajuste'),
+        ('counter', 'Contador de Alta Concorrência'),
+    ]
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='movements',
+        verbose_name='Produto'
+    )
+    kind = models.CharField('Tipo', max_length=20, choices=KIND_CHOICES)
+    quantity = models.IntegerField(
+        'Quantidade',
+        help_text='Positiva para entradas e negativa para saídas'
+    )
+    reference = models.CharField('Referência', max_length=50, blank=True)
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Movimentação de Estoque'
+        verbose_name_plural = 'Movimentações de Estoque'
+        ordering = ['-id']
+        indexes = [
+            # Movimentações ainda não consolidadas de um produto (id > watermark)
+            models.Index(fields=['product', 'id']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.quantity:+d} ({self.product_id})"
 
 
 class ProductImage(models.Model):
@@ -257,4 +360,159 @@ class ProductImage(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.product.name} - Imagem {self.sort_order}"
\ No newline at end of file
+        return f"{self.product.name} - Imagem {self.sort_order}"
+
+class PriceRule(models.Model):
+    """Regra de reajuste de preços em lote (campanhas)"""
+    ADJUSTMENT_CHOICES = [
+        ('percentage', 'Percentual'),
+        ('absolute', 'Valor Absoluto'),
+    ]
+
+    STATUS_CHOICES = [
+        ('scheduled', 'Agendada'),
+        ('active', 'Ativa'),
+        ('expired', 'Encerrada'),
+        ('cancelled', 'Cancelada'),
+    ]
+
+    name = models.CharField('Nome da Campanha', max_length=100)
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='price_rules',
+        verbose_name='Categoria',
+        null=True,
+        blank=True
+    )
+    skus = models.TextField(
+        'SKUs',
+        blank=True,
+        help_text='Lista de SKUs separados por vírgula ou quebra de linha'
+    )
+    adjustment_type = models.CharField(
+        'Tipo de Reajuste',
+        max_length=20,
+        choices=ADJUSTMENT_CHOICES,
+        default='percentage'
+    )
+    value = models.DecimalField(
+        'Valor',
+        max_digits=10,
+        decimal_places=2,
+        help_text='Percentual ou valor em reais; use negativo para descontos'
+    )
+    set_compare_price = models.BooleanField(
+        'Usar preço anterior como preço de comparação',
+        default=True
+    )
+    starts_at = models.DateTimeField('Início', null=True, blank=True)
+    ends_at = models.DateTimeField('Término', null=True, blank=True)
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='scheduled')
+    activated_at = models.DateTimeField('Aplicada em', null=True, blank=True)
+    expired_at = models.DateTimeField('Encerrada em', null=True, blank=True)
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Regra de Preço'
+        verbose_name_plural = 'Regras de Preço'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'starts_at']),
+            models.Index(fields=['status', 'ends_at']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if not self.category_id and not self.get_sku_list():
+            raise ValidationError('Informe uma categoria ou uma lista de SKUs.')
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError('O término deve ser posterior ao início.')
+
+    def get_sku_list(self):
+        """Retorna os SKUs informados na regra"""
+        return [sku.strip() for sku in self.skus.replace('\n', ',').split(',') if sku.strip()]
+
+    def get_products(self):
+        """Produtos afetados pela regra"""
+        products = Product.objects.all()
+        if self.category_id:
+            products = products.filter(category_id=self.category_id)
+        skus = self.get_sku_list()
+        if skus:
+            products = products.filter(sku__in=skus)
+        return products
+
+
+class PriceHistory(models.Model):
+    """Histórico de alterações de preço (somente inclusão)"""
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='price_history',
+        verbose_name='Produto'
+    )
+    rule = models.ForeignKey(
+        PriceRule,
+        on_delete=models.SET_NULL,
+        related_name='history',
+        verbose_name='Regra',
+        null=True,
+        blank=True
+    )
+    old_price = models.DecimalField('Preço Anterior', max_digits=10, decimal_places=2)
+    new_price = models.DecimalField('Novo Preço', max_digits=10, decimal_places=2)
+    old_compare_price = models.DecimalField(
+        'Preço de Comparação Anterior', max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    new_compare_price = models.DecimalField(
+        'Novo Preço de Comparação', max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    changed_at = models.DateTimeField('Alterado em', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Histórico de Preço'
+        verbose_name_plural = 'Históricos de Preço'
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['product', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.old_price} → {self.new_price}"
+
+
+class StockForecast(models.Model):
+    """Previsão de demanda e ponto de reposição por produto (ver ``store.forecasting``)"""
+    METHOD_CHOICES = [
+        ('sma', 'Média Móvel'),
+        ('ewma', 'Suavização Exponencial'),
+    ]
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='forecast',
+        verbose_name='Produto'
+    )
+    method = models.CharField('Método', max_length=10, choices=METHOD_CHOICES)
+    daily_demand = models.FloatField('Demanda Diária Prevista')
+    demand_std = models.FloatField('Desvio da Demanda Diária')
+    stock = models.IntegerField('Estoque no Cálculo')
+    days_of_cover = models.FloatField('Dias de Cobertura', null=True, blank=True)
+    reorder_point = models.PositiveIntegerField('Ponto de Reposição')
+    needs_reorder = models.BooleanField('Repor', default=False)
+    computed_at = models.DateTimeField('Calculado em')
+
+    class Meta:
+        verbose_name = 'Previsão de Estoque'
+        verbose_name_plural = 'Previsões de Estoque'
+        ordering = ['days_of_cover']
+        indexes = [
+            models.Index(fields=['needs_reorder', 'days_of_cover']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.daily_demand:.2f}/dia"
@@ -0,0 +1,222 @@
+"""
+Reajuste de preços em lote (campanhas).
+
+As regras (``PriceRule``) são aplicadas em blocos de produtos: os novos
+preços de cada bloco são calculados a partir de uma única leitura e gravados
+com um só UPDATE (``Case``/``When`` por id), sem passar por ``Product.save()``.
+Cada alteração gera uma linha em ``PriceHistory``, que também permite
+restaurar os preços quando a campanha termina.
+
+Só as versões de cache das páginas dos produtos alterados são incrementadas,
+além das listagens e da versão ``prices``, que faz os carrinhos atualizarem
+os preços guardados na sessão.
+"""
+from django.db import transaction
+from django.db.models import Case, DecimalField, Q, Value, When
+from django.db.models.functions import Now
+from django.utils import timezone
+from decimal import Decimal, ROUND_HALF_UP
+import logging
+
+from .cache import bump_versions
+from .models import PriceHistory, PriceRule, Product
+
+logger = logging.getLogger(__name__)
+
+MIN_PRICE = Decimal('0.01')
+
+
+def compute_price(price, adjustment_type, value):
+    """Calcula o novo preço, arredondado em centavos e nunca abaixo de R$ 0,01"""
+    if adjustment_type == 'percentage':
+        new_price = price * (1 + value / Decimal('100'))
+    else:
+        new_price = price + value
+    return max(new_price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP), MIN_PRICE)
+
+
+def _iter_chunks(queryset, chunk_size):
+    """Percorre (id, slug, price, compare_price) em blocos ordenados por id"""
+    last_id = 0
+    while True:
+        chunk = list(
+            queryset.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'slug', 'price', 'compare_price')[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1][0]
+
+
+def write_price_changes(changes, rule=None):
+    """
+    Grava um bloco de alterações de preço com um único UPDATE.
+
+    Args:
+        changes: Lista de tuplas (id, slug, preço antigo, preço novo,
+            comparação antiga, comparação nova)
+        rule: Regra que originou as alterações (opcional)
+
+    Returns:
+        list: Slugs dos produtos alterados
+    """
+    if not changes:
+        return []
+
+    decimal_field = DecimalField(max_digits=10, decimal_places=2)
+    price_cases = [When(id=pk, then=Value(new_price)) for pk, _, _, new_price, _, _ in changes]
+    compare_cases = [When(id=pk, then=Value(new_compare)) for pk, _, _, _, _, new_compare in changes]
+
+    with transaction.atomic():
+        Product.objects.filter(id__in=[change[0] for change in changes]).update(
+            price=Case(*price_cases, output_field=decimal_field),
+            compare_price=Case(*compare_cases, output_field=decimal_field),
+            updated_at=Now(),
+        )
+        PriceHistory.objects.bulk_create([
+            PriceHistory(
+                product_id=pk,
+                rule=rule,
+                old_price=old_price,
+                new_price=new_price,
+                old_compare_price=old_compare,
+                new_compare_price=new_compare,
+            )
+            for pk, _, old_price, new_price, old_compare, new_compare in changes
+        ])
+
+    return [change[1] for change in changes]
+
+
+def invalidate_prices(slugs):
+    """Invalida as páginas dos produtos alterados, as listagens e os preços dos carrinhos"""
+    if not slugs:
+        return
+    bump_versions('product', slugs)
+    bump_versions('listing', ['all'])
+    bump_versions('prices', ['all'])
+
+
+def apply_rule(rule, chunk_size=1000):
+    """
+    Aplica uma regra de preço aos produtos que ela seleciona.
+
+    Args:
+        rule: Instância de PriceRule
+        chunk_size: Quantidade de produtos por UPDATE
+
+    Returns:
+        int: Quantidade de produtos alterados
+    """
+    slugs = []
+    for chunk in _iter_chunks(rule.get_products(), chunk_size):
+        # Produtos já reajustados por esta regra (ex: execução interrompida)
+        already_applied = set(
+            PriceHistory.objects.filter(rule=rule, product_id__in=[row[0] for row in chunk])
+            .values_list('product_id', flat=True)
+        )
+        changes = []
+        for pk, slug, price, compare_price in chunk:
+            if pk in already_applied:
+                continue
+            new_price = compute_price(price, rule.adjustment_type, rule.value)
+            new_compare = price if rule.set_compare_price and new_price < price else compare_price
+            if new_price == price and new_compare == compare_price:
+                continue
+            changes.append((pk, slug, price, new_price, compare_price, new_compare))
+        slugs.extend(write_price_changes(changes, rule))
+
+    invalidate_prices(slugs)
+    return len(slugs)
+
+
+def revert_rule(rule, chunk_size=1000):
+    """
+    Restaura os preços anteriores à regra.
+
+    Só são restaurados os produtos cujo preço atual ainda é o definido pela
+    regra; alterações feitas depois dela (manuais ou por outra campanha) são
+    preservadas.
+
+    Returns:
+        int: Quantidade de produtos restaurados
+    """
+    history = (
+        PriceHistory.objects.filter(rule=rule)
+        .order_by('product_id', 'id')
+        .values_list('product_id', 'old_price', 'new_price', 'old_compare_price', 'new_compare_price')
+    )
+    applied = {}
+    for product_id, *prices in history.iterator(chunk_size=chunk_size):
+        applied.setdefault(product_id, prices)
+
+    product_ids = list(applied)
+    slugs = []
+    for start in range(0, len(product_ids), chunk_size):
+        current = Product.objects.filter(id__in=product_ids[start:start + chunk_size]).values_list(
+            'id', 'slug', 'price', 'compare_price'
+        )
+        changes = []
+        for pk, slug, price, compare_price in current:
+            old_price, new_price, old_compare, new_compare = applied[pk]
+            if price != new_price or compare_price != new_compare:
+                continue
+            changes.append((pk, slug, price, old_price, compare_price, old_compare))
+        slugs.extend(write_price_changes(changes, rule))
+
+    invalidate_prices(slugs)
+    return len(slugs)
+
+
+def run_scheduled_rules(now=None):
+    """
+    Ativa as regras cujo início chegou e encerra as que expiraram.
+
+    Cada regra é marcada com um UPDATE condicional antes de ser aplicada, de
+    modo que duas execuções simultâneas do comando não apliquem a mesma regra
+    duas vezes.
+
+    Returns:
+        dict: Regras ativadas e encerradas, e produtos alterados
+    """
+    now = now or timezone.now()
+    result = {'activated': 0, 'expired': 0, 'products': 0}
+
+    # Regras sem início definido são aplicadas na próxima execução
+    due = PriceRule.objects.filter(
+        Q(starts_at__isnull=True) | Q(starts_at__lte=now), status='scheduled'
+    ).exclude(ends_at__lte=now)
+    for rule in due:
+        claimed = PriceRule.objects.filter(pk=rule.pk, status='scheduled').update(
+            status='active', activated_at=now
+        )
+        if not claimed:
+            continue
+        try:
+            result['products'] += apply_rule(rule)
+            result['activated'] += 1
+        except Exception as e:
+            logger.error(f"Erro ao aplicar a regra de preço {rule.pk}: {str(e)}")
+            PriceRule.objects.filter(pk=rule.pk).update(status='scheduled', activated_at=None)
+
+    # Regras agendadas cuja janela passou sem terem sido aplicadas
+    PriceRule.objects.filter(status='scheduled', ends_at__lte=now).update(
+        status='expired', expired_at=now
+    )
+
+    for rule in PriceRule.objects.filter(status='active', ends_at__lte=now):
+        claimed = PriceRule.objects.filter(pk=rule.pk, status='active').update(
+            status='expired', expired_at=now
+        )
+        if not claimed:
+            continue
+        try:
+            result['products'] += revert_rule(rule)
+            result['expired'] += 1
+        except Exception as e:
+            logger.error(f"Erro ao encerrar a regra de preço {rule.pk}: {str(e)}")
+            PriceRule.objects.filter(pk=rule.pk).update(status='active', expired_at=None)
+
+    return result
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_versions
+from .models import Category, Product, ProductImage
+
+# Campos cuja alteração não afeta as listagens
+STOCK_FIELDS = {'stock_quantity', 'stock_status', 'allow_backorder', 'updated_at'}
+
+
+def bump_on_commit(using, namespace, keys):
+    """
+    Invalida as versões depois do commit da transação corrente.
+
+    Antes do commit, uma requisição concorrente leria os dados antigos e os
+    guardaria no cache com a versão nova.
+    """
+    keys = list(keys)
+    transaction.on_commit(lambda: bump_versions(namespace, keys), using=using)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, update_fields=None, using=None, **kwargs):
+    """Invalida o cache da página do produto e, se necessário, das listagens"""
+    bump_on_commit(using, 'product', [instance.slug])
+    if not update_fields or not set(update_fields) <= STOCK_FIELDS:
+        bump_on_commit(using, 'listing', ['all'])
+    if not update_fields or 'price' in update_fields:
+        bump_on_commit(using, 'prices', ['all'])
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_image_changed(sender, instance, using=None, **kwargs):
+    """Invalida o cache da página do produto ao alterar suas imagens"""
+    bump_on_commit(using, 'product', [instance.product.slug])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, using=None, **kwargs):
+    """Invalida o cache das listagens e das páginas dos produtos da categoria"""
+    bump_on_commit(using, 'listing', ['all'])
+    bump_on_commit(using, 'product', instance.products.values_list('slug', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, using=None, **kwargs):
+    """Invalida o cache das listagens (os produtos removidos já invalidam suas páginas)"""
+    bump_on_commit(using, 'listing', ['all'])
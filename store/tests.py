@@ -1,3 +1,589 @@
-from django.test import TestCase
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.cache import cache
+from django.db import router
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+import json
+import logging
 
-# Create your tests here.
\ No newline at end of file
+from . import counters
+from .cache import get_version
+from .forecasting import forecast_stock
+from .inventory import apply_inventory_batch
+from .ledger import compact_movements
+from .models import Category, InventoryMovement, PriceHistory, PriceRule, Product, StockForecast
+from .pricing import run_scheduled_rules
+from orders.models import DailyProductSales
+from core.replicas import ReplicaMiddleware
+
+
+def create_product(category, sku, **kwargs):
+    """Cria um produto de teste."""
+    data = {
+        'name': f'Produto {sku}',
+        'slug': sku.lower(),
+        'category': category,
+        'description': 'Descrição',
+        'price': Decimal('100.00'),
+        'stock_quantity': 10,
+        'sku': sku,
+    }
+    data.update(kwargs)
+    return Product.objects.create(**data)
+
+
+@override_settings(INVENTORY_SYNC_TOKEN='segredo-erp')
+class InventorySyncTest(TestCase):
+    """
+    Testes para a sincronização de estoque em lote.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.phone = create_product(self.category, 'SKU-1')
+        self.tablet = create_product(self.category, 'SKU-2', allow_backorder=True)
+        self.url = reverse('store:inventory_sync')
+
+    def post(self, body, content_type='application/json', token='segredo-erp'):
+        return self.client.post(
+            self.url,
+            data=body,
+            content_type=content_type,
+            HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+    def test_requires_authentication(self):
+        """Testa que a API recusa chamadas sem token válido."""
+        response = self.post('[]', token='errado')
+        self.assertEqual(response.status_code, 401)
+
+    def test_session_requires_csrf_token(self):
+        """Testa que a chamada autenticada por sessão passa pela verificação de CSRF."""
+        staff = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'senha-admin')
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(staff)
+
+        response = client.post(self.url, data='[]', content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+        client.get(reverse('store:product_list'))
+        response = client.post(
+            self.url, data='[]', content_type='application/json',
+            HTTP_X_CSRFTOKEN=client.cookies['csrftoken'].value
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejects_unsupported_content_type(self):
+        """Testa que formatos diferentes de JSON e CSV são recusados."""
+        response = self.post('sku=SKU-1', content_type='text/plain')
+        self.assertEqual(response.status_code, 415)
+
+    def test_json_batch_updates_stock_and_status(self):
+        """Testa a atualização por JSON com recálculo do status de estoque."""
+        response = self.post(json.dumps({'items': [
+            {'sku': 'SKU-1', 'stock_quantity': 0},
+            {'sku': 'SKU-2', 'stock_quantity': 0},
+        ]}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 2)
+        self.phone.refresh_from_db()
+        self.tablet.refresh_from_db()
+        self.assertEqual(self.phone.stock_status, 'out_of_stock')
+        self.assertEqual(self.tablet.stock_status, 'pre_order')
+
+    def test_csv_batch_reports_failures_per_sku(self):
+        """Testa que falhas por SKU não interrompem o restante do lote."""
+        body = 'sku,stock_quantity,stock_status\nSKU-1,25,\nNAO-EXISTE,3,\nSKU-2,-1,\n'
+
+        response = self.post(body, content_type='text/csv')
+
+        data = response.json()
+        self.assertEqual(data['updated'], 1)
+        self.assertEqual(
+            sorted(failure['sku'] for failure in data['failures']),
+            ['NAO-EXISTE', 'SKU-2']
+        )
+        self.assertEqual(self.phone.current_stock, 25)
+
+    def test_only_affected_cache_versions_are_bumped(self):
+        """Testa que só as versões de cache dos produtos alterados mudam."""
+        phone_version = get_version('product', self.phone.slug)
+        tablet_version = get_version('product', self.tablet.slug)
+        listing_version = get_version('listing')
+
+        apply_inventory_batch([{'sku': 'SKU-1', 'stock_quantity': 7}])
+
+        self.assertEqual(get_version('product', self.phone.slug), phone_version + 1)
+        self.assertEqual(get_version('product', self.tablet.slug), tablet_version)
+        self.assertEqual(get_version('listing'), listing_version)
+
+        apply_inventory_batch([{'sku': 'SKU-1', 'stock_quantity': 0}])
+        self.assertEqual(get_version('listing'), listing_version + 1)
+
+
+class ProductDetailCacheTest(TestCase):
+    """
+    Testes para o cache versionado da página de detalhes do produto.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.product = create_product(self.category, 'SKU-1')
+        self.url = reverse('store:product_detail', kwargs={'slug': self.product.slug})
+
+    def test_detail_is_cached_until_product_changes(self):
+        """Testa que a página usa o cache e reflete alterações no produto."""
+        self.client.get(self.url)
+        self.product.name = 'Smartphone Novo'
+        Product.objects.filter(pk=self.product.pk).update(name='Smartphone Novo')
+
+        # Alteração sem passar por save(): o cache ainda vale
+        self.assertNotContains(self.client.get(self.url), 'Smartphone Novo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertContains(self.client.get(self.url), 'Smartphone Novo')
+
+
+class PriceRuleTest(TestCase):
+    """
+    Testes para o reajuste de preços em lote.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.other_category = Category.objects.create(name='Livros', slug='livros')
+        self.phone = create_product(self.category, 'SKU-1')
+        self.tablet = create_product(self.category, 'SKU-2', price=Decimal('59.90'))
+        self.book = create_product(self.other_category, 'SKU-3')
+
+    def create_rule(self, **kwargs):
+        data = {
+            'name': 'Black Friday',
+            'category': self.category,
+            'adjustment_type': 'percentage',
+            'value': Decimal('-10'),
+        }
+        data.update(kwargs)
+        return PriceRule.objects.create(**data)
+
+    def test_scheduled_rule_is_applied_and_reverted(self):
+        """Testa a ativação e o encerramento de uma campanha agendada."""
+        now = timezone.now()
+        rule = self.create_rule(starts_at=now - timedelta(hours=1), ends_at=now + timedelta(days=1))
+
+        result = run_scheduled_rules(now)
+
+        self.assertEqual(result['activated'], 1)
+        self.assertEqual(result['products'], 2)
+        self.phone.refresh_from_db()
+        self.tablet.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual(self.phone.price, Decimal('90.00'))
+        self.assertEqual(self.phone.compare_price, Decimal('100.00'))
+        self.assertEqual(self.tablet.price, Decimal('53.91'))
+        self.assertEqual(self.book.price, Decimal('100.00'))
+        self.assertEqual(PriceHistory.objects.filter(rule=rule).count(), 2)
+
+        # Uma segunda execução não reaplica a regra
+        self.assertEqual(run_scheduled_rules(now)['products'], 0)
+
+        # Preço alterado manualmente durante a campanha é preservado
+        Product.objects.filter(pk=self.tablet.pk).update(price=Decimal('49.90'))
+
+        result = run_scheduled_rules(now + timedelta(days=2))
+
+        self.assertEqual(result['expired'], 1)
+        rule.refresh_from_db()
+        self.assertEqual(rule.status, 'expired')
+        self.phone.refresh_from_db()
+        self.tablet.refresh_from_db()
+        self.assertEqual(self.phone.price, Decimal('100.00'))
+        self.assertIsNone(self.phone.compare_price)
+        self.assertEqual(self.tablet.price, Decimal('49.90'))
+
+    def test_sku_rule_only_invalidates_affected_products(self):
+        """Testa que só as páginas dos produtos reajustados são invalidadas."""
+        phone_version = get_version('product', self.phone.slug)
+        book_version = get_version('product', self.book.slug)
+
+        self.create_rule(category=None, skus='SKU-1', adjustment_type='absolute', value=Decimal('5'))
+        run_scheduled_rules()
+
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.price, Decimal('105.00'))
+        self.assertEqual(get_version('product', self.phone.slug), phone_version + 1)
+        self.assertEqual(get_version('product', self.book.slug), book_version)
+
+    def test_cart_prices_are_refreshed_after_repricing(self):
+        """Testa que o carrinho na sessão passa a usar o novo preço."""
+        self.client.post(reverse('cart:cart_add', args=[self.phone.id]), {'quantity': 2})
+
+        self.create_rule()
+        run_scheduled_rules()
+
+        response = self.client.get(reverse('cart:cart_detail'))
+        self.assertEqual(response.context['cart'].get_total_price(), Decimal('180.00'))
+
+
+class StockStatusTest(TestCase):
+    """
+    Testes para o status de estoque derivado da quantidade.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.phone = create_product(self.category, 'SKU-1', stock_quantity=2)
+        self.tablet = create_product(self.category, 'SKU-2', stock_quantity=0, allow_backorder=True)
+
+    def test_save_derives_stock_status(self):
+        """Testa que o status é recalculado mesmo com update_fields."""
+        self.assertEqual(self.tablet.stock_status, 'pre_order')
+
+        self.phone.stock_quantity = 0
+        self.phone.save(update_fields=['stock_quantity'])
+
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.stock_status, 'out_of_stock')
+
+    def test_stock_changes_update_status(self):
+        """Testa que reduzir e devolver estoque mantém o status consistente."""
+        self.assertFalse(self.phone.reduce_stock(3))
+        self.assertTrue(self.phone.reduce_stock(2))
+        self.assertEqual(self.phone.current_stock, 0)
+        self.assertEqual(Product.objects.get(pk=self.phone.pk).stock_status, 'out_of_stock')
+
+        self.phone.increase_stock(1)
+        self.assertEqual(Product.objects.get(pk=self.phone.pk).stock_status, 'in_stock')
+
+    def test_listing_in_stock_filter(self):
+        """Testa o filtro "apenas em estoque" da listagem."""
+        self.phone.reduce_stock(2)
+        outlet = create_product(self.category, 'SKU-3', stock_quantity=5)
+
+        response = self.client.get(reverse('store:product_list'), {'in_stock': '1'})
+
+        self.assertEqual(
+            {product.sku for product in response.context['products']},
+            {self.tablet.sku, outlet.sku}
+        )
+
+
+@override_settings(STOCK_COUNTER_BACKEND='locmem')
+class HighContentionStockTest(TestCase):
+    """
+    Testes para as baixas de estoque em contador no modo de alta concorrência.
+    """
+
+    def setUp(self):
+        cache.clear()
+        counters._counter = None
+        self.category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.phone = create_product(self.category, 'SKU-1', stock_quantity=3, high_contention=True)
+
+    def tearDown(self):
+        counters._counter = None
+
+    def test_reservations_do_not_touch_product_row_until_reconciled(self):
+        """Testa que as baixas vão para o contador e são reconciliadas depois."""
+        self.assertTrue(self.phone.reduce_stock(2))
+        self.assertFalse(self.phone.reduce_stock(2))
+        self.phone.increase_stock(1)
+
+        self.assertEqual(self.phone.current_stock, 3)
+        self.assertEqual(counters.get_stock_counter().get(self.phone.pk), 2)
+
+        result = counters.reconcile_stock()
+
+        self.assertEqual(result['entries'], 2)
+        self.assertEqual(result['oversold'], [])
+        self.assertEqual(self.phone.current_stock, 2)
+
+    def test_oversell_is_reported_and_stock_floored(self):
+        """Testa a detecção de venda acima do estoque na reconciliação."""
+        self.assertTrue(self.phone.reduce_stock(3))
+
+        # Estoque reduzido por fora durante a promoção (ex: ajuste do ERP)
+        apply_inventory_batch([{'sku': 'SKU-1', 'stock_quantity': 1}])
+
+        result = counters.reconcile_stock()
+
+        self.assertEqual(result['oversold'], [{'product_id': self.phone.pk, 'sku': 'SKU-1', 'oversold': 2}])
+        self.assertEqual(self.phone.current_stock, 0)
+        self.assertEqual(Product.objects.get(pk=self.phone.pk).stock_status, 'out_of_stock')
+
+    def test_reservation_does_not_query_stock_once_counter_exists(self):
+        """Testa que o estoque do banco só é lido ao criar o contador."""
+        self.phone.reduce_stock(1)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.phone.reduce_stock(1))
+
+    def test_interrupted_reconciliation_is_not_applied_twice(self):
+        """Testa que entradas gravadas antes de uma falha não são reaplicadas."""
+        self.phone.reduce_stock(2)
+        counter = counters.get_stock_counter()
+
+        with mock.patch.object(counter, 'trim', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                counters.reconcile_stock()
+        self.assertEqual(self.phone.current_stock, 1)
+
+        self.phone.reduce_stock(1)
+        result = counters.reconcile_stock()
+
+        self.assertEqual(result['entries'], 2)
+        self.assertEqual(self.phone.current_stock, 0)
+
+    def test_counter_is_discarded_after_the_sale(self):
+        """Testa que o contador é descartado quando o modo é desativado."""
+        self.phone.reduce_stock(1)
+        Product.objects.filter(pk=self.phone.pk).update(high_contention=False)
+
+        counters.reconcile_stock()
+
+        self.assertIsNone(counters.get_stock_counter().get(self.phone.pk))
+        self.assertEqual(self.phone.current_stock, 2)
+
+
+class InventoryLedgerTest(TestCase):
+    """
+    Testes para o livro-razão de estoque e sua consolidação.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.phone = create_product(self.category, 'SKU-1', stock_quantity=10)
+
+    def test_movements_do_not_update_balance_until_compacted(self):
+        """Testa que as movimentações só entram no saldo na consolidação."""
+        self.phone.reduce_stock(3, reference='PED-1')
+        self.phone.increase_stock(1, kind='cancel', reference='PED-1')
+
+        self.assertEqual(Product.objects.get(pk=self.phone.pk).stock_quantity, 10)
+        self.assertEqual(self.phone.current_stock, 8)
+
+        result = compact_movements(lag=0)
+
+        self.assertEqual(result['movements'], 2)
+        product = Product.objects.get(pk=self.phone.pk)
+        self.assertEqual(product.stock_quantity, 8)
+        self.assertEqual(product.ledger_watermark, InventoryMovement.objects.latest('id').id)
+        self.assertEqual(product.current_stock, 8)
+
+        # Movimentações já consolidadas não são aplicadas de novo
+        self.assertEqual(compact_movements(lag=0)['movements'], 0)
+        self.assertEqual(Product.objects.get(pk=self.phone.pk).stock_quantity, 8)
+
+    def test_recent_movements_are_not_compacted(self):
+        """Testa que movimentações mais novas que o intervalo de segurança ficam pendentes."""
+        self.phone.reduce_stock(2)
+
+        self.assertEqual(compact_movements(lag=60)['movements'], 0)
+        self.assertEqual(self.phone.current_stock, 8)
+
+
+class StockForecastTest(TestCase):
+    """
+    Testes para a previsão de demanda e o ponto de reposição.
+    """
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.phone = create_product(self.category, 'SKU-1', stock_quantity=10)
+        self.case = create_product(self.category, 'SKU-2', stock_quantity=10)
+        today = timezone.localdate()
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(date=today - timedelta(days=day), product=self.phone, orders=2, units=2)
+            for day in range(1, 31)
+        ])
+
+    @override_settings(REORDER_LEAD_TIME_DAYS=7)
+    def test_moving_average_and_reorder_point(self):
+        """Testa a demanda pela média móvel, os dias de cobertura e o alerta de reposição."""
+        result = forecast_stock(method='sma', window=28)
+
+        self.assertEqual(result, {'products': 2, 'reorder': 1})
+        forecast = StockForecast.objects.get(product=self.phone)
+        self.assertAlmostEqual(forecast.daily_demand, 2.0)
+        self.assertAlmostEqual(forecast.days_of_cover, 5.0)
+        self.assertEqual(forecast.reorder_point, 14)
+        self.assertTrue(forecast.needs_reorder)
+
+        idle = StockForecast.objects.get(product=self.case)
+        self.assertEqual(idle.daily_demand, 0)
+        self.assertIsNone(idle.days_of_cover)
+        self.assertFalse(idle.needs_reorder)
+
+    def test_exponential_smoothing_and_inactive_products(self):
+        """Testa a suavização exponencial e a remoção da previsão de produtos desativados."""
+        forecast_stock(method='ewma', alpha=0.1, batch_size=1)
+        self.assertAlmostEqual(
+            StockForecast.objects.get(product=self.phone).daily_demand, 2 * (1 - 0.9 ** 30), places=3
+        )
+
+        self.case.is_active = False
+        self.case.save()
+        forecast_stock(method='ewma')
+        self.assertFalse(StockForecast.objects.filter(product=self.case).exists())
+
+
+class ProductAdminTest(TestCase):
+    """
+    Testes para o admin de produtos e suas ações em lote.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.products = [create_product(self.category, f'SKU-{index}') for index in range(3)]
+        self.admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='senha-segura-123'
+        )
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:store_product_changelist')
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Testa que a listagem não faz uma consulta por produto."""
+        self.client.get(self.url)
+        with self.assertNumQueries(6) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        create_product(self.category, 'SKU-9')
+        with self.assertNumQueries(len(queries)):
+            self.client.get(self.url)
+
+    def test_bulk_actions(self):
+        """Testa as ações de desativar e reajustar preços."""
+        ids = [product.pk for product in self.products[:2]]
+        self.client.post(self.url, {'action': 'deactivate', '_selected_action': ids})
+        self.assertEqual(Product.objects.filter(is_active=False).count(), 2)
+
+        self.client.post(self.url, {'action': 'reprice', 'percentage': 'NaN', '_selected_action': ids})
+        self.assertFalse(PriceRule.objects.exists())
+
+        self.client.post(self.url, {'action': 'reprice', 'percentage': '10', '_selected_action': ids})
+        self.assertEqual(
+            list(Product.objects.order_by('sku').values_list('price', flat=True)),
+            [Decimal('110.00'), Decimal('110.00'), Decimal('100.00')]
+        )
+        self.assertEqual(PriceHistory.objects.count(), 2)
+
+
+class SearchSuggestionsTest(TestCase):
+    """
+    Testes para a API assíncrona de sugestões de busca.
+    """
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        self.product = create_product(category, 'SMART001', name='Smartphone X')
+        create_product(category, 'OFF001', name='Smartwatch', is_active=False)
+
+    async def test_suggestions_are_cached_until_catalog_changes(self):
+        """Testa as sugestões, o cache por termo e a invalidação pela versão do catálogo."""
+        url = reverse('store:search_suggestions')
+
+        response = await self.async_client.get(url, {'q': 'SMART'})
+        self.assertEqual(response.json(), {'suggestions': ['Smartphone X']})
+        response = await self.async_client.get(url, {'q': 'sm'})
+        self.assertEqual(response.json(), {'suggestions': []})
+
+        # UPDATE direto não passa pelos sinais: a resposta continua vindo do cache
+        await Product.objects.filter(pk=self.product.pk).aupdate(name='Smartphone Z')
+        response = await self.async_client.get(url, {'q': 'smart'})
+        self.assertEqual(response.json(), {'suggestions': ['Smartphone X']})
+
+        self.product.name = 'Smartphone Y'
+
+        def save_product():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.save()
+
+        await sync_to_async(save_product)()
+        response = await self.async_client.get(url, {'q': 'smart'})
+        self.assertEqual(response.json(), {'suggestions': ['Smartphone Y']})
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTest(TestCase):
+    """
+    Testes para as leituras do catálogo nas réplicas.
+    """
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        create_product(category, 'SMART001', name='Smartphone X')
+        get_user_model().objects.create_user(
+            username='ana', email='ana@example.com', password='senha-segura-123'
+        )
+
+    def routed_reads(self, url):
+        """Apps lidos de cada banco na requisição (as consultas rodam no banco de teste)"""
+        routed = {}
+        route = router.db_for_read
+
+        def record(model, **hints):
+            routed.setdefault(route(model, **hints), set()).add(model._meta.app_label)
+            return 'default'
+
+        with mock.patch.object(router, 'db_for_read', side_effect=record):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return routed
+
+    async def test_async_view_is_not_adapted_by_replica_middleware(self):
+        """Testa que, sob ASGI, o middleware de réplicas roda sem passar a view para uma thread."""
+        request_logger = logging.getLogger('django.request')
+        with self.assertLogs('django.request', level='DEBUG') as logs:
+            request_logger.debug('início')
+            response = await self.async_client.get(reverse('store:search_suggestions'), {'q': 'smart'})
+
+        self.assertEqual(response.json(), {'suggestions': ['Smartphone X']})
+        self.assertFalse([line for line in logs.output if 'core.replicas.ReplicaMiddleware' in line])
+        self.assertTrue(iscoroutinefunction(ReplicaMiddleware(self.async_get_response)))
+
+    @staticmethod
+    async def async_get_response(request):
+        return None
+
+    def test_catalog_reads_go_to_replica(self):
+        """Testa que só as leituras do catálogo nas views marcadas vão para a réplica."""
+        self.client.login(username='ana@example.com', password='senha-segura-123')
+
+        routed = self.routed_reads(reverse('store:product_list'))
+        self.assertEqual(routed['replica1'], {'store'})
+        self.assertIn('sessions', routed['default'])
+
+        routed = self.routed_reads(reverse('cart:cart_detail'))
+        self.assertNotIn('replica1', routed)
+
+    def test_writes_pin_reads_to_primary(self):
+        """Testa que, após uma gravação, as leituras do navegador ficam no banco principal."""
+        response = self.client.post(
+            reverse('accounts:login'),
+            {'username': 'ana@example.com', 'password': 'senha-segura-123'},
+        )
+        self.assertEqual(response.cookies['db_primary']['max-age'], 5)
+
+        routed = self.routed_reads(reverse('store:product_list'))
+        self.assertEqual(set(routed), {'default'})
+
+        # Leituras sem gravação não renovam o cookie
+        response = self.client.get(reverse('store:product_list'))
+        self.assertNotIn('db_primary', response.cookies)
@@ -8,4 +8,5 @@ urlpatterns = [
     path('produto/<slug:slug>/', views.ProductDetailView.as_view(), name='product_detail'),
     path('categoria/<slug:slug>/', views.CategoryDetailView.as_view(), name='category_detail'),
     path('busca-sugestoes/', views.search_suggestions, name='search_suggestions'),
+    path('api/estoque/sincronizar/', views.inventory_sync, name='inventory_sync'),
 ]
\ No newline at end of file
@@ -1,12 +1,24 @@
 from django.shortcuts import render, get_object_or_404
+from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.db.models import Q, Count, Min, Max
 from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST
 from django.views.generic import ListView, DetailView
+from core.replicas import primary_reads, replica_reads
+from .cache import CATALOG_CACHE_TIMEOUT, aversioned_key, versioned_key
+from .inventory import InventoryFormatError, apply_inventory_batch, parse_inventory_csv, parse_inventory_json
 from .models import Product, Category, ProductImage
 from decimal import Decimal
+import codecs
+import hashlib
+import hmac
 
 
+@method_decorator(replica_reads, name='dispatch')
 class ProductListView(ListView):
     """View para listagem de produtos com filtros e busca"""
     model = Product
@@ -39,6 +51,10 @@ class ProductListView(ListView):
         if max_price:
             queryset = queryset.filter(price__lte=Decimal(max_price))
         
+        # Apenas disponíveis (coberto pelo índice parcial product_available_idx)
+        if self.request.GET.get('in_stock'):
+            queryset = queryset.filter(stock_status__in=Product.AVAILABLE_STOCK_STATUSES)
+        
         # Ordenação
         sort_by = self.request.GET.get('sort', '-created_at')
         if sort_by in ['name', '-name', 'price', '-price', 'created_at', '-created_at']:
@@ -48,16 +64,25 @@ class ProductListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(is_active=True).annotate(
-            active_product_count=Count('products', filter=Q(products__is_active=True))
-        )
         
-        # Obter range de preços para filtros
-        price_range = Product.objects.filter(is_active=True).aggregate(
-            min_price=Min('price'),
-            max_price=Max('price')
-        )
-        context['price_range'] = price_range
+        # Categorias e faixa de preços mudam pouco: cache versionado
+        sidebar_key = versioned_key('listing', suffix=':sidebar')
+        sidebar = cache.get(sidebar_key)
+        if sidebar is None:
+            # Caches compartilhados são preenchidos a partir do banco principal
+            with primary_reads():
+                sidebar = {
+                    'categories': list(Category.objects.filter(is_active=True).annotate(
+                        active_product_count=Count('products', filter=Q(products__is_active=True))
+                    )),
+                    # Obter range de preços para filtros
+                    'price_range': Product.objects.filter(is_active=True).aggregate(
+                        min_price=Min('price'),
+                        max_price=Max('price')
+                    ),
+                }
+            cache.set(sidebar_key, sidebar, CATALOG_CACHE_TIMEOUT)
+        context.update(sidebar)
         
         # Manter parâmetros de busca no contexto
         context['current_search'] = self.request.GET.get('search', '')
@@ -65,10 +90,12 @@ class ProductListView(ListView):
         context['current_min_price'] = self.request.GET.get('min_price', '')
         context['current_max_price'] = self.request.GET.get('max_price', '')
         context['current_sort'] = self.request.GET.get('sort', '-created_at')
+        context['current_in_stock'] = bool(self.request.GET.get('in_stock'))
         
         return context
 
 
+@method_decorator(replica_reads, name='dispatch')
 class ProductDetailView(DetailView):
     """View para detalhes do produto"""
     model = Product
@@ -80,6 +107,15 @@ class ProductDetailView(DetailView):
     def get_queryset(self):
         return Product.objects.filter(is_active=True).select_related('category').prefetch_related('images')
 
+    def get_object(self, queryset=None):
+        cache_key = versioned_key('product', self.kwargs[self.slug_url_kwarg])
+        product = cache.get(cache_key)
+        if product is None:
+            with primary_reads():
+                product = super().get_object(queryset)
+            cache.set(cache_key, product, CATALOG_CACHE_TIMEOUT)
+        return product
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
@@ -92,6 +128,7 @@ class ProductDetailView(DetailView):
         return context
 
 
+@method_decorator(replica_reads, name='dispatch')
 class CategoryDetailView(DetailView):
     """View para produtos de uma categoria específica"""
     model = Category
@@ -112,6 +149,10 @@ class CategoryDetailView(DetailView):
             is_active=True
         ).select_related('category').prefetch_related('images')
         
+        in_stock = bool(self.request.GET.get('in_stock'))
+        if in_stock:
+            products = products.filter(stock_status__in=Product.AVAILABLE_STOCK_STATUSES)
+        
         # Filtros de ordenação
         sort_by = self.request.GET.get('sort', '-created_at')
         if sort_by in ['name', '-name', 'price', '-price', 'created_at', '-created_at']:
@@ -121,40 +162,102 @@ class CategoryDetailView(DetailView):
         page_number = self.request.GET.get('page')
         context['products'] = paginator.get_page(page_number)
         context['current_sort'] = sort_by
+        context['current_in_stock'] = in_stock
         
         return context
 
 
-def search_suggestions(request):
-    """API para sugestões de busca"""
-    query = request.GET.get('q', '')
-    
-    if len(query) >= 3:
-        suggestions = Product.objects.filter(
-            name__icontains=query,
-            is_active=True
-        ).values_list('name', flat=True)[:10]
-        
-        return JsonResponse({
-            'suggestions': list(suggestions)
-        })
+async def search_suggestions(request):
+    """
+    API para sugestões de busca.
+
+    View assíncrona: sob ASGI a espera pelo cache e pelo banco não ocupa uma
+    thread. As sugestões ficam em cache por termo até a próxima alteração do
+    catálogo (versão 'listing').
+    """
+    query = request.GET.get('q', '').strip().lower()[:100]
     
-    return JsonResponse({'suggestions': []})
+    if len(query) < 3:
+        return JsonResponse({'suggestions': []})
+
+    digest = hashlib.md5(query.encode()).hexdigest()
+    key = await aversioned_key('listing', suffix=f":suggestions:{digest}")
+    suggestions = await cache.aget(key)
+    if suggestions is None:
+        suggestions = [
+            name async for name in Product.objects.filter(
+                name__icontains=query,
+                is_active=True
+            ).values_list('name', flat=True)[:10]
+        ]
+        await cache.aset(key, suggestions, CATALOG_CACHE_TIMEOUT)
+
+    return JsonResponse({'suggestions': suggestions})
+
+
+# Formatos aceitos pela sincronização de estoque
+INVENTORY_PARSERS = {
+    'application/json': parse_inventory_json,
+    'text/csv': parse_inventory_csv,
+}
+
+
+@csrf_exempt
+@require_POST
+def inventory_sync(request):
+    """
+    API de sincronização de estoque em lote para o ERP.
+
+    Aceita JSON (lista de itens ou {"items": [...]}) ou CSV com as colunas
+    sku, stock_quantity e stock_status (opcional). A autenticação é feita
+    pelo cabeçalho "Authorization: Bearer <INVENTORY_SYNC_TOKEN>" ou por um
+    usuário da equipe com permissão para alterar produtos; só a chamada com
+    token dispensa a verificação de CSRF.
+    """
+    token = settings.INVENTORY_SYNC_TOKEN
+    auth_header = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(auth_header, f'Bearer {token}'):
+        return _apply_inventory_sync(request)
+
+    if not (request.user.is_authenticated and request.user.has_perm('store.change_product')):
+        return JsonResponse({'status': 'error', 'message': 'Não autorizado'}, status=401)
+    return csrf_protect(_apply_inventory_sync)(request)
+
+
+def _apply_inventory_sync(request):
+    parser = INVENTORY_PARSERS.get(request.content_type)
+    if parser is None:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Envie application/json ou text/csv'},
+            status=415
+        )
+
+    try:
+        # Lê o corpo como stream para não carregar lotes grandes inteiros na memória
+        stream = codecs.getreader('utf-8')(request)
+        result = apply_inventory_batch(parser(stream))
+    except (InventoryFormatError, UnicodeDecodeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    return JsonResponse(dict(result, status='ok'))
 
 
 # Views baseadas em função para compatibilidade
+@replica_reads
 def product_list(request):
     """View de listagem de produtos"""
     view = ProductListView.as_view()
     return view(request)
 
 
+@replica_reads
 def product_detail(request, slug):
     """View de detalhes do produto"""
     view = ProductDetailView.as_view()
     return view(request, slug=slug)
 
 
+@replica_reads
 def category_detail(request, slug):
     """View de categoria"""
     view = CategoryDetailView.as_view()